@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FastAPI 应用入口
+创建挂载 api_routes 的应用，启动时创建共享的数据库客户端，响应启用 gzip（安装 brotli-asgi 时使用 brotli）压缩，
+并在 /metrics 提供 Prometheus 格式的调用指标。
+
+启动方式:
+
+    python api_app.py --workers 4                                  # uvicorn 多进程
+    gunicorn -c gunicorn.conf.py "api_app:create_app()"            # gunicorn + uvicorn worker
+
+配置也可通过环境变量（或 .env 文件）提供，见 APISettings。
+"""
+
+import os
+import time
+import argparse
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import List
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
+
+from api_routes import router
+from instrumentation import metrics, record_http_request
+from slow_query_log import page_context
+from supabase_handler import SupabaseHandler
+from shared_cache import create_shared_cache
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # pragma: no cover - brotli 为可选依赖
+    BrotliMiddleware = None
+
+load_dotenv()
+
+
+def _env_list(name: str, default: str) -> List[str]:
+    return [item.strip() for item in os.getenv(name, default).split(",") if item.strip()]
+
+
+@dataclass
+class APISettings:
+    """API 服务配置，默认值来自环境变量"""
+    host: str = field(default_factory=lambda: os.getenv("LADR_API_HOST", "0.0.0.0"))
+    port: int = field(default_factory=lambda: int(os.getenv("LADR_API_PORT", "8000")))
+    # 工作进程数，默认为 CPU 核数
+    workers: int = field(default_factory=lambda: int(os.getenv("LADR_API_WORKERS", str(os.cpu_count() or 1))))
+    # 空闲连接保持时间（秒），应大于前置负载均衡器的空闲超时
+    keep_alive: int = field(default_factory=lambda: int(os.getenv("LADR_API_KEEP_ALIVE", "75")))
+    # 小于该字节数的响应不压缩
+    compress_min_size: int = field(default_factory=lambda: int(os.getenv("LADR_API_COMPRESS_MIN_SIZE", "1024")))
+    cors_origins: List[str] = field(default_factory=lambda: _env_list("LADR_API_CORS_ORIGINS", "*"))
+    prefix: str = field(default_factory=lambda: os.getenv("LADR_API_PREFIX", "/api"))
+    # 是否记录请求耗时并提供 /metrics
+    metrics_enabled: bool = field(default_factory=lambda: os.getenv("LADR_API_METRICS", "1") not in ("0", "false"))
+
+
+def create_app(settings: APISettings = None) -> FastAPI:
+    """
+    创建 FastAPI 应用
+
+    Args:
+        settings: 服务配置，默认从环境变量读取
+
+    Returns:
+        FastAPI: 挂载了所有资源路由的应用
+    """
+    settings = settings or APISettings()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # 每个工作进程创建一个数据库客户端，所有请求共享其连接池
+        app.state.db = SupabaseHandler()
+        # 配置了共享缓存时，写操作成功后使 Streamlit 副本的缓存失效
+        app.state.shared_cache = create_shared_cache()
+        yield
+        app.state.db = None
+        app.state.shared_cache = None
+
+    app = FastAPI(
+        title="LADR API",
+        description="学习分析与诊断报告系统 API",
+        lifespan=lifespan,
+    )
+    app.add_middleware(CORSMiddleware, allow_origins=settings.cors_origins,
+                       allow_methods=["*"], allow_headers=["*"])
+    if BrotliMiddleware is not None:
+        # 客户端不支持 brotli 时自动退回 gzip
+        app.add_middleware(BrotliMiddleware, minimum_size=settings.compress_min_size, gzip_fallback=True)
+    else:
+        app.add_middleware(GZipMiddleware, minimum_size=settings.compress_min_size)
+
+    app.include_router(router, prefix=settings.prefix)
+
+    @app.middleware("http")
+    async def request_context(request: Request, call_next):
+        started = time.perf_counter()
+        # 请求内的数据库调用在慢查询日志中归属到该请求
+        with page_context(f"{request.method} {request.url.path}"):
+            response = await call_next(request)
+        if settings.metrics_enabled:
+            # 按路由模板统计，未匹配路由的请求归为 unmatched
+            route = request.scope.get("route")
+            record_http_request(getattr(route, "path", "unmatched"), request.method,
+                                response.status_code, time.perf_counter() - started)
+        return response
+
+    if settings.metrics_enabled:
+        @app.get("/metrics", include_in_schema=False)
+        async def prometheus_metrics():
+            # 每个工作进程各自统计，多进程部署时请按进程抓取或在前置代理处汇总
+            return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/health", include_in_schema=False)
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+
+def main():
+    settings = APISettings()
+    parser = argparse.ArgumentParser(description="启动 LADR API 服务")
+    parser.add_argument("--host", default=settings.host, help="监听地址")
+    parser.add_argument("--port", type=int, default=settings.port, help="监听端口")
+    parser.add_argument("--workers", type=int, default=settings.workers, help="工作进程数")
+    parser.add_argument("--keep-alive", type=int, default=settings.keep_alive, help="空闲连接保持时间（秒）")
+    parser.add_argument("--reload", action="store_true", help="开发模式，代码修改后自动重启（单进程）")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    uvicorn.run(
+        "api_app:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=1 if args.reload else args.workers,
+        timeout_keep_alive=args.keep_alive,
+        reload=args.reload,
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,395 +3,185 @@
 
 """
 API 路由定义
-实现所有数据表的 CRUD 操作
+实现所有数据表的 CRUD 操作，路由由 resource_registry 中的资源定义生成
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Body
 from typing import List, Optional, Dict, Any
 from supabase_handler import SupabaseHandler
-from models import (
-    UserCreate, UserResponse,
-    StudentCreate, StudentResponse,
-    ExamPaperCreate, ExamPaperResponse,
-    ExamPaperImageCreate, ExamPaperImageResponse,
-    KnowledgePointCreate, KnowledgePointResponse,
-    QuestionCreate, QuestionResponse,
-    QuestionKnowledgePointCreate, QuestionKnowledgePointResponse,
-    BatchQuestionCreate, BatchQuestionResponse
-)
-
-# 创建路由器
-router = APIRouter()
-
-# 获取数据库处理器实例
-def get_db_handler():
-    return SupabaseHandler()
-
-# ==================== Users 表 CRUD ====================
-
-@router.get("/users", response_model=List[UserResponse])
-async def get_users(db: SupabaseHandler = Depends(get_db_handler)):
-    """获取所有用户"""
-    try:
-        result = db.select_data("user")
-        return result if result is not None else []
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.get("/users/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int, db: SupabaseHandler = Depends(get_db_handler)):
-    """根据 ID 获取用户"""
-    try:
-        result = db.select_data("user", filters={"id": user_id})
-        if not result:
-            raise HTTPException(status_code=404, detail="用户不存在")
-        return result[0]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.post("/users", response_model=UserResponse)
-async def create_user(user: UserCreate, db: SupabaseHandler = Depends(get_db_handler)):
-    """创建新用户"""
-    try:
-        user_data = user.dict()
-        # 将password转换为password_hash
-        if 'password' in user_data:
-            # 简单的密码哈希处理（实际项目中应使用bcrypt等安全哈希）
-            import hashlib
-            password_hash = hashlib.sha256(user_data['password'].encode()).hexdigest()
-            user_data['password_hash'] = password_hash
-            del user_data['password']
-        
-        # 如果包含id字段，先检查是否已存在
-        if 'id' in user_data and user_data['id'] is not None:
-            existing = db.select_data("user", filters={"id": user_data['id']})
-            if existing:
-                raise HTTPException(status_code=400, detail=f"用户ID {user_data['id']} 已存在")
-        
-        result = db.insert_data("user", user_data)
-        if not result:
-            raise HTTPException(status_code=500, detail="创建用户失败")
-        return result[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.put("/users/{user_id}", response_model=UserResponse)
-async def update_user(user_id: int, user: UserCreate, db: SupabaseHandler = Depends(get_db_handler)):
-    """更新用户信息"""
-    try:
-        result = db.update_data("user", user.dict(), {"id": user_id})
-        if not result:
-            raise HTTPException(status_code=404, detail="用户不存在")
-        return result[0]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.delete("/users/{user_id}")
-async def delete_user(user_id: int, db: SupabaseHandler = Depends(get_db_handler)):
-    """删除用户"""
-    try:
-        result = db.delete_data("user", {"id": user_id})
-        return {"message": "用户删除成功"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-# ==================== Students 表 CRUD ====================
-
-@router.get("/students", response_model=List[StudentResponse])
-async def get_students(db: SupabaseHandler = Depends(get_db_handler)):
-    """获取所有学生"""
-    try:
-        result = db.select_data("student")
-        return result if result is not None else []
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.get("/students/{student_id}", response_model=StudentResponse)
-async def get_student(student_id: int, db: SupabaseHandler = Depends(get_db_handler)):
-    """根据 ID 获取学生"""
-    try:
-        result = db.select_data("student", filters={"id": student_id})
-        if not result:
-            raise HTTPException(status_code=404, detail="学生不存在")
-        return result[0]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.post("/students", response_model=StudentResponse)
-async def create_student(student: StudentCreate, db: SupabaseHandler = Depends(get_db_handler)):
-    """创建新学生"""
-    try:
-        student_data = student.dict()
-        
-        # 如果包含id字段，先检查是否已存在
-        if 'id' in student_data and student_data['id'] is not None:
-            existing = db.select_data("student", filters={"id": student_data['id']})
-            if existing:
-                raise HTTPException(status_code=400, detail=f"学生ID {student_data['id']} 已存在")
-        
-        result = db.insert_data("student", student_data)
-        if not result:
-            raise HTTPException(status_code=500, detail="创建学生失败")
-        return result[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.put("/students/{student_id}", response_model=StudentResponse)
-async def update_student(student_id: int, student: StudentCreate, db: SupabaseHandler = Depends(get_db_handler)):
-    """更新学生信息"""
-    try:
-        result = db.update_data("student", student.dict(), {"id": student_id})
-        if not result:
-            raise HTTPException(status_code=404, detail="学生不存在")
-        return result[0]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.delete("/students/{student_id}")
-async def delete_student(student_id: int, db: SupabaseHandler = Depends(get_db_handler)):
-    """删除学生"""
-    try:
-        result = db.delete_data("student", {"id": student_id})
-        return {"message": "学生删除成功"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-# ==================== Exam Papers 表 CRUD ====================
-
-@router.get("/exam_papers", response_model=List[ExamPaperResponse])
-async def get_exam_papers(db: SupabaseHandler = Depends(get_db_handler)):
-    """获取所有试卷"""
-    try:
-        result = db.select_data("exam_paper")
-        return result if result is not None else []
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.get("/exam_papers/{paper_id}", response_model=ExamPaperResponse)
-async def get_exam_paper(paper_id: int, db: SupabaseHandler = Depends(get_db_handler)):
-    """根据 ID 获取试卷"""
-    try:
-        result = db.select_data("exam_paper", filters={"id": paper_id})
-        if not result:
-            raise HTTPException(status_code=404, detail="试卷不存在")
-        return result[0]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.post("/exam_papers", response_model=ExamPaperResponse)
-async def create_exam_paper(paper: ExamPaperCreate, db: SupabaseHandler = Depends(get_db_handler)):
-    """创建新试卷"""
-    try:
-        paper_data = paper.dict()
-        # 如果包含id字段，先检查是否已存在
-        if 'id' in paper_data and paper_data['id'] is not None:
-            existing = db.select_data("exam_paper", filters={"id": paper_data['id']})
-            if existing:
-                raise HTTPException(status_code=400, detail=f"试卷ID {paper_data['id']} 已存在")
-        
-        result = db.insert_data("exam_paper", paper_data)
-        if not result:
-            raise HTTPException(status_code=500, detail="创建试卷失败")
-        return result[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.put("/exam_papers/{paper_id}", response_model=ExamPaperResponse)
-async def update_exam_paper(paper_id: int, paper: ExamPaperCreate, db: SupabaseHandler = Depends(get_db_handler)):
-    """更新试卷信息"""
-    try:
-        result = db.update_data("exam_paper", paper.dict(), {"id": paper_id})
-        if not result:
-            raise HTTPException(status_code=404, detail="试卷不存在")
-        return result[0]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.delete("/exam_papers/{paper_id}")
-async def delete_exam_paper(paper_id: int, db: SupabaseHandler = Depends(get_db_handler)):
-    """删除试卷"""
-    try:
-        result = db.delete_data("exam_paper", {"id": paper_id})
-        return {"message": "试卷删除成功"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-# ==================== Exam Paper Images 表 CRUD ====================
-
-@router.get("/exam_paper_images", response_model=List[ExamPaperImageResponse])
-async def get_exam_paper_images(db: SupabaseHandler = Depends(get_db_handler)):
-    """获取所有试卷图片"""
-    try:
-        result = db.select_data("exam_paper_image")
-        return result if result is not None else []
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.get("/exam_paper_images/{image_id}", response_model=ExamPaperImageResponse)
-async def get_exam_paper_image(image_id: int, db: SupabaseHandler = Depends(get_db_handler)):
-    """根据 ID 获取试卷图片"""
-    try:
-        result = db.select_data("exam_paper_image", filters={"id": image_id})
-        if not result:
-            raise HTTPException(status_code=404, detail="试卷图片不存在")
-        return result[0]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.post("/exam_paper_images", response_model=ExamPaperImageResponse)
-async def create_exam_paper_image(image: ExamPaperImageCreate, db: SupabaseHandler = Depends(get_db_handler)):
-    """创建新试卷图片"""
-    try:
-        image_data = image.dict()
-        # 如果包含id字段，先检查是否已存在
-        if 'id' in image_data and image_data['id'] is not None:
-            existing = db.select_data("exam_paper_image", filters={"id": image_data['id']})
-            if existing:
-                raise HTTPException(status_code=400, detail=f"试卷图片ID {image_data['id']} 已存在")
-        
-        result = db.insert_data("exam_paper_image", image_data)
-        if not result:
-            raise HTTPException(status_code=500, detail="创建试卷图片失败")
-        return result[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.put("/exam_paper_images/{image_id}", response_model=ExamPaperImageResponse)
-async def update_exam_paper_image(image_id: int, image: ExamPaperImageCreate, db: SupabaseHandler = Depends(get_db_handler)):
-    """更新试卷图片信息"""
-    try:
-        result = db.update_data("exam_paper_image", image.dict(), {"id": image_id})
-        if not result:
-            raise HTTPException(status_code=404, detail="试卷图片不存在")
-        return result[0]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.delete("/exam_paper_images/{image_id}")
-async def delete_exam_paper_image(image_id: int, db: SupabaseHandler = Depends(get_db_handler)):
-    """删除试卷图片"""
-    try:
-        result = db.delete_data("exam_paper_image", {"id": image_id})
-        return {"message": "试卷图片删除成功"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-# ==================== Knowledge Points 表 CRUD ====================
-
-@router.get("/knowledge_points", response_model=List[KnowledgePointResponse])
-async def get_knowledge_points(db: SupabaseHandler = Depends(get_db_handler)):
-    """获取所有知识点"""
-    try:
-        result = db.select_data("knowledge_point")
-        return result if result is not None else []
-    except Exception as e:
-        # 如果表不存在，返回空数组
-        return []
-
-@router.get("/knowledge_points/{point_id}", response_model=KnowledgePointResponse)
-async def get_knowledge_point(point_id: int, db: SupabaseHandler = Depends(get_db_handler)):
-    """根据 ID 获取知识点"""
-    try:
-        result = db.select_data("knowledge_point", filters={"id": point_id})
-        if not result:
-            raise HTTPException(status_code=404, detail="知识点不存在")
-        return result[0]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.post("/knowledge_points", response_model=KnowledgePointResponse)
-async def create_knowledge_point(point: KnowledgePointCreate, db: SupabaseHandler = Depends(get_db_handler)):
-    """创建新知识点"""
-    try:
-        point_data = point.dict()
-        # 如果包含id字段，先检查是否已存在
-        if 'id' in point_data and point_data['id'] is not None:
-            existing = db.select_data("knowledge_point", filters={"id": point_data['id']})
-            if existing:
-                raise HTTPException(status_code=400, detail=f"知识点ID {point_data['id']} 已存在")
-        
-        result = db.insert_data("knowledge_point", point_data)
-        if not result:
-            raise HTTPException(status_code=500, detail="创建知识点失败")
-        return result[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.put("/knowledge_points/{point_id}", response_model=KnowledgePointResponse)
-async def update_knowledge_point(point_id: int, point: KnowledgePointCreate, db: SupabaseHandler = Depends(get_db_handler)):
-    """更新知识点信息"""
-    try:
-        result = db.update_data("knowledge_point", point.dict(), {"id": point_id})
-        if not result:
-            raise HTTPException(status_code=404, detail="知识点不存在")
-        return result[0]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.delete("/knowledge_points/{point_id}")
-async def delete_knowledge_point(point_id: int, db: SupabaseHandler = Depends(get_db_handler)):
-    """删除知识点"""
-    try:
-        result = db.delete_data("knowledge_point", {"id": point_id})
-        return {"message": "知识点删除成功"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-# ==================== Questions 表 CRUD ====================
-
-@router.get("/questions", response_model=List[QuestionResponse])
-async def get_questions(db: SupabaseHandler = Depends(get_db_handler)):
-    """获取所有题目"""
-    try:
-        result = db.select_data("question")
-        return result if result is not None else []
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.get("/questions/{question_id}", response_model=QuestionResponse)
-async def get_question(question_id: int, db: SupabaseHandler = Depends(get_db_handler)):
-    """根据 ID 获取题目"""
-    try:
-        result = db.select_data("question", filters={"id": question_id})
-        if not result:
-            raise HTTPException(status_code=404, detail="题目不存在")
-        return result[0]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.post("/questions", response_model=QuestionResponse)
-async def create_question(question: QuestionCreate, db: SupabaseHandler = Depends(get_db_handler)):
-    """创建新题目"""
-    try:
-        question_data = question.dict()
-        # 如果包含id字段，先检查是否已存在
-        if 'id' in question_data and question_data['id'] is not None:
-            existing = db.select_data("question", filters={"id": question_data['id']})
-            if existing:
-                raise HTTPException(status_code=400, detail=f"题目ID {question_data['id']} 已存在")
-        
-        result = db.insert_data("question", question_data)
-        if not result:
-            raise HTTPException(status_code=500, detail="创建题目失败")
-        return result[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
+from shared_cache import SharedCache
+from models import BatchQuestionCreate, BatchQuestionResponse, BulkResponse
+from resource_registry import RESOURCES, ResourceSpec
+from batch_loader import BatchLoader
+from fast_response import FastJSONResponse, render_rows
+from http_cache import conditional_response, ETAG_WATERMARK_COLUMNS
+from bulk_operations import bulk_create, bulk_update, bulk_delete
+
+# 创建路由器，默认使用 orjson 编码响应
+router = APIRouter(default_response_class=FastJSONResponse)
+
+# 获取数据库处理器实例，由 api_app 创建的应用在启动时共享一个实例
+def get_db_handler(request: Request):
+    db = getattr(request.app.state, "db", None)
+    return db if db is not None else SupabaseHandler()
+
+# 共享缓存由 api_app 在启动时创建，未配置时为 None
+def get_shared_cache(request: Request) -> Optional[SharedCache]:
+    return getattr(request.app.state, "shared_cache", None)
+
+def invalidate_shared_cache(shared_cache: Optional[SharedCache], table_name: str):
+    """写操作成功后使共享缓存中该表的数据失效，Streamlit 副本下次读取时看到修改"""
+    if shared_cache is not None:
+        shared_cache.invalidate(table_name)
+
+# 每个请求一个批量加载器，同一请求内的按 ID 读取合并为每张表一次查询
+def get_batch_loader(db: SupabaseHandler = Depends(get_db_handler)):
+    return BatchLoader(lambda table_name, ids: db.select_in(table_name, "id", ids))
+
+def parse_id_list(ids: str) -> List[int]:
+    """解析逗号分隔的 ID 参数"""
+    try:
+        return [int(item_id) for item_id in ids.split(",") if item_id.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids 必须是逗号分隔的整数")
+
+# ==================== 通用 CRUD 路由 ====================
+
+def register_resource_routes(router: APIRouter, spec: ResourceSpec):
+    """
+    为一个资源注册列表、详情、创建、更新、删除路由
+
+    Supabase 客户端、BatchLoader 和重试退避都是同步阻塞调用，路由函数定义为普通函数，
+    由 FastAPI 放到线程池执行，一个请求等待数据库时不会阻塞工作进程的事件循环
+    """
+    watermark_column = ETAG_WATERMARK_COLUMNS.get(spec.table)
+    
+    def render_list(rows):
+        return render_rows(rows, spec.response_model, many=True)
+    
+    def render_item(row):
+        return render_rows(row, spec.response_model)
+    
+    def list_items(request: Request,
+                         ids: Optional[str] = Query(None, description="逗号分隔的 ID，只返回这些记录"),
+                         db: SupabaseHandler = Depends(get_db_handler),
+                         loader: BatchLoader = Depends(get_batch_loader)):
+        if ids:
+            rows = [row for row in loader.load_many(spec.table, parse_id_list(ids)) if row is not None]
+            return conditional_response(request, rows, render_list, watermark_column)
+        try:
+            result = db.select_data(spec.table, raise_errors=True)
+        except Exception as e:
+            if spec.list_empty_on_error:
+                # 如果表不存在，返回空数组
+                return []
+            raise HTTPException(status_code=500, detail=str(e))
+        return conditional_response(request, result if result is not None else [], render_list, watermark_column)
+    
+    def get_item(request: Request, item_id: int, loader: BatchLoader = Depends(get_batch_loader)):
+        try:
+            result = loader.load(spec.table, item_id)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        if result is None:
+            raise HTTPException(status_code=404, detail=f"{spec.label}不存在")
+        return conditional_response(request, result, render_item, watermark_column)
+    
+    def create_item(item: spec.create_model, db: SupabaseHandler = Depends(get_db_handler),
+                    shared_cache: Optional[SharedCache] = Depends(get_shared_cache)):
+        try:
+            item_data = item.model_dump()
+            if spec.prepare_write:
+                item_data = spec.prepare_write(item_data)
+            
+            # 如果包含id字段，先检查是否已存在
+            if item_data.get('id') is not None:
+                existing = db.select_data(spec.table, filters={"id": item_data['id']})
+                if existing:
+                    raise HTTPException(status_code=400, detail=f"{spec.label}ID {item_data['id']} 已存在")
+            
+            result = db.insert_data(spec.table, item_data)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        if not result:
+            raise HTTPException(status_code=500, detail=f"创建{spec.label}失败")
+        invalidate_shared_cache(shared_cache, spec.table)
+        return render_rows(result[0], spec.response_model)
+    
+    def update_item(item_id: int, item: spec.create_model, db: SupabaseHandler = Depends(get_db_handler),
+                    shared_cache: Optional[SharedCache] = Depends(get_shared_cache)):
+        try:
+            item_data = item.model_dump()
+            if spec.prepare_write:
+                item_data = spec.prepare_write(item_data)
+            result = db.update_data(spec.table, item_data, {"id": item_id})
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        if not result:
+            raise HTTPException(status_code=404, detail=f"{spec.label}不存在")
+        invalidate_shared_cache(shared_cache, spec.table)
+        return render_rows(result[0], spec.response_model)
+    
+    def delete_item(item_id: int, db: SupabaseHandler = Depends(get_db_handler),
+                    shared_cache: Optional[SharedCache] = Depends(get_shared_cache)):
+        try:
+            if db.delete_data(spec.table, {"id": item_id}) is not None:
+                invalidate_shared_cache(shared_cache, spec.table)
+            return {"message": f"{spec.label}删除成功"}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    def bulk_result(result: Dict[str, Any], shared_cache: Optional[SharedCache]) -> Dict[str, Any]:
+        if result["success_count"]:
+            invalidate_shared_cache(shared_cache, spec.table)
+        return result
+    
+    def bulk_create_items(items: List[Dict[str, Any]] = Body(..., description=f"待创建的{spec.label}列表"),
+                                db: SupabaseHandler = Depends(get_db_handler),
+                                shared_cache: Optional[SharedCache] = Depends(get_shared_cache)):
+        return bulk_result(bulk_create(db, spec, items), shared_cache)
+    
+    def bulk_update_items(items: List[Dict[str, Any]] = Body(..., description="每条包含 id 和要修改的字段"),
+                                db: SupabaseHandler = Depends(get_db_handler),
+                                shared_cache: Optional[SharedCache] = Depends(get_shared_cache)):
+        return bulk_result(bulk_update(db, spec, items), shared_cache)
+    
+    def bulk_delete_items(ids: str = Query(..., description="逗号分隔的 ID"),
+                                db: SupabaseHandler = Depends(get_db_handler),
+                                shared_cache: Optional[SharedCache] = Depends(get_shared_cache)):
+        return bulk_result(bulk_delete(db, spec, parse_id_list(ids)), shared_cache)
+    
+    path = f"/{spec.name}"
+    bulk_path = f"/{spec.name}/bulk"
+    item_path = f"/{spec.name}/{{item_id}}"
+    # 批量路由必须先于 /{item_id} 注册，否则 DELETE /{resource}/bulk 会被当作删除单条记录
+    router.add_api_route(bulk_path, bulk_create_items, methods=["POST"], response_model=BulkResponse,
+                         name=f"bulk_create_{spec.name}", summary=f"批量创建{spec.label}")
+    router.add_api_route(bulk_path, bulk_update_items, methods=["PATCH"], response_model=BulkResponse,
+                         name=f"bulk_update_{spec.name}", summary=f"批量更新{spec.label}")
+    router.add_api_route(bulk_path, bulk_delete_items, methods=["DELETE"], response_model=BulkResponse,
+                         name=f"bulk_delete_{spec.name}", summary=f"批量删除{spec.label}")
+    router.add_api_route(path, list_items, methods=["GET"], response_model=List[spec.response_model],
+                         name=f"list_{spec.name}", summary=f"获取所有{spec.label}")
+    router.add_api_route(item_path, get_item, methods=["GET"], response_model=spec.response_model,
+                         name=f"get_{spec.name}", summary=f"根据 ID 获取{spec.label}")
+    router.add_api_route(path, create_item, methods=["POST"], response_model=spec.response_model,
+                         name=f"create_{spec.name}", summary=f"创建新{spec.label}")
+    router.add_api_route(item_path, update_item, methods=["PUT"], response_model=spec.response_model,
+                         name=f"update_{spec.name}", summary=f"更新{spec.label}信息")
+    router.add_api_route(item_path, delete_item, methods=["DELETE"],
+                         name=f"delete_{spec.name}", summary=f"删除{spec.label}")
+
+for resource_spec in RESOURCES.values():
+    register_resource_routes(router, resource_spec)
+
+# ==================== 专用路由 ====================
 
 @router.post("/questions/batch", response_model=BatchQuestionResponse)
-async def create_questions_batch(batch_request: BatchQuestionCreate, db: SupabaseHandler = Depends(get_db_handler)):
+def create_questions_batch(batch_request: BatchQuestionCreate, db: SupabaseHandler = Depends(get_db_handler),
+                           shared_cache: Optional[SharedCache] = Depends(get_shared_cache)):
     """批量创建题目"""
     try:
         created_questions = []
@@ -424,6 +214,8 @@ async def create_questions_batch(batch_request: BatchQuestionCreate, db: Supabas
                 errors.append(f"题目 {i+1}: {str(e)}")
                 failed_count += 1
         
+        if success_count:
+            invalidate_shared_cache(shared_cache, "question")
         return BatchQuestionResponse(
             success_count=success_count,
             failed_count=failed_count,
@@ -433,86 +225,3 @@ async def create_questions_batch(batch_request: BatchQuestionCreate, db: Supabas
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-@router.put("/questions/{question_id}", response_model=QuestionResponse)
-async def update_question(question_id: int, question: QuestionCreate, db: SupabaseHandler = Depends(get_db_handler)):
-    """更新题目信息"""
-    try:
-        result = db.update_data("question", question.dict(), {"id": question_id})
-        if not result:
-            raise HTTPException(status_code=404, detail="题目不存在")
-        return result[0]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.delete("/questions/{question_id}")
-async def delete_question(question_id: int, db: SupabaseHandler = Depends(get_db_handler)):
-    """删除题目"""
-    try:
-        result = db.delete_data("question", {"id": question_id})
-        return {"message": "题目删除成功"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-# ==================== Question Knowledge Points 表 CRUD ====================
-
-@router.get("/question_knowledge_points", response_model=List[QuestionKnowledgePointResponse])
-async def get_question_knowledge_points(db: SupabaseHandler = Depends(get_db_handler)):
-    """获取所有题目知识点关联"""
-    try:
-        result = db.select_data("question_knowledge_point")
-        return result if result is not None else []
-    except Exception as e:
-        # 如果表不存在，返回空数组
-        return []
-
-@router.get("/question_knowledge_points/{relation_id}", response_model=QuestionKnowledgePointResponse)
-async def get_question_knowledge_point(relation_id: int, db: SupabaseHandler = Depends(get_db_handler)):
-    """根据 ID 获取题目知识点关联"""
-    try:
-        result = db.select_data("question_knowledge_point", filters={"id": relation_id})
-        if not result:
-            raise HTTPException(status_code=404, detail="题目知识点关联不存在")
-        return result[0]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.post("/question_knowledge_points", response_model=QuestionKnowledgePointResponse)
-async def create_question_knowledge_point(relation: QuestionKnowledgePointCreate, db: SupabaseHandler = Depends(get_db_handler)):
-    """创建新题目知识点关联"""
-    try:
-        relation_data = relation.dict()
-        # 如果包含id字段，先检查是否已存在
-        if 'id' in relation_data and relation_data['id'] is not None:
-            existing = db.select_data("question_knowledge_point", filters={"id": relation_data['id']})
-            if existing:
-                raise HTTPException(status_code=400, detail=f"题目知识点关联ID {relation_data['id']} 已存在")
-        
-        result = db.insert_data("question_knowledge_point", relation_data)
-        if not result:
-            raise HTTPException(status_code=500, detail="创建题目知识点关联失败")
-        return result[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.put("/question_knowledge_points/{relation_id}", response_model=QuestionKnowledgePointResponse)
-async def update_question_knowledge_point(relation_id: int, relation: QuestionKnowledgePointCreate, db: SupabaseHandler = Depends(get_db_handler)):
-    """更新题目知识点关联信息"""
-    try:
-        result = db.update_data("question_knowledge_point", relation.dict(), {"id": relation_id})
-        if not result:
-            raise HTTPException(status_code=404, detail="题目知识点关联不存在")
-        return result[0]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.delete("/question_knowledge_points/{relation_id}")
-async def delete_question_knowledge_point(relation_id: int, db: SupabaseHandler = Depends(get_db_handler)):
-    """删除题目知识点关联"""
-    try:
-        result = db.delete_data("question_knowledge_point", {"id": relation_id})
-        return {"message": "题目知识点关联删除成功"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
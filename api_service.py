@@ -6,21 +6,26 @@ API服务模块
 """
 
 import os
-from typing import List, Dict, Any, Optional
+import hmac
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Iterable, Union
+import streamlit as st
 from fastapi import HTTPException
 
 # 导入本地模块
-from models import (
-    UserCreate, UserUpdate, UserResponse,
-    StudentCreate, StudentUpdate, StudentResponse,
-    ExamPaperCreate, ExamPaperUpdate, ExamPaperResponse,
-    ExamPaperImageCreate, ExamPaperImageUpdate, ExamPaperImageResponse,
-    KnowledgePointCreate, KnowledgePointUpdate, KnowledgePointResponse,
-    QuestionCreate, QuestionUpdate, QuestionResponse,
-    QuestionKnowledgePointCreate, QuestionKnowledgePointUpdate, QuestionKnowledgePointResponse,
-    BatchQuestionCreate
-)
-from supabase_handler import SupabaseHandler
+from models import BatchQuestionCreate
+from resource_registry import RESOURCES, ResourceSpec, hash_password, is_password_hash
+from supabase_handler import SupabaseHandler, SYNC_WATERMARK_COLUMNS
+from local_replica import create_local_replica
+from table_snapshot import TableSnapshot
+from realtime_sync import create_change_subscriber, REALTIME_TABLES
+from single_flight import SingleFlight, make_key
+from bulk_operations import bulk_create, bulk_update, bulk_delete
+from instrumentation import record_api_request
+from tracing import trace_span, bind_context
+from swr_cache import expire_page_caches
+from shared_cache import create_shared_cache
 
 # 初始化数据库处理器
 db_handler = SupabaseHandler()
@@ -28,296 +33,245 @@ db_handler = SupabaseHandler()
 class APIService:
     """API服务类，提供所有数据操作接口"""
     
-    def __init__(self):
-        self.db = db_handler
+    def __init__(self, db: SupabaseHandler = None):
+        self.db = db or db_handler
+        # 可选的本地只读副本，未配置时为 None，所有读取直接访问 Supabase
+        self.replica = create_local_replica(self.db)
+        # 未配置本地副本时，整表读取使用进程内快照，只增量拉取变更
+        self.snapshots: Dict[str, TableSnapshot] = {}
+        # 可选的跨进程共享缓存，配置后多个副本共享读取结果，不再各自维护整表快照
+        self.shared_cache = create_shared_cache()
+        # 可选的实时变更订阅，订阅生效期间快照不再轮询增量
+        self.realtime_live = False
+        self.change_subscriber = create_change_subscriber(self.apply_change, self._set_realtime_live)
+        # 相同表和过滤条件的并发读取合并为一次查询
+        self.read_flight = SingleFlight()
+        # fetch_many 并发读取使用的线程池
+        self.fetch_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="api-fetch")
+        if self.change_subscriber is not None:
+            self.change_subscriber.start()
+    
+    def _snapshot(self, table_name: str) -> TableSnapshot:
+        """获取表快照，首次访问时创建"""
+        snapshot = self.snapshots.get(table_name)
+        if snapshot is None:
+            snapshot = self.snapshots.setdefault(
+                table_name,
+                TableSnapshot(table_name, self.db, watermark_column=SYNC_WATERMARK_COLUMNS.get(table_name))
+            )
+            if table_name in REALTIME_TABLES:
+                snapshot.set_live(self.realtime_live)
+        return snapshot
+    
+    def _set_realtime_live(self, live: bool):
+        """实时订阅状态变化时切换快照的刷新方式"""
+        self.realtime_live = live
+        for table_name, snapshot in list(self.snapshots.items()):
+            if table_name in REALTIME_TABLES:
+                snapshot.set_live(live)
+    
+    def apply_change(self, table_name: str, event_type: str,
+                     record: Optional[Dict[str, Any]], old_record: Optional[Dict[str, Any]]):
+        """应用一条实时变更到快照和本地副本"""
+        if event_type in ("INSERT", "UPDATE") and record:
+            self._write_through(table_name, [record])
+        elif event_type == "DELETE" and old_record and "id" in old_record:
+            self._delete_through(table_name, old_record["id"])
+        else:
+            return
+        # 依赖该表的页面缓存标记为过期，下一次 rerun 仍立即返回旧结果，并在后台从最新快照刷新
+        expire_page_caches(table_name)
+    
+    def _select(self, table_name: str, filters: dict = None) -> Optional[List[Dict[str, Any]]]:
+        """读取数据，并发的相同读取共享同一次查询结果"""
+        return self.read_flight.do(make_key(table_name, filters=filters),
+                                   lambda: self._select_uncoalesced(table_name, filters))
+    
+    def _select_uncoalesced(self, table_name: str, filters: dict = None) -> Optional[List[Dict[str, Any]]]:
+        """读取数据，配置了本地副本时从副本读取，其次使用共享缓存，整表读取使用增量快照"""
+        if self.replica is not None:
+            return self.replica.select(table_name, filters)
+        if self.shared_cache is not None:
+            return self.shared_cache.get_or_load(table_name, filters,
+                                                 lambda: self._read_from_db(table_name, filters))
+        if not filters:
+            return self._snapshot(table_name).rows()
+        rows = self.db.select_data(table_name, filters=filters)
+        if rows is None and table_name in self.snapshots:
+            # Supabase 暂时不可用（断路器打开或重试耗尽）时用已加载的快照回答
+            cached = self.snapshots[table_name].loaded_rows()
+            if cached is not None:
+                return [row for row in cached if all(row.get(column) == value for column, value in filters.items())]
+        return rows
+    
+    def _read_from_db(self, table_name: str, filters: dict = None) -> Optional[List[Dict[str, Any]]]:
+        """直接从 Supabase 读取，整表分页读取，出错时返回 None"""
+        if filters:
+            return self.db.select_data(table_name, filters=filters)
+        try:
+            return [row for page in self.db.iter_pages(table_name) for row in page]
+        except RuntimeError as e:
+            print(f"读取 {table_name} 时出错: {e}")
+            return None
     
-    # Users API
-    def get_users(self) -> List[Dict[str, Any]]:
-        """获取所有用户"""
-        try:
-            result = self.db.select_data("user")
+    def fetch_rows_by_ids(self, table_name: str, ids: List[int]) -> Optional[List[Dict[str, Any]]]:
+        """
+        按 ID 批量读取，供 BatchLoader 使用；已加载的快照直接命中，否则发起一次 in 查询
+
+        Args:
+            table_name: 表名
+            ids: ID 列表
+
+        Returns:
+            list: 存在的行，出错时返回 None
+        """
+        try:
+            if self.replica is not None:
+                return self.replica.select_in(table_name, "id", ids)
+            snapshot = self.snapshots.get(table_name)
+            cached = snapshot.get_many(ids) if snapshot is not None else None
+            if cached is not None:
+                return list(cached.values())
+            return self.read_flight.do(make_key(table_name, "in", tuple(ids)),
+                                       lambda: self.db.select_in(table_name, "id", ids))
+        except Exception as e:
+            print(f"按 ID 批量读取 {table_name} 时出错: {e}")
+            return None
+    
+    def _write_through(self, table_name: str, rows: Optional[List[Dict[str, Any]]]):
+        """写操作成功后同步更新本地副本和快照并使共享缓存失效，保证页面刷新后立即看到修改"""
+        if not rows:
+            return
+        if self.replica is not None:
+            self.replica.upsert_rows(table_name, rows)
+        if table_name in self.snapshots:
+            self.snapshots[table_name].upsert(rows)
+        if self.shared_cache is not None:
+            self.shared_cache.invalidate(table_name)
+    
+    def _delete_through(self, table_name: str, row_id: int):
+        """删除操作成功后同步删除本地副本和快照中的行，并使共享缓存失效"""
+        if self.replica is not None:
+            self.replica.delete_row(table_name, row_id)
+        if table_name in self.snapshots:
+            self.snapshots[table_name].delete(row_id)
+        if self.shared_cache is not None:
+            self.shared_cache.invalidate(table_name)
+    
+    # ==================== 通用 CRUD ====================
+    
+    def list_items(self, spec: ResourceSpec) -> List[Dict[str, Any]]:
+        """获取资源的所有记录"""
+        try:
+            result = self._select(spec.table)
             return result if result is not None else []
         except Exception as e:
             return []
     
-    def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
-        """根据ID获取用户"""
+    def get_item(self, spec: ResourceSpec, item_id: int) -> Optional[Dict[str, Any]]:
+        """根据ID获取单条记录"""
         try:
-            result = self.db.select_data("user", filters={"id": user_id})
+            result = self._select(spec.table, filters={"id": item_id})
             return result[0] if result else None
         except Exception as e:
             return None
     
-    def create_user(self, user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """创建用户"""
+    def create_item(self, spec: ResourceSpec, item_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """校验并创建一条记录"""
         try:
-            user = UserCreate(**user_data)
-            result = self.db.insert_data("user", user.model_dump())
+            write_data = spec.create_model(**item_data).model_dump()
+            if spec.prepare_write:
+                write_data = spec.prepare_write(write_data)
+            result = self.db.insert_data(spec.table, write_data)
+            self._write_through(spec.table, result)
             return result[0] if result else None
         except Exception as e:
             return None
     
-    def update_user(self, user_id: int, user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """更新用户"""
+    def update_item(self, spec: ResourceSpec, item_id: int, item_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """校验并更新一条记录，只写入提供的字段"""
         try:
-            user = UserUpdate(**user_data)
-            result = self.db.update_data("user", user.model_dump(exclude_unset=True), {"id": user_id})
+            write_data = spec.update_model(**item_data).model_dump(exclude_unset=True)
+            if spec.prepare_write:
+                write_data = spec.prepare_write(write_data)
+            result = self.db.update_data(spec.table, write_data, {"id": item_id})
+            self._write_through(spec.table, result)
             return result[0] if result else None
         except Exception as e:
             return None
     
-    def delete_user(self, user_id: int) -> bool:
-        """删除用户"""
+    def delete_item(self, spec: ResourceSpec, item_id: int) -> bool:
+        """删除一条记录"""
         try:
-            result = self.db.delete_data("user", {"id": user_id})
+            result = self.db.delete_data(spec.table, {"id": item_id})
+            if result is not None:
+                self._delete_through(spec.table, item_id)
             return result is not None
         except Exception as e:
             return False
     
+    def bulk_create_items(self, spec: ResourceSpec, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """分块批量创建记录，返回每条记录的处理结果"""
+        result = bulk_create(self.db, spec, items)
+        self._write_through(spec.table, [r["data"] for r in result["results"] if r["success"]])
+        return result
+    
+    def bulk_update_items(self, spec: ResourceSpec, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """批量更新记录（每条包含 id），返回每条记录的处理结果"""
+        result = bulk_update(self.db, spec, items)
+        self._write_through(spec.table, [r["data"] for r in result["results"] if r["success"]])
+        return result
+    
+    def bulk_delete_items(self, spec: ResourceSpec, ids: List[int]) -> Dict[str, Any]:
+        """批量删除记录，返回每条记录的处理结果"""
+        result = bulk_delete(self.db, spec, ids)
+        for r in result["results"]:
+            if r["success"]:
+                self._delete_through(spec.table, r["id"])
+        return result
+    
+    def fetch_many(self, resources: Iterable[Union[str, ResourceSpec]]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        并发读取多个资源的全部记录，页面初始化的耗时取决于最慢的一次读取而不是所有读取之和
+
+        Args:
+            resources: 资源名或资源定义列表，例如 ["students", "exam_papers"]
+
+        Returns:
+            dict: 资源名 -> 记录列表，读取失败的资源为空列表
+        """
+        specs = [RESOURCES[r] if isinstance(r, str) else r for r in resources]
+        # 线程池中的查询 span 归属于当前的 span
+        list_items = bind_context(self.list_items)
+        futures = {spec.name: self.fetch_pool.submit(list_items, spec) for spec in specs}
+        return {name: future.result() for name, future in futures.items()}
+    
+    # ==================== 专用接口 ====================
+    
     def authenticate_user(self, username: str, password: str) -> Optional[Dict[str, Any]]:
         """验证用户登录凭据"""
         try:
-            print(f"[DEBUG] 尝试验证用户: {username}")
             # 根据用户名查询用户
             result = self.db.select_data("user", filters={"username": username})
-            print(f"[DEBUG] 数据库查询结果: {result}")
-            
             if not result:
-                print(f"[DEBUG] 未找到用户: {username}")
                 return None
             
             user = result[0]
-            print(f"[DEBUG] 找到用户: {user.get('username')}, ID: {user.get('id')}")
-            print(f"[DEBUG] 数据库密码哈希: {user.get('password_hash')}")
-            print(f"[DEBUG] 输入密码: {password}")
-            
-            # 这里应该使用密码哈希验证，但为了简化，先直接比较
-            # 在生产环境中应该使用bcrypt等库进行密码哈希验证
-            if user.get("password_hash") == password:
-                print(f"[DEBUG] 密码验证成功")
-                return user
+            # 通过 API 创建的用户保存 sha256 哈希（见 resource_registry.hash_password），
+            # 早期直接写入数据库的用户保存的是原始密码；已是哈希的值只与输入的哈希比较，
+            # 否则哈希本身（副本和共享缓存中都有）就能当作密码登录
+            stored = user.get("password_hash") or ""
+            if is_password_hash(stored):
+                expected = hash_password(password)
             else:
-                print(f"[DEBUG] 密码验证失败")
+                expected = password
+            if hmac.compare_digest(stored.encode(), expected.encode()):
+                return user
             return None
         except Exception as e:
             print(f"[ERROR] 验证用户时发生异常: {e}")
             return None
     
-    # Students API
-    def get_students(self) -> List[Dict[str, Any]]:
-        """获取所有学生"""
-        try:
-            result = self.db.select_data("student")
-            return result if result is not None else []
-        except Exception as e:
-            return []
-    
-    def get_student(self, student_id: int) -> Optional[Dict[str, Any]]:
-        """根据ID获取学生"""
-        try:
-            result = self.db.select_data("student", filters={"id": student_id})
-            return result[0] if result else None
-        except Exception as e:
-            return None
-    
-    def create_student(self, student_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """创建学生"""
-        try:
-            student = StudentCreate(**student_data)
-            result = self.db.insert_data("student", student.model_dump())
-            return result[0] if result else None
-        except Exception as e:
-            return None
-    
-    def update_student(self, student_id: int, student_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """更新学生"""
-        try:
-            student = StudentUpdate(**student_data)
-            result = self.db.update_data("student", student.model_dump(exclude_unset=True), {"id": student_id})
-            return result[0] if result else None
-        except Exception as e:
-            return None
-    
-    def delete_student(self, student_id: int) -> bool:
-        """删除学生"""
-        try:
-            result = self.db.delete_data("student", {"id": student_id})
-            return result is not None
-        except Exception as e:
-            return False
-    
-    # Exam Papers API
-    def get_exam_papers(self) -> List[Dict[str, Any]]:
-        """获取所有试卷"""
-        try:
-            result = self.db.select_data("exam_paper")
-            return result if result is not None else []
-        except Exception as e:
-            return []
-    
-    def get_exam_paper(self, paper_id: int) -> Optional[Dict[str, Any]]:
-        """根据ID获取试卷"""
-        try:
-            result = self.db.select_data("exam_paper", filters={"id": paper_id})
-            return result[0] if result else None
-        except Exception as e:
-            return None
-    
-    def create_exam_paper(self, paper_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """创建试卷"""
-        try:
-            paper = ExamPaperCreate(**paper_data)
-            result = self.db.insert_data("exam_paper", paper.model_dump())
-            return result[0] if result else None
-        except Exception as e:
-            return None
-    
-    def update_exam_paper(self, paper_id: int, paper_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """更新试卷"""
-        try:
-            paper = ExamPaperUpdate(**paper_data)
-            result = self.db.update_data("exam_paper", paper.model_dump(exclude_unset=True), {"id": paper_id})
-            return result[0] if result else None
-        except Exception as e:
-            return None
-    
-    def delete_exam_paper(self, paper_id: int) -> bool:
-        """删除试卷"""
-        try:
-            result = self.db.delete_data("exam_paper", {"id": paper_id})
-            return result is not None
-        except Exception as e:
-            return False
-    
-    # Exam Paper Images API
-    def get_exam_paper_images(self) -> List[Dict[str, Any]]:
-        """获取所有试卷图片"""
-        try:
-            result = self.db.select_data("exam_paper_image")
-            return result if result is not None else []
-        except Exception as e:
-            return []
-    
-    def get_exam_paper_image(self, image_id: int) -> Optional[Dict[str, Any]]:
-        """根据ID获取试卷图片"""
-        try:
-            result = self.db.select_data("exam_paper_image", filters={"id": image_id})
-            return result[0] if result else None
-        except Exception as e:
-            return None
-    
-    def create_exam_paper_image(self, image_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """创建试卷图片"""
-        try:
-            image = ExamPaperImageCreate(**image_data)
-            result = self.db.insert_data("exam_paper_image", image.model_dump())
-            return result[0] if result else None
-        except Exception as e:
-            return None
-    
-    def update_exam_paper_image(self, image_id: int, image_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """更新试卷图片"""
-        try:
-            image = ExamPaperImageUpdate(**image_data)
-            result = self.db.update_data("exam_paper_image", image.model_dump(exclude_unset=True), {"id": image_id})
-            return result[0] if result else None
-        except Exception as e:
-            return None
-    
-    def delete_exam_paper_image(self, image_id: int) -> bool:
-        """删除试卷图片"""
-        try:
-            result = self.db.delete_data("exam_paper_image", {"id": image_id})
-            return result is not None
-        except Exception as e:
-            return False
-    
-    # Knowledge Points API
-    def get_knowledge_points(self) -> List[Dict[str, Any]]:
-        """获取所有知识点"""
-        try:
-            result = self.db.select_data("knowledge_point")
-            return result if result is not None else []
-        except Exception as e:
-            return []
-    
-    def get_knowledge_point(self, point_id: int) -> Optional[Dict[str, Any]]:
-        """根据ID获取知识点"""
-        try:
-            result = self.db.select_data("knowledge_point", filters={"id": point_id})
-            return result[0] if result else None
-        except Exception as e:
-            return None
-    
-    def create_knowledge_point(self, point_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """创建知识点"""
-        try:
-            point = KnowledgePointCreate(**point_data)
-            result = self.db.insert_data("knowledge_point", point.model_dump())
-            return result[0] if result else None
-        except Exception as e:
-            return None
-    
-    def update_knowledge_point(self, point_id: int, point_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """更新知识点"""
-        try:
-            point = KnowledgePointUpdate(**point_data)
-            result = self.db.update_data("knowledge_point", point.model_dump(exclude_unset=True), {"id": point_id})
-            return result[0] if result else None
-        except Exception as e:
-            return None
-    
-    def delete_knowledge_point(self, point_id: int) -> bool:
-        """删除知识点"""
-        try:
-            result = self.db.delete_data("knowledge_point", {"id": point_id})
-            return result is not None
-        except Exception as e:
-            return False
-    
-    # Questions API
-    def get_questions(self) -> List[Dict[str, Any]]:
-        """获取所有题目"""
-        try:
-            result = self.db.select_data("question")
-            return result if result is not None else []
-        except Exception as e:
-            return []
-    
-    def get_question(self, question_id: int) -> Optional[Dict[str, Any]]:
-        """根据ID获取题目"""
-        try:
-            result = self.db.select_data("question", filters={"id": question_id})
-            return result[0] if result else None
-        except Exception as e:
-            return None
-    
-    def create_question(self, question_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """创建题目"""
-        try:
-            question = QuestionCreate(**question_data)
-            result = self.db.insert_data("question", question.model_dump())
-            return result[0] if result else None
-        except Exception as e:
-            return None
-    
-    def update_question(self, question_id: int, question_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """更新题目"""
-        try:
-            question = QuestionUpdate(**question_data)
-            result = self.db.update_data("question", question.model_dump(exclude_unset=True), {"id": question_id})
-            return result[0] if result else None
-        except Exception as e:
-            return None
-    
-    def delete_question(self, question_id: int) -> bool:
-        """删除题目"""
-        try:
-            result = self.db.delete_data("question", {"id": question_id})
-            return result is not None
-        except Exception as e:
-            return False
-    
     def create_questions_batch(self, batch_data: Dict[str, Any]) -> Dict[str, Any]:
         """批量创建题目"""
         try:
@@ -335,6 +289,7 @@ class APIService:
                     question_dict["image_id"] = batch_request.image_id
                     
                     result = self.db.insert_data("question", question_dict)
+                    self._write_through("question", result)
                     if result:
                         success_count += 1
                     else:
@@ -355,188 +310,94 @@ class APIService:
                 "failed_count": len(batch_data.get("questions", [])),
                 "errors": [f"Batch creation failed: {str(e)}"]
             }
-    
-    # Question Knowledge Points API
-    def get_question_knowledge_points(self) -> List[Dict[str, Any]]:
-        """获取所有题目知识点关联"""
-        try:
-            result = self.db.select_data("question_knowledge_point")
-            return result if result is not None else []
-        except Exception as e:
-            return []
-    
-    def get_question_knowledge_point(self, relation_id: int) -> Optional[Dict[str, Any]]:
-        """根据ID获取题目知识点关联"""
-        try:
-            result = self.db.select_data("question_knowledge_point", filters={"id": relation_id})
-            return result[0] if result else None
-        except Exception as e:
-            return None
-    
-    def create_question_knowledge_point(self, relation_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """创建题目知识点关联"""
-        try:
-            relation = QuestionKnowledgePointCreate(**relation_data)
-            result = self.db.insert_data("question_knowledge_point", relation.model_dump())
-            return result[0] if result else None
-        except Exception as e:
-            return None
-    
-    def update_question_knowledge_point(self, relation_id: int, relation_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """更新题目知识点关联"""
-        try:
-            relation = QuestionKnowledgePointUpdate(**relation_data)
-            result = self.db.update_data("question_knowledge_point", relation.model_dump(exclude_unset=True), {"id": relation_id})
-            return result[0] if result else None
-        except Exception as e:
-            return None
-    
-    def delete_question_knowledge_point(self, relation_id: int) -> bool:
-        """删除题目知识点关联"""
-        try:
-            result = self.db.delete_data("question_knowledge_point", {"id": relation_id})
-            return result is not None
-        except Exception as e:
-            return False
 
 # 创建全局API服务实例
 api_service = APIService()
 
+# make_api_request 的处理函数，参数为 (资源定义, 资源ID, 请求数据)
+def _handle_list(spec: ResourceSpec, resource_id: Optional[int], data: Dict) -> Dict:
+    return {"success": True, "data": api_service.list_items(spec)}
+
+def _handle_get(spec: ResourceSpec, resource_id: Optional[int], data: Dict) -> Dict:
+    result = api_service.get_item(spec, resource_id)
+    if result is not None:
+        return {"success": True, "data": result}
+    return {"success": False, "error": "Resource not found"}
+
+def _handle_create(spec: ResourceSpec, resource_id: Optional[int], data: Dict) -> Dict:
+    result = api_service.create_item(spec, data)
+    if result is not None:
+        return {"success": True, "data": result}
+    return {"success": False, "error": "Failed to create resource"}
+
+def _handle_update(spec: ResourceSpec, resource_id: Optional[int], data: Dict) -> Dict:
+    result = api_service.update_item(spec, resource_id, data)
+    if result is not None:
+        return {"success": True, "data": result}
+    return {"success": False, "error": "Failed to update resource"}
+
+def _handle_delete(spec: ResourceSpec, resource_id: Optional[int], data: Dict) -> Dict:
+    if api_service.delete_item(spec, resource_id):
+        return {"success": True, "data": {"message": "Resource deleted successfully"}}
+    return {"success": False, "error": "Failed to delete resource"}
+
+# (请求方法, 是否带资源ID) -> 处理函数
+REQUEST_HANDLERS = {
+    ("GET", False): _handle_list,
+    ("GET", True): _handle_get,
+    ("POST", False): _handle_create,
+    ("PUT", True): _handle_update,
+    ("DELETE", True): _handle_delete,
+}
+
+# 批量操作: 请求方法 -> 处理函数，endpoint 为 "resource/bulk"
+# POST/PUT 的请求数据为记录列表，DELETE 的请求数据为 ID 列表
+BULK_HANDLERS = {
+    "POST": lambda spec, data: api_service.bulk_create_items(spec, data),
+    "PUT": lambda spec, data: api_service.bulk_update_items(spec, data),
+    "DELETE": lambda spec, data: api_service.bulk_delete_items(spec, data),
+}
+
+# 资源的附加操作: (请求方法, endpoint) -> 处理函数
+ACTION_HANDLERS = {
+    ("POST", "questions/batch"): lambda data: {"success": True, "data": api_service.create_questions_batch(data)},
+}
+
 # 兼容性函数，模拟原来的API调用格式
 def make_api_request(method: str, endpoint: str, data: Dict = None) -> Dict:
-    """兼容原来的API请求格式"""
+    """兼容原来的API请求格式，按资源记录调用耗时"""
+    resource = endpoint.partition('/')[0]
+    if resource not in RESOURCES and (method, endpoint) not in ACTION_HANDLERS:
+        resource = "unknown"
+    with trace_span("make_api_request", {"ladr.method": method, "ladr.resource": resource,
+                                         "ladr.endpoint": endpoint}) as span:
+        started = time.perf_counter()
+        result = _dispatch_api_request(method, endpoint, data)
+        record_api_request(resource, method, result.get("success", False), time.perf_counter() - started)
+        span.set_attribute("ladr.success", bool(result.get("success", False)))
+        if isinstance(result.get("data"), list):
+            span.set_attribute("ladr.rows", len(result["data"]))
+    return result
+
+def _dispatch_api_request(method: str, endpoint: str, data: Dict = None) -> Dict:
     try:
-        # 解析endpoint
-        parts = endpoint.split('/')
-        resource = parts[0]
-        
-        if method == "GET":
-            if len(parts) == 1:
-                # 获取所有资源
-                if resource == "users":
-                    result = api_service.get_users()
-                elif resource == "students":
-                    result = api_service.get_students()
-                elif resource == "exam_papers":
-                    result = api_service.get_exam_papers()
-                elif resource == "exam_paper_images":
-                    result = api_service.get_exam_paper_images()
-                elif resource == "knowledge_points":
-                    result = api_service.get_knowledge_points()
-                elif resource == "questions":
-                    result = api_service.get_questions()
-                elif resource == "question_knowledge_points":
-                    result = api_service.get_question_knowledge_points()
-                else:
-                    return {"success": False, "error": f"Unknown resource: {resource}"}
-                return {"success": True, "data": result}
-            elif len(parts) == 2:
-                # 根据ID获取单个资源
-                resource_id = int(parts[1])
-                if resource == "users":
-                    result = api_service.get_user(resource_id)
-                elif resource == "students":
-                    result = api_service.get_student(resource_id)
-                elif resource == "exam_papers":
-                    result = api_service.get_exam_paper(resource_id)
-                elif resource == "exam_paper_images":
-                    result = api_service.get_exam_paper_image(resource_id)
-                elif resource == "knowledge_points":
-                    result = api_service.get_knowledge_point(resource_id)
-                elif resource == "questions":
-                    result = api_service.get_question(resource_id)
-                elif resource == "question_knowledge_points":
-                    result = api_service.get_question_knowledge_point(resource_id)
-                else:
-                    return {"success": False, "error": f"Unknown resource: {resource}"}
-                
-                if result is not None:
-                    return {"success": True, "data": result}
-                else:
-                    return {"success": False, "error": "Resource not found"}
-        
-        elif method == "POST":
-            if len(parts) == 1:
-                # 创建资源
-                if resource == "users":
-                    result = api_service.create_user(data)
-                elif resource == "students":
-                    result = api_service.create_student(data)
-                elif resource == "exam_papers":
-                    result = api_service.create_exam_paper(data)
-                elif resource == "exam_paper_images":
-                    result = api_service.create_exam_paper_image(data)
-                elif resource == "knowledge_points":
-                    result = api_service.create_knowledge_point(data)
-                elif resource == "questions":
-                    result = api_service.create_question(data)
-                elif resource == "question_knowledge_points":
-                    result = api_service.create_question_knowledge_point(data)
-                else:
-                    return {"success": False, "error": f"Unknown resource: {resource}"}
-                
-                if result is not None:
-                    return {"success": True, "data": result}
-                else:
-                    return {"success": False, "error": "Failed to create resource"}
-            elif len(parts) == 2 and parts[1] == "batch" and resource == "questions":
-                # 批量创建题目
-                result = api_service.create_questions_batch(data)
-                return {"success": True, "data": result}
+        action = ACTION_HANDLERS.get((method, endpoint))
+        if action is not None:
+            return action(data)
         
-        elif method == "PUT":
-            if len(parts) == 2:
-                # 更新资源
-                resource_id = int(parts[1])
-                if resource == "users":
-                    result = api_service.update_user(resource_id, data)
-                elif resource == "students":
-                    result = api_service.update_student(resource_id, data)
-                elif resource == "exam_papers":
-                    result = api_service.update_exam_paper(resource_id, data)
-                elif resource == "exam_paper_images":
-                    result = api_service.update_exam_paper_image(resource_id, data)
-                elif resource == "knowledge_points":
-                    result = api_service.update_knowledge_point(resource_id, data)
-                elif resource == "questions":
-                    result = api_service.update_question(resource_id, data)
-                elif resource == "question_knowledge_points":
-                    result = api_service.update_question_knowledge_point(resource_id, data)
-                else:
-                    return {"success": False, "error": f"Unknown resource: {resource}"}
-                
-                if result is not None:
-                    return {"success": True, "data": result}
-                else:
-                    return {"success": False, "error": "Failed to update resource"}
+        # 解析endpoint: "resource" 或 "resource/id"
+        resource, _, resource_id = endpoint.partition('/')
+        spec = RESOURCES.get(resource)
+        if spec is None:
+            return {"success": False, "error": f"Unknown resource: {resource}"}
         
-        elif method == "DELETE":
-            if len(parts) == 2:
-                # 删除资源
-                resource_id = int(parts[1])
-                if resource == "users":
-                    result = api_service.delete_user(resource_id)
-                elif resource == "students":
-                    result = api_service.delete_student(resource_id)
-                elif resource == "exam_papers":
-                    result = api_service.delete_exam_paper(resource_id)
-                elif resource == "exam_paper_images":
-                    result = api_service.delete_exam_paper_image(resource_id)
-                elif resource == "knowledge_points":
-                    result = api_service.delete_knowledge_point(resource_id)
-                elif resource == "questions":
-                    result = api_service.delete_question(resource_id)
-                elif resource == "question_knowledge_points":
-                    result = api_service.delete_question_knowledge_point(resource_id)
-                else:
-                    return {"success": False, "error": f"Unknown resource: {resource}"}
-                
-                if result:
-                    return {"success": True, "data": {"message": "Resource deleted successfully"}}
-                else:
-                    return {"success": False, "error": "Failed to delete resource"}
+        if resource_id == "bulk" and method in BULK_HANDLERS:
+            return {"success": True, "data": BULK_HANDLERS[method](spec, data or [])}
         
-        return {"success": False, "error": f"Unsupported method or endpoint: {method} {endpoint}"}
+        handler = REQUEST_HANDLERS.get((method, bool(resource_id)))
+        if handler is None or '/' in resource_id:
+            return {"success": False, "error": f"Unsupported method or endpoint: {method} {endpoint}"}
+        return handler(spec, int(resource_id) if resource_id else None, data)
     
     except Exception as e:
         return {"success": False, "error": f"API request failed: {str(e)}"}
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置读取
+各模块的配置都读取 .streamlit/secrets.toml 中的对应段，没有该段时读取环境变量。
+secrets 段存在时整段生效，不再与环境变量合并。
+"""
+
+import os
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import streamlit as st
+
+
+def load_config(section: str, env_config: Optional[Dict[str, Tuple[str, Callable[[str], Any]]]] = None,
+                defaults: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    读取配置，secrets 的 [section] 段优先于环境变量
+
+    Args:
+        section: secrets 中的段名
+        env_config: 环境变量名 -> (配置项, 类型转换函数)
+        defaults: 默认配置，被 secrets 或环境变量中的值覆盖
+
+    Returns:
+        dict: 配置项，既没有 secrets 段也没有环境变量时只包含默认配置
+    """
+    config = dict(defaults or {})
+    try:
+        secrets_config = st.secrets.get(section)
+    except Exception:
+        secrets_config = None
+    if secrets_config:
+        config.update(dict(secrets_config))
+        return config
+    for name, (key, convert) in (env_config or {}).items():
+        if os.environ.get(name):
+            config[key] = convert(os.environ[name])
+    return config
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按 ID 批量加载
+在一次页面渲染或一次 API 请求内收集需要的 ID，每张表只发起一次 in_("id", ids) 查询，
+并缓存本次请求内已读取的行，避免逐条查询或为查几行而读整张表。
+
+用法:
+
+    loader = BatchLoader(api_service.fetch_rows_by_ids)
+    loader.prime("exam_paper_image", [q["image_id"] for q in questions])
+    for q in questions:
+        image = loader.load("exam_paper_image", q["image_id"])  # 第一次调用时一次性读取全部登记的 ID
+"""
+
+from typing import Callable, Dict, Any, Iterable, List, Optional, Set
+
+# 按 ID 批量读取: (表名, ID 列表) -> 数据行，出错时返回 None
+FetchByIds = Callable[[str, List[int]], Optional[List[Dict[str, Any]]]]
+
+
+class BatchLoader:
+    """单次请求内的按 ID 批量加载器，不跨请求共享"""
+
+    def __init__(self, fetch_by_ids: FetchByIds, max_batch_size: int = 200):
+        """
+        初始化加载器
+
+        Args:
+            fetch_by_ids: 按 ID 批量读取的函数
+            max_batch_size: 单次查询的最大 ID 数，避免请求 URL 过长
+        """
+        self.fetch_by_ids = fetch_by_ids
+        self.max_batch_size = max_batch_size
+        # 表名 -> {ID: 行}，不存在的 ID 缓存为 None
+        self._cache: Dict[str, Dict[int, Optional[Dict[str, Any]]]] = {}
+        # 表名 -> 已登记但尚未读取的 ID
+        self._pending: Dict[str, Set[int]] = {}
+        self.query_count = 0
+
+    def prime(self, table_name: str, ids: Iterable[Optional[int]]):
+        """
+        登记之后需要读取的 ID，在下一次 load 时与其他 ID 合并为一次查询
+
+        Args:
+            table_name: 表名
+            ids: ID 列表，空值会被忽略
+        """
+        cached = self._cache.get(table_name, {})
+        pending = self._pending.setdefault(table_name, set())
+        pending.update(row_id for row_id in ids if row_id is not None and row_id not in cached)
+
+    def dispatch(self, table_name: str):
+        """读取某张表所有已登记的 ID"""
+        ids = sorted(self._pending.pop(table_name, ()))
+        cache = self._cache.setdefault(table_name, {})
+        for start in range(0, len(ids), self.max_batch_size):
+            chunk = ids[start:start + self.max_batch_size]
+            self.query_count += 1
+            rows = self.fetch_by_ids(table_name, chunk)
+            if rows is None:
+                # 读取失败时不缓存，本次请求内的后续 load 会重试
+                continue
+            found = {row["id"]: row for row in rows}
+            for row_id in chunk:
+                cache[row_id] = found.get(row_id)
+
+    def load(self, table_name: str, row_id: Optional[int]) -> Optional[Dict[str, Any]]:
+        """
+        读取一行
+
+        Args:
+            table_name: 表名
+            row_id: ID
+
+        Returns:
+            dict: 数据行，不存在或读取失败时返回 None
+        """
+        if row_id is None:
+            return None
+        return self.load_many(table_name, [row_id])[0]
+
+    def load_many(self, table_name: str, ids: Iterable[Optional[int]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        读取多行，结果顺序与 ids 一致
+
+        Args:
+            table_name: 表名
+            ids: ID 列表
+
+        Returns:
+            list: 数据行，不存在或读取失败的位置为 None
+        """
+        ids = list(ids)
+        self.prime(table_name, ids)
+        if self._pending.get(table_name):
+            self.dispatch(table_name)
+        cache = self._cache.get(table_name, {})
+        return [cache.get(row_id) if row_id is not None else None for row_id in ids]
+
+    def clear(self, table_name: str = None):
+        """清除缓存，写操作之后调用"""
+        if table_name is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(table_name, None)
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内的 Supabase 客户端替身
+实现 SupabaseHandler 用到的 PostgREST 查询接口（select / insert / update / delete，
+eq / gt / in_ 过滤，order / range 分页），数据保存在内存中，可模拟每次请求的网络延迟。
+
+    from benchmarks.fake_supabase import FakeSupabaseClient
+    from supabase_handler import SupabaseHandler
+
+    client = FakeSupabaseClient(latency_ms=5)
+    client.load("student", [{"id": 1, "name": "张三"}])
+    db = SupabaseHandler(client=client)
+"""
+
+import copy
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+# 插入时自动填充的时间列
+TIMESTAMP_COLUMNS = {
+    "question": ["created_time", "updated_time"],
+    "question_knowledge_point": ["created_time"],
+    "exam_paper": ["created_time"],
+    "user": ["created_at"],
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FakeResponse:
+    def __init__(self, data: List[Dict[str, Any]]):
+        self.data = data
+
+
+class FakeTable:
+    """单张表的数据和按列的等值索引"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rows: Dict[int, Dict[str, Any]] = {}
+        self.next_id = 1
+        # 列名 -> {值: [ID]}，写入后失效
+        self._indexes: Dict[str, Dict[Any, List[int]]] = {}
+        # 查询条件和排序 -> 排好序的 ID，分页读取同一查询时复用，写入后失效
+        self.query_cache: Dict[tuple, List[int]] = {}
+
+    def index(self, column: str) -> Dict[Any, List[int]]:
+        index = self._indexes.get(column)
+        if index is None:
+            index = {}
+            for row_id, row in self.rows.items():
+                index.setdefault(row.get(column), []).append(row_id)
+            self._indexes[column] = index
+        return index
+
+    def invalidate(self):
+        self._indexes.clear()
+        self.query_cache.clear()
+
+
+class FakeQuery:
+    """PostgREST 查询构造器"""
+
+    def __init__(self, client: "FakeSupabaseClient", table: FakeTable):
+        self._client = client
+        self._table = table
+        self._action = "select"
+        self._columns = "*"
+        self._payload: Any = None
+        self._eq: List[tuple] = []
+        self._gt: List[tuple] = []
+        self._gte: List[tuple] = []
+        self._in: List[tuple] = []
+        self._order: List[tuple] = []
+        self._range: Optional[tuple] = None
+
+    # ---------- 操作 ----------
+
+    def select(self, columns: str = "*"):
+        self._action, self._columns = "select", columns
+        return self
+
+    def insert(self, data):
+        self._action, self._payload = "insert", data
+        return self
+
+    def update(self, data: Dict[str, Any]):
+        self._action, self._payload = "update", data
+        return self
+
+    def delete(self):
+        self._action = "delete"
+        return self
+
+    # ---------- 过滤和分页 ----------
+
+    def eq(self, column: str, value):
+        self._eq.append((column, value))
+        return self
+
+    def gt(self, column: str, value):
+        self._gt.append((column, value))
+        return self
+
+    def gte(self, column: str, value):
+        self._gte.append((column, value))
+        return self
+
+    def in_(self, column: str, values):
+        self._in.append((column, set(values)))
+        return self
+
+    def order(self, column: str, desc: bool = False):
+        self._order.append((column, desc))
+        return self
+
+    def range(self, start: int, end: int):
+        self._range = (start, end)
+        return self
+
+    # ---------- 执行 ----------
+
+    def _matching_ids(self) -> List[int]:
+        table = self._table
+        candidates = None
+        # 先用等值或 in 条件的索引缩小范围
+        for column, value in self._eq:
+            ids = set(table.index(column).get(value, ()))
+            candidates = ids if candidates is None else candidates & ids
+        for column, values in self._in:
+            index = table.index(column)
+            ids = {row_id for value in values for row_id in index.get(value, ())}
+            candidates = ids if candidates is None else candidates & ids
+        if candidates is None:
+            candidates = table.rows.keys()
+
+        matched = []
+        for row_id in candidates:
+            row = table.rows[row_id]
+            if all(row.get(column) is not None and row.get(column) > value for column, value in self._gt) and \
+                    all(row.get(column) is not None and row.get(column) >= value for column, value in self._gte):
+                matched.append(row_id)
+        return matched
+
+    def _project(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        # 各列都是标量，浅复制即可得到与 JSON 解码结果一样的独立对象
+        if self._columns.strip() == "*":
+            return dict(row)
+        return {column.strip(): row.get(column.strip()) for column in self._columns.split(",")}
+
+    def _sorted_ids(self) -> List[int]:
+        """满足条件的 ID，按排序列排序；多列排序从最后一列开始依次稳定排序，空值排在最后"""
+        key = (tuple(self._eq), tuple(self._gt), tuple(self._gte),
+               tuple((c, frozenset(v)) for c, v in self._in), tuple(self._order))
+        ids = self._table.query_cache.get(key)
+        if ids is None:
+            rows = self._table.rows
+            ids = sorted(self._matching_ids())
+            for column, desc in reversed(self._order):
+                if column == "id":
+                    ids.sort(reverse=desc)
+                    continue
+                ids.sort(key=lambda row_id: (rows[row_id].get(column) is None,
+                                             rows[row_id].get(column) if rows[row_id].get(column) is not None else 0),
+                         reverse=desc)
+            self._table.query_cache[key] = ids
+        return ids
+
+    def execute(self) -> FakeResponse:
+        self._client.simulate_latency()
+        with self._client.lock:
+            table = self._table
+            if self._action == "insert":
+                return FakeResponse(self._insert())
+            if self._action == "select":
+                ids = self._sorted_ids()
+                if self._range is not None:
+                    ids = ids[self._range[0]:self._range[1] + 1]
+                return FakeResponse([self._project(table.rows[row_id]) for row_id in ids])
+            ids = self._matching_ids()
+            if self._action == "update":
+                updated = []
+                for row_id in ids:
+                    row = table.rows[row_id]
+                    row.update(copy.deepcopy(self._payload))
+                    if "updated_time" in row:
+                        row["updated_time"] = _now()
+                    updated.append(copy.deepcopy(row))
+                table.invalidate()
+                return FakeResponse(updated)
+            if self._action == "delete":
+                deleted = [table.rows.pop(row_id) for row_id in ids]
+                table.invalidate()
+                return FakeResponse(deleted)
+        raise ValueError(f"不支持的操作: {self._action}")
+
+    def _insert(self) -> List[Dict[str, Any]]:
+        table = self._table
+        payload = self._payload if isinstance(self._payload, list) else [self._payload]
+        inserted = []
+        for data in payload:
+            row = copy.deepcopy(data)
+            row["id"] = table.next_id
+            table.next_id += 1
+            for column in TIMESTAMP_COLUMNS.get(table.name, []):
+                row.setdefault(column, _now())
+            table.rows[row["id"]] = row
+            inserted.append(copy.deepcopy(row))
+        table.invalidate()
+        return inserted
+
+
+class FakeSupabaseClient:
+    """与 supabase Client 的 table() 接口一致的内存客户端"""
+
+    def __init__(self, latency_ms: float = 0):
+        """
+        初始化客户端
+
+        Args:
+            latency_ms: 每次请求的模拟网络延迟（毫秒）
+        """
+        self.latency_ms = latency_ms
+        self.tables: Dict[str, FakeTable] = {}
+        self.lock = threading.RLock()
+        self.request_count = 0
+
+    def simulate_latency(self):
+        self.request_count += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def table(self, name: str) -> FakeQuery:
+        with self.lock:
+            table = self.tables.setdefault(name, FakeTable(name))
+        return FakeQuery(self, table)
+
+    def load(self, name: str, rows: List[Dict[str, Any]]):
+        """直接载入数据，不计请求次数，行必须包含 id"""
+        with self.lock:
+            table = self.tables.setdefault(name, FakeTable(name))
+            for row in rows:
+                table.rows[row["id"]] = row
+            table.next_id = max(table.rows, default=0) + 1
+            table.invalidate()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streamlit 页面渲染分析
+用 streamlit.testing.v1.AppTest 在合成数据上运行页面脚本，数据请求由进程内的 Supabase 替身响应，
+按阶段统计每次运行的耗时和内存分配，超出 page_budgets.json 中的预算时以退出码 1 结束。
+
+阶段划分（嵌套调用只计入最内层阶段）:
+    fetch      make_api_request、api_service.fetch_many / fetch_rows_by_ids
+    dataframe  pandas.DataFrame 构造
+    render     st.* 元素和组件调用（DeltaGenerator 的公开方法），包括其中的数据序列化
+    python     其余时间：页面中的筛选、关联等 Python 代码以及 AppTest 的脚本调度
+
+    python benchmarks/profile_pages.py
+    python benchmarks/profile_pages.py --pages pages/error_analysis.py --runs 10 --students 50
+"""
+
+import os
+import sys
+import json
+import time
+import inspect
+import argparse
+import functools
+import threading
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+# 添加父目录到路径以导入项目模块
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from benchmarks.fake_supabase import FakeSupabaseClient
+import supabase_handler
+
+# api_service 在导入时创建全局的数据库处理器，先切换到替身客户端，避免读取 secrets
+supabase_handler.use_client(FakeSupabaseClient())
+
+import pandas as pd
+import streamlit as st
+from streamlit.delta_generator import DeltaGenerator
+from streamlit.testing.v1 import AppTest
+
+import api_service as api_service_module
+from api_service import APIService
+from supabase_handler import SupabaseHandler
+from synthetic_data import SyntheticConfig, generate_batches
+from swr_cache import clear_page_caches
+
+PHASES = ["fetch", "dataframe", "render", "python"]
+DEFAULT_BUDGETS = os.path.join(ROOT_DIR, "benchmarks", "page_budgets.json")
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+
+# 内存分配按文件路径归入阶段
+ALLOCATION_PHASES = [
+    ("fetch", ("api_service.py", "supabase_handler.py", "table_snapshot.py", "local_replica.py",
+               "single_flight.py", "batch_loader.py", "fake_supabase.py", "concurrent/futures")),
+    ("dataframe", ("/pandas/", "/numpy/", "/pyarrow/")),
+    ("render", ("/streamlit/", "/google/protobuf/")),
+]
+
+
+_MISSING = object()
+
+
+class PhaseRecorder:
+    """按阶段累计耗时，嵌套调用只计入最内层阶段"""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def reset(self):
+        with self._lock:
+            self.totals.clear()
+            self.calls.clear()
+
+    def _add(self, phase: str, seconds: float):
+        with self._lock:
+            self.totals[phase] += seconds
+
+    def wrap(self, phase: str, fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            local = self._local
+            stack = getattr(local, "stack", None)
+            if stack is None:
+                stack = local.stack = []
+            now = time.perf_counter()
+            if stack:
+                self._add(stack[-1], now - local.mark)
+            stack.append(phase)
+            local.mark = now
+            with self._lock:
+                self.calls[phase] += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                now = time.perf_counter()
+                self._add(stack.pop(), now - local.mark)
+                local.mark = now
+        return wrapper
+
+
+@contextmanager
+def instrument(recorder: PhaseRecorder, service: APIService):
+    """在运行页面期间替换数据请求、DataFrame 构造和 st.* 调用为计时版本，退出时恢复"""
+    restore = []
+
+    def patch(owner, name: str, value):
+        # 实例上的方法原本不在实例字典中，恢复时删除即可
+        restore.append((owner, name, vars(owner).get(name, _MISSING)))
+        setattr(owner, name, value)
+
+    patch(api_service_module, "make_api_request", recorder.wrap("fetch", api_service_module.make_api_request))
+    for name in ("fetch_many", "fetch_rows_by_ids"):
+        patch(service, name, recorder.wrap("fetch", getattr(service, name)))
+    patch(pd.DataFrame, "__init__", recorder.wrap("dataframe", pd.DataFrame.__init__))
+
+    for name in dir(DeltaGenerator):
+        attr = inspect.getattr_static(DeltaGenerator, name)
+        if not name.startswith("_") and inspect.isfunction(attr):
+            patch(DeltaGenerator, name, recorder.wrap("render", attr))
+    # st.title 等是导入时绑定的 DeltaGenerator 方法，需要重新绑定到计时版本
+    for name, value in list(vars(st).items()):
+        if inspect.ismethod(value) and isinstance(value.__self__, DeltaGenerator) and not name.startswith("_"):
+            patch(st, name, getattr(value.__self__, name))
+    try:
+        yield recorder
+    finally:
+        for owner, name, original in reversed(restore):
+            if original is _MISSING:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+
+
+def allocation_phase(filename: str) -> str:
+    for phase, patterns in ALLOCATION_PHASES:
+        if any(pattern in filename for pattern in patterns):
+            return phase
+    return "python"
+
+
+# ==================== 页面运行 ====================
+
+def build_service(config: SyntheticConfig) -> tuple:
+    """生成合成数据并创建使用替身客户端的 APIService，页面通过模块级的 api_service 访问它"""
+    client = FakeSupabaseClient()
+    for batch in generate_batches(config):
+        for table_name, rows in batch.items():
+            client.load(table_name, rows)
+    service = APIService(db=SupabaseHandler(client=client))
+    api_service_module.api_service = service
+    return client, service
+
+
+def new_app(page: str, student: Dict[str, Any], timeout: float) -> AppTest:
+    app = AppTest.from_file(os.path.join(ROOT_DIR, page), default_timeout=timeout)
+    app.session_state["logged_in"] = True
+    app.session_state["selected_student"] = {"id": student["id"], "name": student["name"]}
+    return app
+
+
+def run_once(app: AppTest, recorder: PhaseRecorder) -> Dict[str, float]:
+    """运行一次页面脚本，返回各阶段耗时（毫秒）"""
+    recorder.reset()
+    started = time.perf_counter()
+    app.run()
+    total = (time.perf_counter() - started) * 1000
+    if app.exception:
+        raise RuntimeError(f"页面运行出错: {app.exception[0].value}")
+    timings = {f"{phase}_ms": recorder.totals.get(phase, 0.0) * 1000 for phase in PHASES if phase != "python"}
+    timings["python_ms"] = max(total - sum(timings.values()), 0.0)
+    timings["total_ms"] = total
+    timings["render_calls"] = recorder.calls.get("render", 0)
+    timings["fetch_calls"] = recorder.calls.get("fetch", 0)
+    return timings
+
+
+def median(values: List[float]) -> float:
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def summarize(runs: List[Dict[str, float]]) -> Dict[str, float]:
+    """各指标取中位数，另记录最慢一次的总耗时"""
+    summary = {key: round(median([run[key] for run in runs]), 3) for key in runs[0]}
+    summary["max_total_ms"] = round(max(run["total_ms"] for run in runs), 3)
+    return summary
+
+
+def measure_allocations(app: AppTest) -> Dict[str, Any]:
+    """用 tracemalloc 运行一次页面，按阶段统计净分配的内存块数和大小，以及分配峰值"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    app.run()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    blocks: Dict[str, int] = defaultdict(int)
+    size: Dict[str, int] = defaultdict(int)
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    for stat in after.filter_traces(filters).compare_to(before.filter_traces(filters), "filename"):
+        phase = allocation_phase(stat.traceback[0].filename)
+        blocks[phase] += stat.count_diff
+        size[phase] += stat.size_diff
+    return {
+        "peak_alloc_kb": round(peak / 1024, 1),
+        "net_blocks": {phase: blocks.get(phase, 0) for phase in PHASES},
+        "net_kb": {phase: round(size.get(phase, 0) / 1024, 1) for phase in PHASES},
+    }
+
+
+def profile_page(page: str, student: Dict[str, Any], service: APIService, runs: int,
+                 timeout: float) -> Dict[str, Any]:
+    """
+    分析一个页面
+
+    cold: 每次运行前清空页面缓存，数据经 make_api_request 重新读取
+    warm: 同一个会话连续重新运行，页面的缓存辅助函数直接命中
+
+    Returns:
+        dict: cold / warm 的各阶段耗时中位数和内存分配统计
+    """
+    recorder = PhaseRecorder()
+    with instrument(recorder, service):
+        cold_runs = []
+        for _ in range(runs):
+            clear_page_caches()
+            cold_runs.append(run_once(new_app(page, student, timeout), recorder))
+        app = new_app(page, student, timeout)
+        app.run()
+        warm_runs = [run_once(app, recorder) for _ in range(runs)]
+
+    clear_page_caches()
+    allocations = measure_allocations(new_app(page, student, timeout))
+    return {"page": page, "cold": summarize(cold_runs), "warm": summarize(warm_runs), **allocations}
+
+
+# ==================== 预算 ====================
+
+def check_budget(result: Dict[str, Any], budget: Dict[str, Any]) -> List[str]:
+    """
+    检查一个页面的结果是否超出预算
+
+    预算格式: {"cold": {"total_ms": 3000, "fetch_ms": 1000}, "warm": {"total_ms": 800}, "peak_alloc_kb": 80000}
+    cold / warm 中的指标与结果的中位数比较
+
+    Returns:
+        list: 超出预算的说明
+    """
+    violations = []
+    for mode in ("cold", "warm"):
+        for metric, limit in budget.get(mode, {}).items():
+            value = result[mode].get(metric)
+            if value is not None and value > limit:
+                violations.append(f"{mode}.{metric} = {value:.1f} > {limit}")
+    if "peak_alloc_kb" in budget and result["peak_alloc_kb"] > budget["peak_alloc_kb"]:
+        violations.append(f"peak_alloc_kb = {result['peak_alloc_kb']:.1f} > {budget['peak_alloc_kb']}")
+    return violations
+
+
+def print_result(result: Dict[str, Any]):
+    print(f"\n{result['page']}")
+    for mode in ("cold", "warm"):
+        timings = result[mode]
+        phases = "  ".join(f"{phase}={timings[f'{phase}_ms']:.1f}" for phase in PHASES)
+        print(f"  {mode:<5} total={timings['total_ms']:.1f}ms (max {timings['max_total_ms']:.1f})  {phases}  "
+              f"st调用={timings['render_calls']:.0f} 请求={timings['fetch_calls']:.0f}")
+    blocks = "  ".join(f"{phase}={result['net_blocks'][phase]}/{result['net_kb'][phase]:.0f}KB" for phase in PHASES)
+    print(f"  alloc peak={result['peak_alloc_kb']:.0f}KB  净分配 {blocks}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamlit 页面渲染分析")
+    parser.add_argument("--budgets", default=DEFAULT_BUDGETS, help="预算文件，同时指定数据规模和要分析的页面")
+    parser.add_argument("--pages", nargs="*", help="只分析这些页面，默认预算文件中的全部页面")
+    parser.add_argument("--students", type=int, help="学生数，默认取预算文件中的值")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--runs", type=int, default=5, help="cold / warm 各运行的次数")
+    parser.add_argument("--timeout", type=float, default=120, help="单次运行的超时（秒）")
+    parser.add_argument("--no-budget", action="store_true", help="只输出结果，不检查预算")
+    parser.add_argument("--output", help="结果 JSON 路径，默认 benchmarks/results/pages-<时间>.json")
+    args = parser.parse_args()
+
+    with open(args.budgets, encoding="utf-8") as f:
+        budgets = json.load(f)
+    dataset = dict(budgets.get("dataset", {}))
+    if args.students:
+        dataset["students"] = args.students
+    config = SyntheticConfig(seed=args.seed, **{key: tuple(value) if isinstance(value, list) else value
+                                                for key, value in dataset.items()})
+    pages = args.pages or list(budgets["pages"])
+
+    client, service = build_service(config)
+    student = next(iter(client.tables["student"].rows.values()))
+    print(f"数据规模: {config.estimated_rows()}")
+
+    results, failures = [], []
+    for page in pages:
+        result = profile_page(page, student, service, args.runs, args.timeout)
+        print_result(result)
+        if not args.no_budget:
+            violations = check_budget(result, budgets["pages"].get(page, {}))
+            result["budget_violations"] = violations
+            for violation in violations:
+                failures.append(f"{page}: {violation}")
+        results.append(result)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pages-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"dataset": dataset, "seed": args.seed, "runs": args.runs, "results": results},
+                  f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到 {output}")
+
+    if failures:
+        print("\n超出预算:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端基准测试
+使用进程内的 Supabase 替身（benchmarks/fake_supabase.py）和合成数据，
+测量 SupabaseHandler、APIService、make_api_request 以及 FastAPI 路由在不同数据规模下的
+p50/p95/p99 延迟、吞吐量和内存，结果保存为 JSON，可与之前的结果比较找出性能回退。
+
+    python benchmarks/run_benchmarks.py --scales 10,100,1000 --iterations 100
+    python benchmarks/run_benchmarks.py --latency-ms 5                      # 模拟网络延迟
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/baseline.json
+
+FastAPI 路由的测试需要安装 httpx（fastapi.testclient 依赖）。
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import random
+import argparse
+import platform
+import resource
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+# 添加父目录到路径以导入项目模块
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from benchmarks.fake_supabase import FakeSupabaseClient
+import supabase_handler
+
+# api_service 在导入时创建全局的数据库处理器，先切换到替身客户端，避免读取 secrets
+supabase_handler.use_client(FakeSupabaseClient())
+
+import api_service as api_service_module
+from api_service import APIService, make_api_request
+from resource_registry import RESOURCES
+from synthetic_data import SyntheticConfig, generate_batches
+from supabase_handler import SupabaseHandler
+
+DEFAULT_SCALES = [10, 100, 1000, 10000]
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+# 绝对变化小于该值（毫秒）时不算回退，避免亚毫秒级场景的计时抖动造成误报
+MIN_DELTA_MS = 0.05
+
+
+# ==================== 合成数据 ====================
+
+def dataset_config(students: int, seed: int = 0, realistic: bool = False) -> SyntheticConfig:
+    """
+    基准测试的数据规模，默认每个学生 2 张试卷、每张 10 道题，以便在一万个学生的规模下也能快速运行；
+    realistic 为 True 时使用 SyntheticConfig 的默认参数（每个学生 10~30 张试卷，每张 30~50 道题）
+    """
+    if realistic:
+        return SyntheticConfig(students=students, seed=seed)
+    return SyntheticConfig(students=students, seed=seed, papers_per_student=(2, 2), images_per_paper=(2, 2),
+                           questions_per_paper=(10, 10), knowledge_points=200, kps_per_question=(1, 1))
+
+
+# ==================== 测量 ====================
+
+def percentile(values: List[float], p: float) -> float:
+    """线性插值的百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def measure(fn: Callable[[int], Any], iterations: int, warmup: int = 3) -> Dict[str, float]:
+    """
+    重复执行并统计延迟、吞吐量和单次调用的内存分配峰值
+
+    Args:
+        fn: 被测函数，参数为迭代序号
+        iterations: 计时的执行次数
+        warmup: 预热次数
+
+    Returns:
+        dict: 统计结果（毫秒 / 次每秒 / KB）
+    """
+    for i in range(warmup):
+        fn(i)
+    gc.collect()
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        call_started = time.perf_counter()
+        fn(warmup + i)
+        latencies.append((time.perf_counter() - call_started) * 1000)
+    elapsed = time.perf_counter() - started
+
+    # 内存单独测量一次，tracemalloc 会显著拖慢计时
+    tracemalloc.start()
+    fn(warmup + iterations)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(latencies, 50), 4),
+        "p95_ms": round(percentile(latencies, 95), 4),
+        "p99_ms": round(percentile(latencies, 99), 4),
+        "mean_ms": round(sum(latencies) / len(latencies), 4),
+        "throughput_ops": round(iterations / elapsed, 2) if elapsed else 0.0,
+        "peak_alloc_kb": round(peak / 1024, 1),
+    }
+
+
+def max_rss_mb() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return round(usage / 1024 / 1024 if sys.platform == "darwin" else usage / 1024, 1)
+
+
+# ==================== 场景 ====================
+
+def build_scenarios(client: FakeSupabaseClient, data: Dict[str, List[Dict[str, Any]]],
+                    http=None, seed: int = 0) -> List[tuple]:
+    """
+    构建测试场景
+
+    Returns:
+        list: (场景名, 被测函数, 是否为重量级场景)，重量级场景减少执行次数
+    """
+    rng = random.Random(seed)
+    db = SupabaseHandler(client=client)
+    service = APIService(db=db)
+    # make_api_request 使用模块级的 api_service
+    api_service_module.api_service = service
+
+    student_ids = [row["id"] for row in data["student"]]
+    question_ids = [row["id"] for row in data["question"]]
+    paper_ids = [row["id"] for row in data["exam_paper"]]
+    questions_spec = RESOURCES["questions"]
+
+    def new_question(i: int) -> Dict[str, Any]:
+        paper = data["exam_paper"][i % len(data["exam_paper"])]
+        return {"exam_paper_id": paper["id"], "student_id": paper["student_id"],
+                "image_id": data["exam_paper_image"][0]["id"], "content": f"新题目{i}", "is_correct": False}
+
+    scenarios = [
+        ("handler.select_by_student",
+         lambda i: db.select_data("question", filters={"student_id": rng.choice(student_ids)}), False),
+        ("handler.select_in_20_ids",
+         lambda i: db.select_in("question", "id", rng.sample(question_ids, min(20, len(question_ids)))), False),
+        ("handler.iter_pages_questions",
+         lambda i: sum(len(page) for page in db.iter_pages("question")), True),
+        ("service.list_questions_snapshot",
+         lambda i: service.list_items(questions_spec), False),
+        ("service.fetch_many_bootstrap",
+         lambda i: service.fetch_many(["students", "exam_papers", "exam_paper_images", "questions",
+                                       "knowledge_points", "question_knowledge_points"]), False),
+        ("make_api_request.get_question",
+         lambda i: make_api_request("GET", f"questions/{rng.choice(question_ids)}"), False),
+        ("make_api_request.list_exam_papers",
+         lambda i: make_api_request("GET", "exam_papers"), False),
+    ]
+
+    if http is not None:
+        etags: Dict[str, str] = {}
+
+        def revalidate(path: str):
+            response = http.get(path, headers={"If-None-Match": etags.get(path, "")})
+            if "etag" in response.headers:
+                etags[path] = response.headers["etag"]
+            return response
+
+        scenarios += [
+            ("http.get_question",
+             lambda i: http.get(f"/api/questions/{rng.choice(question_ids)}"), False),
+            ("http.list_questions_by_ids",
+             lambda i: http.get("/api/questions", params={
+                 "ids": ",".join(map(str, rng.sample(question_ids, min(20, len(question_ids)))))}), False),
+            ("http.list_knowledge_points", lambda i: http.get("/api/knowledge_points"), False),
+            ("http.list_exam_papers_revalidate", lambda i: revalidate("/api/exam_papers"), True),
+            ("http.list_questions", lambda i: http.get("/api/questions"), True),
+        ]
+
+    # 写操作放在最后，避免写入使读场景的快照和查询缓存失效
+    scenarios += [
+        ("make_api_request.create_question",
+         lambda i: make_api_request("POST", "questions", new_question(i)), False),
+        ("service.bulk_create_50_questions",
+         lambda i: service.bulk_create_items(questions_spec, [new_question(i * 50 + k) for k in range(50)]), True),
+        ("make_api_request.update_paper",
+         lambda i: make_api_request("PUT", f"exam_papers/{rng.choice(paper_ids)}", {"title": f"改名{i}"}), False),
+    ]
+    if http is not None:
+        scenarios.append(("http.bulk_create_50_questions",
+                          lambda i: http.post("/api/questions/bulk",
+                                              json=[new_question(i * 50 + k) for k in range(50)]), True))
+    return scenarios
+
+
+def run_scale(students: int, args) -> List[Dict[str, Any]]:
+    """在一个数据规模下运行所有场景"""
+    client = FakeSupabaseClient(latency_ms=args.latency_ms)
+    for batch in generate_batches(dataset_config(students, args.seed, args.realistic)):
+        for table_name, rows in batch.items():
+            client.load(table_name, rows)
+    row_counts = {table_name: len(table.rows) for table_name, table in client.tables.items()}
+    dataset = {table_name: list(client.tables[table_name].rows.values()) for table_name in client.tables}
+
+    http_client = None
+    if not args.skip_http:
+        try:
+            from fastapi.testclient import TestClient
+            from api_app import create_app
+
+            # 应用在启动时创建的 SupabaseHandler 也使用替身客户端
+            supabase_handler.use_client(client)
+            http_client = TestClient(create_app())
+            http_client.__enter__()
+        except ImportError as e:
+            print(f"跳过 HTTP 场景: {e}")
+            http_client = None
+
+    results = []
+    try:
+        for name, fn, heavy in build_scenarios(client, dataset, http_client, seed=args.seed):
+            if args.only and not any(pattern in name for pattern in args.only):
+                continue
+            iterations = max(3, args.iterations // 10) if heavy else args.iterations
+            requests_before = client.request_count
+            stats = measure(fn, iterations)
+            stats["requests_per_op"] = round((client.request_count - requests_before) / (iterations + 4), 2)
+            results.append({"scale": students, "scenario": name, **stats})
+            print(f"  {name:<38} p50={stats['p50_ms']:>9.3f}ms p95={stats['p95_ms']:>9.3f}ms "
+                  f"p99={stats['p99_ms']:>9.3f}ms {stats['throughput_ops']:>9.1f} ops/s "
+                  f"alloc={stats['peak_alloc_kb']:>9.1f}KB req/op={stats['requests_per_op']}")
+    finally:
+        if http_client is not None:
+            http_client.__exit__(None, None, None)
+    for result in results:
+        result["rows"] = row_counts
+        result["max_rss_mb"] = max_rss_mb()
+    return results
+
+
+# ==================== 结果比较 ====================
+
+def compare_results(current: List[Dict[str, Any]], baseline_path: str, threshold: float) -> int:
+    """
+    与基线结果比较 p50 和 p95，打印变化并返回回退的场景数
+
+    Args:
+        current: 本次结果
+        baseline_path: 基线 JSON 文件
+        threshold: 允许的相对变慢比例，例如 0.2 表示 20%
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["scale"], r["scenario"]): r for r in json.load(f)["results"]}
+
+    regressions = 0
+    print(f"\n与基线 {baseline_path} 比较（阈值 {threshold:.0%}）:")
+    for result in current:
+        base = baseline.get((result["scale"], result["scenario"]))
+        if base is None:
+            continue
+        changes = []
+        regressed = False
+        for metric in ("p50_ms", "p95_ms"):
+            if base[metric] > 0:
+                change = result[metric] / base[metric] - 1
+                changes.append(f"{metric} {base[metric]:.3f} -> {result[metric]:.3f} ({change:+.0%})")
+                regressed = regressed or (change > threshold and result[metric] - base[metric] > MIN_DELTA_MS)
+        regressions += regressed
+        flag = "回退" if regressed else "    "
+        print(f"  [{flag}] scale={result['scale']:<6} {result['scenario']:<38} " + "  ".join(changes))
+    return regressions
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LADR 端到端基准测试")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)), help="学生数，逗号分隔")
+    parser.add_argument("--iterations", type=int, default=100, help="每个场景的执行次数（重量级场景为 1/10）")
+    parser.add_argument("--latency-ms", type=float, default=0, help="每次 Supabase 请求的模拟网络延迟（毫秒）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--realistic", action="store_true", help="使用接近生产的数据形态（每个学生数百道题）")
+    parser.add_argument("--only", action="append", help="只运行名称包含该字符串的场景，可多次指定")
+    parser.add_argument("--skip-http", action="store_true", help="跳过 FastAPI 路由场景")
+    parser.add_argument("--output", help="结果 JSON 路径，默认 benchmarks/results/bench-<时间>.json")
+    parser.add_argument("--compare", help="基线结果 JSON，与之比较")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定为回退的相对变慢比例")
+    args = parser.parse_args()
+
+    scales = [int(scale) for scale in args.scales.split(",") if scale.strip()]
+    results = []
+    for students in scales:
+        print(f"\n规模: {students} 个学生")
+        results.extend(run_scale(students, args))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "git_revision": git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "scales": scales,
+                "iterations": args.iterations,
+                "latency_ms": args.latency_ms,
+                "seed": args.seed,
+                "realistic": args.realistic,
+            },
+            "results": results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到 {output}")
+
+    if args.compare:
+        regressions = compare_results(results, args.compare, args.threshold)
+        if regressions:
+            print(f"\n有 {regressions} 个场景性能回退")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CSV / Excel 批量导入
+逐块读取文件（CSV 流式解析，XLSX 使用 openpyxl 只读模式），按 models.py 中的模型校验每一行，
+知识点名称通过预先构建的索引解析为 ID，每块数据只发起一次批量插入。
+
+题目文件的列:
+    content            题目内容（必填）
+    is_correct         是否正确，可填 true/false、1/0、是/否、对/错、正确/错误，留空表示未批改
+    remark             备注（可选）
+    knowledge_points   知识点名称，多个用逗号、分号或顿号分隔（可选）
+    image_id           题目图片 ID（可选，必须属于导入的试卷，默认使用导入时选择的图片）
+
+知识点文件的列:
+    name               知识点名称（必填）
+"""
+
+import io
+import csv
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from models import QuestionCreate, KnowledgePointCreate
+from resource_registry import RESOURCES
+
+# 每块处理的行数
+DEFAULT_CHUNK_SIZE = 500
+# 报告中保留的最大错误数
+MAX_REPORTED_ERRORS = 1000
+
+# 进度回调: (已处理行数, 已读取的文件比例，未知时为 None)
+ProgressCallback = Callable[[int, Optional[float]], None]
+
+TRUE_VALUES = {"true", "1", "yes", "y", "t", "是", "对", "正确", "✓", "√"}
+FALSE_VALUES = {"false", "0", "no", "n", "f", "否", "错", "错误", "✗", "×"}
+KNOWLEDGE_POINT_SEPARATORS = re.compile(r"[,，;；、|]")
+
+
+@dataclass
+class ImportReport:
+    """导入结果"""
+    total_rows: int = 0
+    success_count: int = 0
+    # 行级错误: {"row": 文件中的行号, "error": 错误信息}
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    failed_count: int = 0
+    created_knowledge_points: int = 0
+    linked_knowledge_points: int = 0
+
+    def add_error(self, row_number: int, message: str):
+        self.failed_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "error": message})
+
+
+# ==================== 文件读取 ====================
+
+def _detect_encoding(file: IO[bytes]) -> str:
+    """根据文件开头判断编码，Excel 另存的中文 CSV 常为 GBK"""
+    head = file.read(65536)
+    file.seek(0)
+    try:
+        head.decode("utf-8")
+        return "utf-8-sig"
+    except UnicodeDecodeError as e:
+        # 截断在多字节字符中间时仍按 UTF-8 处理
+        if e.start >= len(head) - 3:
+            return "utf-8-sig"
+        return "gb18030"
+
+
+def _file_fraction(file: IO[bytes], size: Optional[int]) -> Optional[float]:
+    if not size:
+        return None
+    try:
+        return min(file.tell() / size, 1.0)
+    except (OSError, ValueError):
+        return None
+
+
+def _clean(value: Any) -> Any:
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def _cell_text(value: Any) -> Optional[str]:
+    """文本列的单元格值转换为字符串，XLSX 中的数字单元格（例如知识点名称 "1.2"）读出来是数值"""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def iter_csv_chunks(file: IO[bytes], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    size: Optional[int] = None) -> Iterator[Tuple[List[Tuple[int, Dict[str, Any]]], Optional[float]]]:
+    """
+    逐块读取 CSV
+
+    Args:
+        file: 二进制文件对象
+        chunk_size: 每块行数
+        size: 文件字节数，用于计算进度
+
+    Returns:
+        生成器，每次产出 ([(行号, 行数据)], 已读取比例)
+    """
+    text = io.TextIOWrapper(file, encoding=_detect_encoding(file), newline="")
+    try:
+        reader = csv.DictReader(text)
+        chunk = []
+        for row in reader:
+            row_data = {(key or "").strip(): _clean(value) for key, value in row.items() if key}
+            if any(value is not None for value in row_data.values()):
+                chunk.append((reader.line_num, row_data))
+            if len(chunk) >= chunk_size:
+                yield chunk, _file_fraction(file, size)
+                chunk = []
+        if chunk:
+            yield chunk, 1.0
+    finally:
+        # 不关闭调用方传入的文件
+        text.detach()
+
+
+def iter_xlsx_chunks(file: IO[bytes], chunk_size: int = DEFAULT_CHUNK_SIZE
+                     ) -> Iterator[Tuple[List[Tuple[int, Dict[str, Any]]], Optional[float]]]:
+    """
+    以只读模式逐块读取 XLSX 的第一个工作表，第一行为表头
+
+    Args:
+        file: 二进制文件对象
+        chunk_size: 每块行数
+
+    Returns:
+        生成器，每次产出 ([(行号, 行数据)], 已读取比例)
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        total = sheet.max_row
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name).strip() if name is not None else "" for name in header]
+        chunk = []
+        for row_number, values in enumerate(rows, start=2):
+            row_data = {column: _clean(value) for column, value in zip(columns, values) if column}
+            if any(value is not None for value in row_data.values()):
+                chunk.append((row_number, row_data))
+            if len(chunk) >= chunk_size:
+                yield chunk, min(row_number / total, 1.0) if total else None
+                chunk = []
+        if chunk:
+            yield chunk, 1.0
+    finally:
+        workbook.close()
+
+
+def iter_file_chunks(file: IO[bytes], filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     size: Optional[int] = None):
+    """按扩展名选择 CSV 或 XLSX 读取方式"""
+    lower_name = filename.lower()
+    if lower_name.endswith(".csv"):
+        return iter_csv_chunks(file, chunk_size, size)
+    if lower_name.endswith((".xlsx", ".xlsm")):
+        return iter_xlsx_chunks(file, chunk_size)
+    raise ValueError(f"不支持的文件格式: {filename}，请上传 CSV 或 XLSX 文件")
+
+
+# ==================== 知识点索引 ====================
+
+def normalize_name(name: str) -> str:
+    """知识点名称比较时忽略首尾空白和大小写"""
+    return " ".join(str(name).split()).casefold()
+
+
+class KnowledgePointIndex:
+    """知识点名称到 ID 的索引，导入过程中新建的知识点会加入索引"""
+
+    def __init__(self, knowledge_points: List[Dict[str, Any]]):
+        self._ids: Dict[str, int] = {}
+        for point in knowledge_points:
+            if point.get("name"):
+                self._ids.setdefault(normalize_name(point["name"]), point["id"])
+
+    def get(self, name: str) -> Optional[int]:
+        return self._ids.get(normalize_name(name))
+
+    def add(self, name: str, point_id: int):
+        self._ids[normalize_name(name)] = point_id
+
+    def __contains__(self, name: str) -> bool:
+        return normalize_name(name) in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+def split_knowledge_points(value: Any) -> List[str]:
+    """拆分单元格中的多个知识点名称"""
+    if value is None:
+        return []
+    return [name.strip() for name in KNOWLEDGE_POINT_SEPARATORS.split(str(value)) if name.strip()]
+
+
+def parse_bool(value: Any, default: Optional[bool] = None) -> Optional[bool]:
+    """解析正误列，留空时返回 default（默认 None，即未批改）"""
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return bool(value)
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f"无法识别的正误值: {value}")
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+                     for detail in error.errors())
+
+
+# ==================== 导入 ====================
+
+class BulkImporter:
+    """通过 APIService 的批量接口导入数据"""
+
+    def __init__(self, service, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        初始化导入器
+
+        Args:
+            service: APIService 实例
+            chunk_size: 每块行数，也是每次批量插入的行数
+        """
+        self.service = service
+        self.chunk_size = chunk_size
+        self._index: Optional[KnowledgePointIndex] = None
+
+    @property
+    def knowledge_point_index(self) -> KnowledgePointIndex:
+        """首次使用时读取全部知识点构建索引"""
+        if self._index is None:
+            self._index = KnowledgePointIndex(self.service.list_items(RESOURCES["knowledge_points"]))
+        return self._index
+
+    def _paper_image_ids(self, exam_paper_id: int) -> set:
+        """试卷的所有图片 ID，用于校验文件中指定的 image_id"""
+        images = self.service.list_items(RESOURCES["exam_paper_images"])
+        return {image["id"] for image in images if image.get("exam_paper_id") == exam_paper_id}
+
+    def _create_knowledge_points(self, names: List[str], report: ImportReport) -> List[str]:
+        """批量创建索引中不存在的知识点，返回创建失败的名称"""
+        index = self.knowledge_point_index
+        missing, seen = [], set()
+        for name in names:
+            key = normalize_name(name)
+            if name not in index and key not in seen:
+                seen.add(key)
+                missing.append(name)
+        if not missing:
+            return []
+        result = self.service.bulk_create_items(RESOURCES["knowledge_points"], [{"name": name} for name in missing])
+        failed = []
+        for item in result["results"]:
+            name = missing[item["index"]]
+            if item["success"]:
+                index.add(name, item["id"])
+                report.created_knowledge_points += 1
+            else:
+                failed.append(name)
+        return failed
+
+    def import_knowledge_points(self, file: IO[bytes], filename: str, size: Optional[int] = None,
+                                progress: ProgressCallback = None) -> ImportReport:
+        """
+        导入知识点，已存在（名称相同）的知识点视为成功并跳过
+
+        Args:
+            file: 二进制文件对象
+            filename: 文件名，用于判断格式
+            size: 文件字节数，用于计算进度
+            progress: 进度回调
+
+        Returns:
+            ImportReport
+        """
+        report = ImportReport()
+        index = self.knowledge_point_index
+        for chunk, fraction in iter_file_chunks(file, filename, self.chunk_size, size):
+            to_create: List[Tuple[int, str]] = []
+            pending = set()
+            for row_number, row in chunk:
+                report.total_rows += 1
+                try:
+                    name = KnowledgePointCreate(name=_cell_text(row.get("name"))).name.strip()
+                except ValidationError as e:
+                    report.add_error(row_number, _validation_message(e))
+                    continue
+                if not name:
+                    report.add_error(row_number, "知识点名称不能为空")
+                elif name in index or normalize_name(name) in pending:
+                    report.success_count += 1
+                else:
+                    pending.add(normalize_name(name))
+                    to_create.append((row_number, name))
+
+            if to_create:
+                result = self.service.bulk_create_items(
+                    RESOURCES["knowledge_points"], [{"name": name} for _, name in to_create])
+                for item in result["results"]:
+                    row_number, name = to_create[item["index"]]
+                    if item["success"]:
+                        index.add(name, item["id"])
+                        report.success_count += 1
+                        report.created_knowledge_points += 1
+                    else:
+                        report.add_error(row_number, item["error"] or "创建知识点失败")
+            if progress:
+                progress(report.total_rows, fraction)
+        return report
+
+    def import_questions(self, file: IO[bytes], filename: str, exam_paper_id: int, student_id: int,
+                         default_image_id: Optional[int] = None, create_missing_knowledge_points: bool = False,
+                         size: Optional[int] = None, progress: ProgressCallback = None) -> ImportReport:
+        """
+        导入题目并建立知识点关联
+
+        Args:
+            file: 二进制文件对象
+            filename: 文件名，用于判断格式
+            exam_paper_id: 题目所属试卷
+            student_id: 题目所属学生
+            default_image_id: 行中没有 image_id 时使用的图片
+            create_missing_knowledge_points: 是否自动创建不存在的知识点，否则该行报错
+            size: 文件字节数，用于计算进度
+            progress: 进度回调
+
+        Returns:
+            ImportReport
+        """
+        report = ImportReport()
+        index = self.knowledge_point_index
+        paper_image_ids = self._paper_image_ids(exam_paper_id)
+        for chunk, fraction in iter_file_chunks(file, filename, self.chunk_size, size):
+            failed_names = set()
+            if create_missing_knowledge_points:
+                names = [name for _, row in chunk for name in split_knowledge_points(row.get("knowledge_points"))]
+                failed_names = {normalize_name(name) for name in self._create_knowledge_points(names, report)}
+
+            # (行号, 题目数据, 知识点 ID 列表)
+            valid: List[Tuple[int, Dict[str, Any], List[int]]] = []
+            for row_number, row in chunk:
+                report.total_rows += 1
+                try:
+                    kp_names = split_knowledge_points(row.get("knowledge_points"))
+                    not_created = [name for name in kp_names if normalize_name(name) in failed_names]
+                    if not_created:
+                        raise ValueError(f"知识点创建失败: {'、'.join(not_created)}")
+                    unknown = [name for name in kp_names if name not in index]
+                    if unknown:
+                        raise ValueError(f"知识点不存在: {'、'.join(unknown)}")
+                    question = QuestionCreate(
+                        exam_paper_id=exam_paper_id,
+                        student_id=student_id,
+                        image_id=row.get("image_id") or default_image_id,
+                        content=_cell_text(row.get("content")),
+                        is_correct=parse_bool(row.get("is_correct")),
+                        remark=_cell_text(row.get("remark")),
+                    )
+                    if not (question.content or "").strip():
+                        raise ValueError("题目内容不能为空")
+                    if row.get("image_id") is not None and question.image_id not in paper_image_ids:
+                        raise ValueError(f"图片 {question.image_id} 不属于该试卷")
+                except ValidationError as e:
+                    report.add_error(row_number, _validation_message(e))
+                    continue
+                except ValueError as e:
+                    report.add_error(row_number, str(e))
+                    continue
+                kp_ids = list(dict.fromkeys(index.get(name) for name in kp_names))
+                valid.append((row_number, question.model_dump(), kp_ids))
+
+            if valid:
+                self._insert_questions(valid, report)
+            if progress:
+                progress(report.total_rows, fraction)
+        return report
+
+    def _insert_questions(self, valid: List[Tuple[int, Dict[str, Any], List[int]]], report: ImportReport):
+        """批量插入一块题目，再批量插入它们的知识点关联"""
+        result = self.service.bulk_create_items(RESOURCES["questions"], [data for _, data, _ in valid])
+        links: List[Tuple[int, Dict[str, int]]] = []
+        for item in result["results"]:
+            row_number, _, kp_ids = valid[item["index"]]
+            if not item["success"]:
+                report.add_error(row_number, item["error"] or "创建题目失败")
+                continue
+            report.success_count += 1
+            links.extend((row_number, {"question_id": item["id"], "knowledge_point_id": kp_id}) for kp_id in kp_ids)
+
+        if links:
+            link_result = self.service.bulk_create_items(
+                RESOURCES["question_knowledge_points"], [link for _, link in links])
+            for item in link_result["results"]:
+                if item["success"]:
+                    report.linked_knowledge_points += 1
+                else:
+                    # 题目已创建，只记录关联失败
+                    row_number = links[item["index"]][0]
+                    if len(report.errors) < MAX_REPORTED_ERRORS:
+                        report.errors.append({"row": row_number, "error": f"知识点关联失败: {item['error']}"})
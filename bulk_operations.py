@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量增删改
+对任意资源按块执行数组插入、按相同修改内容合并的 in 更新以及 in 删除，并返回每条记录的处理结果。
+API 路由的 /{resource}/bulk 接口和 APIService 的批量方法共用这里的实现。
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from postgrest.exceptions import APIError
+from pydantic import ValidationError
+
+from resource_registry import ResourceSpec
+from supabase_handler import SupabaseHandler, is_transient_error
+
+# 单次请求写入的最大行数
+DEFAULT_CHUNK_SIZE = 500
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or '数据'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+def _result(index: int, success: bool, row_id: Optional[int] = None, error: str = None,
+            data: Dict[str, Any] = None) -> Dict[str, Any]:
+    return {"index": index, "id": row_id, "success": success, "error": error, "data": data}
+
+
+def _summary(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    success_count = sum(1 for result in results if result["success"])
+    return {
+        "success_count": success_count,
+        "failed_count": len(results) - success_count,
+        "results": results,
+    }
+
+
+def bulk_create(db: SupabaseHandler, spec: ResourceSpec, items: List[Dict[str, Any]],
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    批量创建记录
+
+    Args:
+        db: 数据库处理器
+        spec: 资源定义
+        items: 待创建的数据，每条按 create_model 校验
+        chunk_size: 每次插入的行数
+
+    Returns:
+        dict: success_count、failed_count 和按输入顺序的 results；成功的结果 data 为创建后的行
+
+    整块插入被数据库明确拒绝（约束冲突等 4xx 错误，整块都未写入）时逐条插入，找出具体失败的记录；
+    超时、连接错误等无法确定是否已写入的情况不重试，整块标记为失败并提示结果未知，避免重复插入。
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            write_data = spec.create_model(**item).model_dump()
+            if spec.prepare_write:
+                write_data = spec.prepare_write(write_data)
+            valid.append((index, write_data))
+        except ValidationError as e:
+            results[index] = _result(index, False, error=_validation_message(e))
+        except Exception as e:
+            results[index] = _result(index, False, error=str(e))
+
+    for chunk in _chunks(valid, chunk_size):
+        try:
+            rows = db.insert_many(spec.table, [write_data for _, write_data in chunk], raise_errors=True)
+        except Exception as e:
+            if isinstance(e, APIError) and not is_transient_error(e):
+                # 整块被拒绝时逐条插入，找出具体失败的记录
+                for index, write_data in chunk:
+                    row = db.insert_data(spec.table, write_data)
+                    if row:
+                        results[index] = _result(index, True, row[0].get("id"), data=row[0])
+                    else:
+                        results[index] = _result(index, False, error=f"创建{spec.label}失败")
+            else:
+                for index, _ in chunk:
+                    results[index] = _result(index, False, error=f"创建{spec.label}的结果未知，请确认后再重试: {e}")
+            continue
+        if len(rows) != len(chunk):
+            # 返回的行数与请求不一致时无法对应到输入，同样不重试
+            for index, _ in chunk:
+                results[index] = _result(index, False, error=f"创建{spec.label}的结果未知，请确认后再重试")
+            continue
+        for (index, _), row in zip(chunk, rows):
+            results[index] = _result(index, True, row.get("id"), data=row)
+    return _summary(results)
+
+
+def bulk_update(db: SupabaseHandler, spec: ResourceSpec, items: List[Dict[str, Any]],
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    批量更新记录，修改内容相同的记录合并为一次 in 更新
+
+    Args:
+        db: 数据库处理器
+        spec: 资源定义
+        items: 每条包含 id 和要修改的字段，字段按 update_model 校验
+        chunk_size: 每次更新的最大行数
+
+    Returns:
+        dict: success_count、failed_count 和按输入顺序的 results；成功的结果 data 为更新后的行
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    # 修改内容 -> (修改数据, [(序号, ID)])
+    groups: Dict[str, tuple] = {}
+    for index, item in enumerate(items):
+        fields = dict(item)
+        row_id = fields.pop("id", None)
+        if not isinstance(row_id, int) or isinstance(row_id, bool):
+            results[index] = _result(index, False, error="缺少整数 id")
+            continue
+        try:
+            write_data = spec.update_model(**fields).model_dump(exclude_unset=True)
+            if spec.prepare_write:
+                write_data = spec.prepare_write(write_data)
+        except ValidationError as e:
+            results[index] = _result(index, False, row_id, error=_validation_message(e))
+            continue
+        if not write_data:
+            results[index] = _result(index, False, row_id, error="没有要更新的字段")
+            continue
+        group_key = json.dumps(write_data, sort_keys=True, default=str)
+        groups.setdefault(group_key, (write_data, []))[1].append((index, row_id))
+
+    for write_data, members in groups.values():
+        for chunk in _chunks(members, chunk_size):
+            rows = db.update_in(spec.table, write_data, "id", [row_id for _, row_id in chunk])
+            updated = {row["id"]: row for row in rows} if rows is not None else None
+            for index, row_id in chunk:
+                if updated is None:
+                    results[index] = _result(index, False, row_id, error=f"更新{spec.label}失败")
+                elif row_id in updated:
+                    results[index] = _result(index, True, row_id, data=updated[row_id])
+                else:
+                    results[index] = _result(index, False, row_id, error=f"{spec.label}不存在")
+    return _summary(results)
+
+
+def bulk_delete(db: SupabaseHandler, spec: ResourceSpec, ids: List[int],
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    批量删除记录
+
+    Args:
+        db: 数据库处理器
+        spec: 资源定义
+        ids: 要删除的 ID
+        chunk_size: 每次删除的最大行数
+
+    Returns:
+        dict: success_count、failed_count 和按输入顺序的 results
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(ids)
+    for chunk in _chunks(list(enumerate(ids)), chunk_size):
+        rows = db.delete_in(spec.table, "id", sorted({row_id for _, row_id in chunk}))
+        deleted = {row["id"] for row in rows} if rows is not None else None
+        for index, row_id in chunk:
+            if deleted is None:
+                results[index] = _result(index, False, row_id, error=f"删除{spec.label}失败")
+            elif row_id in deleted:
+                results[index] = _result(index, True, row_id)
+            else:
+                results[index] = _result(index, False, row_id, error=f"{spec.label}不存在")
+    return _summary(results)
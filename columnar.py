@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列式表快照
+页面缓存的整表数据以 Arrow 表保存：列连续存放，重复较多的字符串列字典编码（相同的字符串只存一份），
+内存约为 List[Dict] 的几分之一。表不可变，缓存命中时直接共享同一个对象，不再每次 rerun 反序列化一份副本。
+
+ColumnarTable 可以像 List[Dict] 一样使用（len、下标、遍历时逐行生成 dict），
+按列过滤请使用 where / isin / find，在 Arrow 上向量化执行，只为匹配的行生成 dict:
+
+    questions = get_questions()
+    paper_questions = questions.where(exam_paper_id=paper_id)
+    student = students.find(id=paper["student_id"])
+"""
+
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# 行数不少于该值、且不同取值不超过行数一半的字符串列进行字典编码
+DICTIONARY_MIN_ROWS = 64
+DICTIONARY_MAX_RATIO = 0.5
+
+# 遍历时每批转换为 dict 的行数
+ITER_BATCH_ROWS = 1024
+
+
+class ColumnarTable(Sequence):
+    """只读的列式表，行以 dict 形式访问"""
+
+    __slots__ = ("_table",)
+
+    def __init__(self, table: pa.Table):
+        self._table = table
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]]) -> "ColumnarTable":
+        """
+        由行列表构建，列为所有行中出现过的键（按首次出现的顺序），缺少的列补为 None
+
+        Args:
+            rows: 数据行
+
+        Returns:
+            ColumnarTable: 列式表
+
+        Raises:
+            pa.ArrowException: 同一列的取值类型不一致等无法转换的情况
+        """
+        # from_pylist 只按第一行推断列，只出现在后面行中的可选列会被丢弃，这里按列构建
+        names = list(dict.fromkeys(key for row in rows for key in row))
+        table = pa.Table.from_pydict({name: [row.get(name) for row in rows] for name in names})
+        for index, field in enumerate(table.schema):
+            if not pa.types.is_string(field.type) or table.num_rows < DICTIONARY_MIN_ROWS:
+                continue
+            column = table.column(index)
+            if pc.count_distinct(column).as_py() <= table.num_rows * DICTIONARY_MAX_RATIO:
+                table = table.set_column(index, field.name, pc.dictionary_encode(column))
+        return cls(table)
+
+    @property
+    def table(self) -> pa.Table:
+        """底层的 Arrow 表（零拷贝）"""
+        return self._table
+
+    @property
+    def columns(self) -> List[str]:
+        return self._table.column_names
+
+    @property
+    def nbytes(self) -> int:
+        return self._table.nbytes
+
+    def __len__(self) -> int:
+        return self._table.num_rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return ColumnarTable(self._table.slice(start, max(stop - start, 0)))
+            return ColumnarTable(self._table.take(list(range(start, stop, step))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ColumnarTable index out of range")
+        return self._table.slice(index, 1).to_pylist()[0]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for batch in self._table.to_batches(max_chunksize=ITER_BATCH_ROWS):
+            yield from batch.to_pylist()
+
+    def __repr__(self) -> str:
+        return f"ColumnarTable({len(self)} rows, columns={self.columns})"
+
+    def column(self, name: str) -> pa.ChunkedArray:
+        """某一列的 Arrow 数组（零拷贝）"""
+        return self._table.column(name)
+
+    def values(self, name: str) -> list:
+        """某一列的取值列表，列不存在时返回空列表"""
+        if name not in self.columns:
+            return []
+        return self._table.column(name).to_pylist()
+
+    def _mask(self, column: str, value: Any) -> pa.ChunkedArray:
+        array = self._table.column(column)
+        if value is None:
+            return pc.is_null(array)
+        try:
+            return pc.fill_null(pc.equal(array, value), False)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+            # 类型不兼容时（例如整数列与字符串比较）按 Python 语义逐个比较
+            return pa.chunked_array([pa.array([item == value for item in array.to_pylist()], pa.bool_())])
+
+    def where(self, **equals: Any) -> "ColumnarTable":
+        """
+        按列精确匹配过滤，多个条件同时满足；列不存在时结果为空
+
+        Returns:
+            ColumnarTable: 匹配的行
+        """
+        mask = None
+        for column, value in equals.items():
+            if column not in self.columns:
+                return ColumnarTable(self._table.slice(0, 0))
+            condition = self._mask(column, value)
+            mask = condition if mask is None else pc.and_(mask, condition)
+        if mask is None:
+            return self
+        return ColumnarTable(self._table.filter(mask))
+
+    def isin(self, column: str, values: Iterable[Any]) -> "ColumnarTable":
+        """过滤某列取值在给定集合中的行"""
+        values = list(values)
+        if column not in self.columns or not values:
+            return ColumnarTable(self._table.slice(0, 0))
+        array = self._table.column(column)
+        try:
+            mask = pc.is_in(array, value_set=pa.array(values))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+            value_set = set(values)
+            mask = pa.chunked_array([pa.array([item in value_set for item in array.to_pylist()], pa.bool_())])
+        return ColumnarTable(self._table.filter(mask))
+
+    def find(self, **equals: Any) -> Optional[Dict[str, Any]]:
+        """第一条匹配的行，没有时返回 None"""
+        matched = self.where(**equals)
+        return matched[0] if len(matched) else None
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        """转换为 List[Dict]（复制全部数据）"""
+        return self._table.to_pylist()
+
+    def to_pandas(self) -> pd.DataFrame:
+        return self._table.to_pandas()
+
+
+def to_columnar(value: Any) -> Any:
+    """
+    将行列表（或 名称 -> 行列表 的字典）转换为 ColumnarTable，其他值和无法转换的列表原样返回
+
+    Args:
+        value: 页面辅助函数的返回值
+
+    Returns:
+        转换后的值
+    """
+    if isinstance(value, dict):
+        return {key: to_columnar(item) for key, item in value.items()}
+    if not isinstance(value, list) or not all(isinstance(row, dict) for row in value):
+        return value
+    try:
+        return ColumnarTable.from_rows(value)
+    except pa.ArrowException as e:
+        print(f"无法转换为列式表，按原样缓存: {e}")
+        return value
+
+
+def is_shareable(value: Any) -> bool:
+    """值是否不可变、可以在缓存命中时直接共享"""
+    if isinstance(value, dict):
+        return bool(value) and all(isinstance(item, ColumnarTable) for item in value.values())
+    return isinstance(value, ColumnarTable)
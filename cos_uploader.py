@@ -12,9 +12,71 @@ import time
 from datetime import datetime
 from qcloud_cos import CosConfig
 from qcloud_cos import CosS3Client
+from qcloud_cos.cos_exception import CosClientError, CosServiceError
 from PIL import Image
 import streamlit as st
 
+from tracing import trace_span
+from resilience import Resilience, CircuitOpenError, get_resilience
+
+
+def is_transient_cos_error(e: BaseException) -> bool:
+    """网络错误、超时和 5xx 为暂时性错误，会重试并计入断路器"""
+    if isinstance(e, CosServiceError):
+        return e.get_status_code() >= 500
+    return isinstance(e, (CosClientError, TimeoutError, ConnectionError))
+
+
+class TracedCOSClient:
+    """
+    访问 COS 的客户端代理：网络请求创建追踪 span，并按重试策略和断路器执行；
+    list_objects 失败时返回同一前缀上一次成功的结果，其余方法直接转发
+    """
+
+    # 需要追踪的网络请求
+    TRACED_METHODS = {"put_object", "delete_object", "list_objects", "head_bucket"}
+
+    def __init__(self, client: CosS3Client, resilience: Resilience):
+        self._client = client
+        self._resilience = resilience
+        # (Bucket, Prefix, Marker) -> 上一次成功的 list_objects 结果
+        self._last_listing = {}
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+        if name not in self.TRACED_METHODS:
+            return method
+
+        def traced(**kwargs):
+            body = kwargs.get("Body")
+            with trace_span(f"cos.{name}", {
+                "cos.bucket": kwargs.get("Bucket"),
+                "cos.key": kwargs.get("Key"),
+                "cos.prefix": kwargs.get("Prefix"),
+                "ladr.bytes": len(body) if isinstance(body, (bytes, bytearray)) else None,
+            }) as span:
+                # 上传流式 Body 时数据已被读取，不能重试
+                idempotent = name != "put_object" or isinstance(body, (bytes, bytearray))
+                try:
+                    response = self._resilience.call(name, lambda: method(**kwargs), idempotent=idempotent)
+                except Exception as e:
+                    degraded = isinstance(e, CircuitOpenError) or is_transient_cos_error(e)
+                    listing_key = self._listing_key(kwargs)
+                    if name != "list_objects" or not degraded or listing_key not in self._last_listing:
+                        raise
+                    print(f"COS 暂时不可用，返回 {kwargs.get('Prefix')} 上一次的文件列表: {e}")
+                    span.set_attribute("ladr.stale", True)
+                    return self._last_listing[listing_key]
+                if name == "list_objects" and isinstance(response, dict):
+                    self._last_listing[self._listing_key(kwargs)] = response
+                    span.set_attribute("ladr.objects", len(response.get("Contents", [])))
+                return response
+        return traced
+
+    @staticmethod
+    def _listing_key(kwargs) -> tuple:
+        return kwargs.get("Bucket"), kwargs.get("Prefix"), kwargs.get("Marker")
+
 
 class ExamPaperCOSManager:
     """试卷图片COS管理器"""
@@ -47,15 +109,17 @@ class ExamPaperCOSManager:
         self.region = region
         self.bucket_name = bucket_name or 'exam-papers-ladr'  # 默认存储桶名称
         
-        # 配置COS客户端
+        # 配置COS客户端，超时和重试由 resilience 统一控制，关闭 SDK 自带的重试
+        resilience = get_resilience("cos", is_transient_cos_error)
         config = CosConfig(
             Region=region,
             SecretId=secret_id,
             SecretKey=secret_key,
             Token=None,
-            Scheme='https'
+            Scheme='https',
+            Timeout=resilience.timeout
         )
-        self.client = CosS3Client(config)
+        self.client = TracedCOSClient(CosS3Client(config, retry=0), resilience)
     
     def upload_exam_paper_image(self, image_file, exam_paper_id, image_index=None):
         """
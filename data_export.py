@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分析数据集导出工具
+将题目、试卷、知识点等表分页读取后写入按学生和月份分区的 Parquet 数据集，
+支持基于时间水位线的增量导出，供离线报表和 pandas 任务使用。
+
+用法:
+    python data_export.py --output exports/
+    python data_export.py --output exports/ --full --tables question exam_paper
+"""
+
+import os
+import json
+import uuid
+import shutil
+import argparse
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from supabase_handler import SupabaseHandler
+
+# 水位线状态文件，记录每张表已导出的最大时间戳，以及该时间戳上已导出的行 ID
+WATERMARK_FILE = "_watermarks.json"
+
+# 时间戳列统一转换为 UTC 微秒精度
+TIMESTAMP_TYPE = pa.timestamp("us", tz="UTC")
+
+# 导出表配置
+# schema: 显式列定义，保证各批次文件的列类型一致，同时用于源端列裁剪
+# watermark: 增量导出所依据的时间列，None 表示每次全量导出
+# partition_cols: 分区列，month 由 created_time 派生
+EXPORT_TABLES: Dict[str, Dict[str, Any]] = {
+    "question": {
+        "schema": pa.schema([
+            ("id", pa.int64()),
+            ("exam_paper_id", pa.int64()),
+            ("image_id", pa.int64()),
+            ("student_id", pa.int64()),
+            ("content", pa.string()),
+            ("is_correct", pa.bool_()),
+            ("remark", pa.string()),
+            ("created_time", TIMESTAMP_TYPE),
+            ("updated_time", TIMESTAMP_TYPE),
+        ]),
+        "watermark": "updated_time",
+        "partition_cols": ["student_id", "month"],
+    },
+    "exam_paper": {
+        "schema": pa.schema([
+            ("id", pa.int64()),
+            ("student_id", pa.int64()),
+            ("title", pa.string()),
+            ("description", pa.string()),
+            ("created_time", TIMESTAMP_TYPE),
+        ]),
+        "watermark": "created_time",
+        "partition_cols": ["student_id", "month"],
+    },
+    "question_knowledge_point": {
+        "schema": pa.schema([
+            ("id", pa.int64()),
+            ("question_id", pa.int64()),
+            ("knowledge_point_id", pa.int64()),
+            ("created_time", TIMESTAMP_TYPE),
+        ]),
+        "watermark": "created_time",
+        "partition_cols": ["month"],
+    },
+    "knowledge_point": {
+        "schema": pa.schema([
+            ("id", pa.int64()),
+            ("name", pa.string()),
+        ]),
+        "watermark": None,
+        "partition_cols": [],
+    },
+}
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """将 PostgREST 返回的 ISO 时间字符串解析为 datetime"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def load_watermarks(output_dir: str) -> Dict[str, Dict[str, Any]]:
+    """
+    读取输出目录中的水位线状态
+
+    Returns:
+        dict: 表名 -> {"watermark": 时间戳, "ids": 该时间戳上已导出的行 ID}；
+              旧版本只记录了时间戳，ids 为 None
+    """
+    path = os.path.join(output_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        watermarks = json.load(f)
+    return {
+        table_name: state if isinstance(state, dict) else {"watermark": state, "ids": None}
+        for table_name, state in watermarks.items()
+    }
+
+
+def save_watermarks(output_dir: str, watermarks: Dict[str, Dict[str, Any]]):
+    """原子地写入水位线状态，避免中断时留下损坏的文件"""
+    path = os.path.join(output_dir, WATERMARK_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(watermarks, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def rows_to_table(rows: List[Dict[str, Any]], config: Dict[str, Any]) -> pa.Table:
+    """
+    将一批数据行转换为 Arrow 表
+
+    Args:
+        rows: 数据库返回的数据行
+        config: EXPORT_TABLES 中的表配置
+
+    Returns:
+        pa.Table: 按配置 schema 构建的表，附带 month 分区列（如需要）
+    """
+    schema: pa.Schema = config["schema"]
+    timestamp_cols = [field.name for field in schema if field.type == TIMESTAMP_TYPE]
+
+    columns: Dict[str, list] = {field.name: [] for field in schema}
+    for row in rows:
+        for name in columns:
+            value = row.get(name)
+            if name in timestamp_cols:
+                value = _parse_timestamp(value)
+            columns[name].append(value)
+
+    table = pa.Table.from_pydict(columns, schema=schema)
+
+    if "month" in config["partition_cols"]:
+        months = [
+            created.strftime("%Y-%m") if created else "unknown"
+            for created in columns["created_time"]
+        ]
+        table = table.append_column("month", pa.array(months, type=pa.string()))
+
+    return table
+
+
+def export_table(db: SupabaseHandler, table_name: str, output_dir: str,
+                 watermark: Optional[str] = None, watermark_ids: Optional[List[int]] = None,
+                 page_size: int = 1000, flush_rows: int = 50000, compression: str = "zstd") -> Dict[str, Any]:
+    """
+    分页读取一张表并写入分区 Parquet 数据集
+
+    Args:
+        db: 数据库处理器
+        table_name: 表名，必须在 EXPORT_TABLES 中
+        output_dir: 输出根目录，每张表写入同名子目录
+        watermark: 上次导出的水位线，为 None 时全量导出并替换已有数据
+        watermark_ids: 上次导出时水位线时间戳上已导出的行 ID；为 None 时（旧版本状态）只读取水位线之后的行
+        page_size: 每次分页读取的行数
+        flush_rows: 累积多少行后写出一批文件，控制内存占用和文件数量
+        compression: Parquet 压缩算法
+
+    Returns:
+        dict: 导出结果，包含行数、新的水位线和水位线时间戳上已导出的行 ID
+    """
+    config = EXPORT_TABLES[table_name]
+    schema: pa.Schema = config["schema"]
+    watermark_col = config["watermark"]
+    table_dir = os.path.join(output_dir, table_name)
+
+    # 全量导出先写入临时目录再整体替换，增量导出直接追加新批次文件
+    full_export = not (watermark_col and watermark)
+    write_dir = table_dir + ".staging" if full_export else table_dir
+    if full_export and os.path.exists(write_dir):
+        shutil.rmtree(write_dir)
+    os.makedirs(write_dir, exist_ok=True)
+
+    run_id = datetime.now().strftime("%Y%m%d%H%M%S") + "-" + uuid.uuid4().hex[:8]
+    # 与水位线时间戳相同、但在上次导出之后才提交的行不能漏掉：按 >= 读取，再跳过该时间戳上已导出的 ID
+    gt_filters = gte_filters = None
+    if not full_export and watermark_ids is None:
+        gt_filters = {watermark_col: watermark}
+    elif not full_export:
+        gte_filters = {watermark_col: watermark}
+    order_by = f"{watermark_col},id" if watermark_col else "id"
+    boundary = _parse_timestamp(watermark) if not full_export else None
+    skip_ids = set(watermark_ids or ())
+
+    buffer: List[Dict[str, Any]] = []
+    row_count = 0
+    batch_index = 0
+    new_watermark = watermark
+    new_watermark_time = boundary
+    new_watermark_ids = set(skip_ids)
+
+    def flush():
+        nonlocal batch_index
+        if not buffer:
+            return
+        table = rows_to_table(buffer, config)
+        if config["partition_cols"]:
+            pq.write_to_dataset(
+                table,
+                root_path=write_dir,
+                partition_cols=config["partition_cols"],
+                basename_template=f"part-{run_id}-{batch_index}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+                compression=compression,
+            )
+        else:
+            pq.write_table(
+                table,
+                os.path.join(write_dir, f"part-{run_id}-{batch_index}.parquet"),
+                compression=compression,
+            )
+        batch_index += 1
+        buffer.clear()
+
+    columns = ",".join(field.name for field in schema)
+    for page in db.iter_pages(table_name, columns=columns, page_size=page_size,
+                              order_by=order_by, gt_filters=gt_filters, gte_filters=gte_filters):
+        if skip_ids:
+            page = [row for row in page
+                    if not (row["id"] in skip_ids and _parse_timestamp(row.get(watermark_col)) == boundary)]
+        buffer.extend(page)
+        row_count += len(page)
+        if watermark_col:
+            for row in page:
+                row_time = _parse_timestamp(row.get(watermark_col))
+                if row_time is None:
+                    continue
+                if new_watermark_time is None or row_time > new_watermark_time:
+                    new_watermark, new_watermark_time = row[watermark_col], row_time
+                    new_watermark_ids = {row["id"]}
+                elif row_time == new_watermark_time:
+                    new_watermark_ids.add(row["id"])
+        if len(buffer) >= flush_rows:
+            flush()
+    flush()
+
+    if full_export:
+        if os.path.exists(table_dir):
+            shutil.rmtree(table_dir)
+        os.replace(write_dir, table_dir)
+
+    return {
+        "table": table_name,
+        "rows": row_count,
+        "files": batch_index,
+        "watermark": new_watermark,
+        # 旧版本状态且没有读到新行时，仍不知道水位线时间戳上有哪些行，保持 None
+        "watermark_ids": None if watermark_ids is None and new_watermark == watermark and not full_export
+        else sorted(new_watermark_ids),
+    }
+
+
+def export_dataset(output_dir: str, tables: List[str] = None, incremental: bool = True,
+                   page_size: int = 1000, compression: str = "zstd",
+                   db: SupabaseHandler = None) -> List[Dict[str, Any]]:
+    """
+    导出分析数据集
+
+    Args:
+        output_dir: 输出根目录
+        tables: 要导出的表，默认为 EXPORT_TABLES 中的全部表
+        incremental: 是否基于水位线增量导出
+        page_size: 每次分页读取的行数
+        compression: Parquet 压缩算法
+        db: 数据库处理器，默认新建
+
+    Returns:
+        list: 每张表的导出结果
+    """
+    db = db or SupabaseHandler()
+    tables = tables or list(EXPORT_TABLES.keys())
+    os.makedirs(output_dir, exist_ok=True)
+
+    watermarks = load_watermarks(output_dir) if incremental else {}
+    results = []
+    for table_name in tables:
+        if table_name not in EXPORT_TABLES:
+            raise ValueError(f"不支持导出的表: {table_name}")
+        state = watermarks.get(table_name) or {}
+        result = export_table(
+            db, table_name, output_dir,
+            watermark=state.get("watermark"),
+            watermark_ids=state.get("ids"),
+            page_size=page_size,
+            compression=compression,
+        )
+        if result["watermark"]:
+            watermarks[table_name] = {"watermark": result["watermark"], "ids": result["watermark_ids"]}
+        # 每张表完成后立即持久化水位线，中断后重跑不会重复导出已完成的表
+        save_watermarks(output_dir, watermarks)
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导出分析数据集为分区 Parquet")
+    parser.add_argument("--output", default="exports", help="输出目录")
+    parser.add_argument("--tables", nargs="*", choices=list(EXPORT_TABLES.keys()),
+                        help="要导出的表，默认全部")
+    parser.add_argument("--full", action="store_true", help="忽略水位线，全量导出")
+    parser.add_argument("--page-size", type=int, default=1000, help="分页大小")
+    parser.add_argument("--compression", default="zstd", help="Parquet 压缩算法")
+    args = parser.parse_args()
+
+    results = export_dataset(
+        args.output,
+        tables=args.tables,
+        incremental=not args.full,
+        page_size=args.page_size,
+        compression=args.compression,
+    )
+    for result in results:
+        print(f"{result['table']}: 导出 {result['rows']} 行, {result['files']} 批文件, 水位线 {result['watermark']}")
+
+
+if __name__ == "__main__":
+    main()
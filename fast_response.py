@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API 响应快速序列化
+使用 orjson 编码响应，按模型缓存 Pydantic TypeAdapter，列表接口可选择跳过对数据库行的重复校验。
+未安装 orjson 时退回标准库 json。
+"""
+
+import os
+from functools import lru_cache
+from typing import Any, List, Type
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为可选依赖
+    orjson = None
+
+# 设置环境变量 LADR_API_TRUSTED_ROWS=1 后，路由直接输出数据库行，不再按响应模型逐行校验
+TRUSTED_ROWS = os.getenv("LADR_API_TRUSTED_ROWS", "").lower() in ("1", "true", "yes")
+
+
+class FastJSONResponse(JSONResponse):
+    """使用 orjson 编码的 JSON 响应，支持 datetime、UUID 等类型"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+@lru_cache(maxsize=None)
+def get_type_adapter(model: Type[BaseModel], many: bool = False) -> TypeAdapter:
+    """
+    获取模型的 TypeAdapter，每个模型只构建一次
+
+    Args:
+        model: Pydantic 模型
+        many: True 表示 List[model]
+
+    Returns:
+        TypeAdapter
+    """
+    return TypeAdapter(List[model] if many else model)
+
+
+def render_rows(rows: Any, model: Type[BaseModel], many: bool = False, trusted: bool = None) -> Response:
+    """
+    将数据库行编码为响应
+
+    Args:
+        rows: 单行 (dict) 或行列表
+        model: 响应模型
+        many: rows 是否为列表
+        trusted: 是否跳过模型校验直接输出，None 表示使用 TRUSTED_ROWS 配置
+
+    Returns:
+        Response: 直接返回给 FastAPI，不再经过 response_model 的校验和编码
+    """
+    if trusted is None:
+        trusted = TRUSTED_ROWS
+    if trusted:
+        return FastJSONResponse(rows)
+    # 校验并按模型过滤字段后由 pydantic-core 直接编码为 JSON
+    adapter = get_type_adapter(model, many)
+    return Response(adapter.dump_json(adapter.validate_python(rows)), media_type="application/json")
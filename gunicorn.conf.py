@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+gunicorn 配置，使用 uvicorn worker 运行 api_app:
+
+    gunicorn -c gunicorn.conf.py "api_app:create_app()"
+
+参数与 python api_app.py 使用相同的环境变量。
+gunicorn 是可选依赖，不在 requirements.txt 中，使用前需 pip install gunicorn；
+不需要 gunicorn 的进程管理时直接运行 python api_app.py --workers N。
+"""
+
+from api_app import APISettings
+
+_settings = APISettings()
+
+bind = f"{_settings.host}:{_settings.port}"
+workers = _settings.workers
+worker_class = "uvicorn.workers.UvicornWorker"
+keepalive = _settings.keep_alive
+# 定期重启工作进程，避免长时间运行后的内存增长
+max_requests = 2000
+max_requests_jitter = 200
+timeout = 60
+graceful_timeout = 30
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP 条件请求
+为读接口生成 ETag 和 Last-Modified，客户端携带 If-None-Match / If-Modified-Since 且数据未变化时返回 304，
+轮询的客户端在数据不变时几乎不产生响应流量。
+
+每次插入和修改都会更新变更时间列的表（见 ETAG_WATERMARK_COLUMNS）用行数、最大 ID 和最大变更时间生成 ETag，
+其余表使用内容哈希。列表接口删除最新的行后最大变更时间会变小，只按 ETag 校验，不响应 If-Modified-Since。
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from supabase_handler import normalize_timestamp
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为可选依赖
+    orjson = None
+
+Rows = Union[Dict[str, Any], List[Dict[str, Any]]]
+
+# 可以用来生成 ETag 和 Last-Modified 的变更时间列：插入和修改（含 PUT、批量 PATCH）时都必须更新。
+# question_knowledge_point 的 created_time 在修改行时不变，不能用于判断数据是否变化，与其余表一样使用内容哈希
+ETAG_WATERMARK_COLUMNS = {
+    "question": "updated_time",
+}
+
+
+def _as_list(rows: Rows) -> List[Dict[str, Any]]:
+    return [rows] if isinstance(rows, dict) else list(rows)
+
+
+def _content_hash(rows: Rows) -> str:
+    if orjson is not None:
+        payload = orjson.dumps(rows, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    else:
+        payload = json.dumps(rows, sort_keys=True, default=str, ensure_ascii=False).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def compute_etag(rows: Rows, watermark_column: Optional[str] = None) -> str:
+    """
+    计算 ETag
+
+    Args:
+        rows: 单行或行列表
+        watermark_column: 变更时间列，None 时使用内容哈希
+
+    Returns:
+        str: 弱 ETag，例如 W/"q-120-987-2024-01-01T00:00:00+00:00"
+    """
+    row_list = _as_list(rows)
+    if watermark_column:
+        watermark = last_modified(rows, watermark_column)
+        max_id = max((row.get("id") or 0 for row in row_list), default=0)
+        tag = f"{len(row_list)}-{max_id}-{watermark.isoformat() if watermark else ''}"
+        # 单行接口还要区分不同的行
+        if isinstance(rows, dict):
+            tag = f"{rows.get('id')}-{tag}"
+        return f'W/"{hashlib.blake2b(tag.encode(), digest_size=12).hexdigest()}"'
+    return f'W/"{_content_hash(rows)}"'
+
+
+def last_modified(rows: Rows, watermark_column: Optional[str]) -> Optional[datetime]:
+    """取变更时间列的最大值，没有变更时间列时返回 None"""
+    if not watermark_column:
+        return None
+    values = [normalize_timestamp(row.get(watermark_column)) for row in _as_list(rows)]
+    latest = max((value for value in values if value), default=None)
+    if latest is None:
+        return None
+    try:
+        return datetime.fromisoformat(latest).astimezone(timezone.utc).replace(microsecond=0)
+    except ValueError:
+        return None
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match 使用弱比较"""
+    if header.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def is_not_modified(request: Request, etag: str, modified: Optional[datetime]) -> bool:
+    """
+    判断客户端缓存是否仍然有效；携带 If-None-Match 时忽略 If-Modified-Since
+
+    Args:
+        request: 当前请求
+        etag: 当前数据的 ETag
+        modified: 当前数据的最后修改时间，None 时不响应 If-Modified-Since
+
+    Returns:
+        bool: True 表示可以返回 304
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and modified is not None:
+        try:
+            return modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def conditional_response(request: Request, rows: Rows, render: Callable[[Rows], Response],
+                         watermark_column: Optional[str] = None) -> Response:
+    """
+    生成带缓存校验头的响应，客户端缓存仍然有效时返回不带响应体的 304
+
+    Args:
+        request: 当前请求
+        rows: 单行或行列表
+        render: 数据未命中缓存时生成完整响应的函数
+        watermark_column: 变更时间列，应取自 ETAG_WATERMARK_COLUMNS
+
+    Returns:
+        Response
+    """
+    etag = compute_etag(rows, watermark_column)
+    # 列表删除行后最大变更时间可能变小，Last-Modified 只用于单行接口
+    modified = last_modified(rows, watermark_column) if isinstance(rows, dict) else None
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if modified is not None:
+        headers["Last-Modified"] = format_datetime(modified, usegmt=True)
+
+    if is_not_modified(request, etag, modified):
+        return Response(status_code=304, headers=headers)
+    response = render(rows)
+    response.headers.update(headers)
+    return response
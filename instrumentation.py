@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+调用指标
+记录数据库调用（按表和操作）和 make_api_request / HTTP 请求（按资源）的耗时直方图、
+返回行数、响应大小和错误次数，可输出为 Prometheus 文本格式，也可汇总为表格供 Streamlit 调试面板显示。
+超过阈值或出错的数据库调用另写入慢查询日志（见 slow_query_log.py），
+Supabase / COS 的重试和断路器拒绝次数另有计数（见 resilience.py）。
+指标保存在进程内，多进程部署时每个工作进程各自统计。
+"""
+
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+from slow_query_log import get_slow_query_log
+
+# 直方图的桶上界
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (1, 10, 100, 1000, 10000, 100000)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024, 100 * 1024 * 1024)
+
+# 估算响应大小时最多序列化的行数，行数更多时按样本平均行大小推算
+PAYLOAD_SAMPLE_ROWS = 200
+
+# 指标名 -> (类型, 说明, 桶)
+METRICS: Dict[str, Tuple[str, str, Optional[tuple]]] = {
+    "ladr_db_request_duration_seconds": ("histogram", "Supabase 调用耗时", LATENCY_BUCKETS),
+    "ladr_db_rows": ("histogram", "Supabase 调用返回的行数", ROW_BUCKETS),
+    "ladr_db_response_bytes": ("histogram", "Supabase 调用返回数据的 JSON 大小（估算）", SIZE_BUCKETS),
+    "ladr_db_errors_total": ("counter", "Supabase 调用出错次数", None),
+    "ladr_api_request_duration_seconds": ("histogram", "make_api_request 耗时", LATENCY_BUCKETS),
+    "ladr_http_request_duration_seconds": ("histogram", "HTTP 请求耗时", LATENCY_BUCKETS),
+    "ladr_backend_retries_total": ("counter", "Supabase / COS 调用因暂时性错误重试的次数", None),
+    "ladr_circuit_rejections_total": ("counter", "断路器打开期间被直接拒绝的调用次数", None),
+    "ladr_shared_cache_requests_total": ("counter", "共享缓存的读取次数（hit / stale / miss / error）", None),
+}
+
+
+class Histogram:
+    """累积直方图，另记录最大值"""
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """按桶内线性插值估算分位数，落在最后一个桶时返回最大值"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= target and count:
+                if index == len(self.buckets):
+                    return self.max
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = min(self.buckets[index], self.max)
+                return lower + (upper - lower) * (target - seen) / count
+            seen += count
+        return self.max
+
+
+class MetricsRegistry:
+    """线程安全的指标存储"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (指标名, 标签) -> Histogram 或计数
+        self._histograms: Dict[Tuple[str, tuple], Histogram] = {}
+        self._counters: Dict[Tuple[str, tuple], float] = {}
+
+    def observe(self, name: str, labels: Dict[str, str], value: float):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(METRICS[name][2])
+            histogram.observe(value)
+
+    def inc(self, name: str, labels: Dict[str, str], amount: float = 1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def histograms(self, name: str) -> List[Tuple[Dict[str, str], Histogram]]:
+        with self._lock:
+            return [(dict(labels), histogram) for (metric, labels), histogram in self._histograms.items()
+                    if metric == name]
+
+    def counters(self, name: str) -> List[Tuple[Dict[str, str], float]]:
+        with self._lock:
+            return [(dict(labels), value) for (metric, labels), value in self._counters.items() if metric == name]
+
+    def render_prometheus(self) -> str:
+        """输出 Prometheus 文本格式（0.0.4）"""
+        lines = []
+        for name, (metric_type, help_text, buckets) in METRICS.items():
+            if metric_type == "histogram":
+                series = self.histograms(name)
+            else:
+                series = self.counters(name)
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in sorted(series, key=lambda item: sorted(item[0].items())):
+                if metric_type == "counter":
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + (float("inf"),), value.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_format_labels({**labels, 'le': le})} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {value.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in sorted(labels.items())) + "}"
+
+
+# 进程内共享的指标
+metrics = MetricsRegistry()
+
+
+def estimate_payload_bytes(rows: Any) -> int:
+    """估算数据序列化为 JSON 后的字节数，行数较多时只序列化前 PAYLOAD_SAMPLE_ROWS 行推算"""
+    if isinstance(rows, list) and len(rows) > PAYLOAD_SAMPLE_ROWS:
+        sample = orjson.dumps(rows[:PAYLOAD_SAMPLE_ROWS], default=str)
+        return int(len(sample) * len(rows) / PAYLOAD_SAMPLE_ROWS)
+    return len(orjson.dumps(rows, default=str))
+
+
+class DBCall:
+    """一次数据库调用的结果，由调用方在得到响应后设置"""
+
+    def __init__(self):
+        self.rows: Optional[list] = None
+        # 调用结束后填入估算的响应大小
+        self.payload_bytes: Optional[int] = None
+
+    def set_result(self, rows: Optional[list]):
+        self.rows = rows
+
+
+@contextmanager
+def track_db_call(table: str, operation: str, details: Dict[str, Any] = None):
+    """
+    记录一次数据库调用的耗时、行数、响应大小和错误，异常会继续向外抛出
+
+    Args:
+        table: 表名
+        operation: 操作名，例如 select、insert_many
+        details: 查询参数（columns、filters 等），只写入慢查询日志
+    """
+    call = DBCall()
+    labels = {"table": table, "operation": operation}
+    started = time.perf_counter()
+    error = None
+    try:
+        yield call
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        metrics.inc("ladr_db_errors_total", {**labels, "error": type(e).__name__})
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        metrics.observe("ladr_db_request_duration_seconds", {**labels, "status": "error" if error else "ok"}, duration)
+        if call.rows is not None:
+            call.payload_bytes = estimate_payload_bytes(call.rows)
+            metrics.observe("ladr_db_rows", labels, len(call.rows))
+            metrics.observe("ladr_db_response_bytes", labels, call.payload_bytes)
+        get_slow_query_log().record(table, operation, duration * 1000,
+                                    rows=len(call.rows) if call.rows is not None else None,
+                                    payload_bytes=call.payload_bytes, error=error, details=details)
+
+
+def record_api_request(resource: str, method: str, success: bool, seconds: float):
+    """记录一次 make_api_request 调用"""
+    metrics.observe("ladr_api_request_duration_seconds",
+                    {"resource": resource, "method": method, "status": "ok" if success else "error"}, seconds)
+
+
+def record_http_request(route: str, method: str, status_code: int, seconds: float):
+    """记录一次 HTTP 请求，route 为路由模板，避免每个 ID 产生一组指标"""
+    metrics.observe("ladr_http_request_duration_seconds",
+                    {"route": route, "method": method, "status": str(status_code)}, seconds)
+
+
+def record_retry(backend: str, operation: str):
+    """记录一次重试"""
+    metrics.inc("ladr_backend_retries_total", {"backend": backend, "operation": operation})
+
+
+def record_circuit_rejection(backend: str, operation: str):
+    """记录一次被断路器拒绝的调用"""
+    metrics.inc("ladr_circuit_rejections_total", {"backend": backend, "operation": operation})
+
+
+def record_shared_cache(table: str, result: str):
+    """记录一次共享缓存读取，result 为 hit / stale / miss / error"""
+    metrics.inc("ladr_shared_cache_requests_total", {"table": table, "result": result})
+
+
+# ==================== 汇总 ====================
+
+def db_summary() -> List[Dict[str, Any]]:
+    """
+    按表和操作汇总数据库调用
+
+    Returns:
+        list: 每项包含调用次数、错误次数、耗时（毫秒，平均 / p95 / 最大 / 合计）、行数和响应大小，按总耗时降序
+    """
+    summary: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def entry(labels: Dict[str, str]) -> Dict[str, Any]:
+        key = (labels["table"], labels["operation"])
+        if key not in summary:
+            summary[key] = {"table": key[0], "operation": key[1], "calls": 0, "errors": 0,
+                            "total_ms": 0.0, "avg_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0,
+                            "avg_rows": 0.0, "max_rows": 0, "avg_kb": 0.0, "max_kb": 0.0}
+        return summary[key]
+
+    latency: Dict[Tuple[str, str], Histogram] = {}
+    for labels, histogram in metrics.histograms("ladr_db_request_duration_seconds"):
+        key = (labels["table"], labels["operation"])
+        merged = latency.setdefault(key, Histogram(histogram.buckets))
+        merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+        merged.sum += histogram.sum
+        merged.count += histogram.count
+        merged.max = max(merged.max, histogram.max)
+        entry(labels)
+    for (table, operation), histogram in latency.items():
+        item = summary[(table, operation)]
+        item.update(calls=histogram.count, total_ms=histogram.sum * 1000,
+                    avg_ms=histogram.sum / histogram.count * 1000 if histogram.count else 0.0,
+                    p95_ms=histogram.quantile(0.95) * 1000, max_ms=histogram.max * 1000)
+    for labels, value in metrics.counters("ladr_db_errors_total"):
+        entry(labels)["errors"] += int(value)
+    for labels, histogram in metrics.histograms("ladr_db_rows"):
+        entry(labels).update(avg_rows=histogram.sum / histogram.count if histogram.count else 0.0,
+                             max_rows=int(histogram.max))
+    for labels, histogram in metrics.histograms("ladr_db_response_bytes"):
+        entry(labels).update(avg_kb=histogram.sum / histogram.count / 1024 if histogram.count else 0.0,
+                             max_kb=histogram.max / 1024)
+    return sorted(summary.values(), key=lambda item: item["total_ms"], reverse=True)
+
+
+def api_summary(metric: str = "ladr_api_request_duration_seconds") -> List[Dict[str, Any]]:
+    """
+    汇总 make_api_request（或 HTTP 请求）的耗时
+
+    Returns:
+        list: 每组标签一项，包含调用次数和耗时（毫秒），按总耗时降序
+    """
+    rows = []
+    for labels, histogram in metrics.histograms(metric):
+        rows.append({
+            **labels,
+            "calls": histogram.count,
+            "total_ms": histogram.sum * 1000,
+            "avg_ms": histogram.sum / histogram.count * 1000 if histogram.count else 0.0,
+            "p95_ms": histogram.quantile(0.95) * 1000,
+            "max_ms": histogram.max * 1000,
+        })
+    return sorted(rows, key=lambda item: item["total_ms"], reverse=True)
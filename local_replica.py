@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地只读副本
+将 Supabase 中的数据增量同步到本地 SQLite 文件，页面读取和错题分析直接在本地执行 SQL，
+Supabase 延迟抖动时应用仍可使用最近一次同步的数据。
+增量同步的水位线保存在 _sync_watermark 表中，只由从 Supabase 读取的行推进；
+写操作直写进副本的行不影响水位线，否则其他实例较早的修改会落在水位线之下而再也读不到。
+
+在 .streamlit/secrets.toml 中启用:
+
+    [local_replica]
+    path = "data/ladr_replica.db"
+    sync_interval = 30
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional
+
+from app_config import load_config
+from supabase_handler import SupabaseHandler, SYNC_WATERMARK_COLUMNS, normalize_timestamp
+
+# BOOLEAN 列在 SQLite 中存为 0/1，读取时还原为 bool
+sqlite3.register_converter("BOOLEAN", lambda value: value == b"1")
+
+# 副本表结构：列定义与需要建立的索引
+REPLICA_TABLES: Dict[str, Dict[str, Any]] = {
+    "user": {
+        "columns": {"id": "INTEGER PRIMARY KEY", "username": "TEXT", "password_hash": "TEXT", "created_at": "TEXT"},
+        "indexes": ["username"],
+    },
+    "student": {
+        "columns": {"id": "INTEGER PRIMARY KEY", "user_id": "INTEGER", "name": "TEXT"},
+        "indexes": ["user_id"],
+    },
+    "exam_paper": {
+        "columns": {"id": "INTEGER PRIMARY KEY", "student_id": "INTEGER", "title": "TEXT",
+                    "description": "TEXT", "created_time": "TEXT"},
+        "indexes": ["student_id, created_time"],
+    },
+    "exam_paper_image": {
+        "columns": {"id": "INTEGER PRIMARY KEY", "exam_paper_id": "INTEGER", "image_url": "TEXT",
+                    "upload_order": "INTEGER"},
+        "indexes": ["exam_paper_id"],
+    },
+    "knowledge_point": {
+        "columns": {"id": "INTEGER PRIMARY KEY", "name": "TEXT"},
+        "indexes": [],
+    },
+    "question": {
+        "columns": {"id": "INTEGER PRIMARY KEY", "exam_paper_id": "INTEGER", "image_id": "INTEGER",
+                    "student_id": "INTEGER", "content": "TEXT", "is_correct": "BOOLEAN", "remark": "TEXT",
+                    "created_time": "TEXT", "updated_time": "TEXT"},
+        "indexes": ["exam_paper_id", "student_id", "image_id", "updated_time"],
+    },
+    "question_knowledge_point": {
+        "columns": {"id": "INTEGER PRIMARY KEY", "question_id": "INTEGER", "knowledge_point_id": "INTEGER",
+                    "created_time": "TEXT"},
+        "indexes": ["question_id", "knowledge_point_id", "created_time"],
+    },
+}
+
+# 以 TEXT 存储的时间列，写入前统一规范化为 UTC ISO 格式，保证字符串比较与时间先后一致
+TIMESTAMP_COLUMNS = {"created_at", "created_time", "updated_time"}
+
+
+class LocalReplica:
+    """基于 SQLite 的本地只读副本"""
+
+    def __init__(self, path: str, db: SupabaseHandler = None, sync_interval: float = 30,
+                 reconcile_interval: float = 300, page_size: int = 1000):
+        """
+        初始化本地副本
+
+        Args:
+            path: SQLite 文件路径
+            db: 数据库处理器，用于从 Supabase 同步
+            sync_interval: 后台增量同步间隔（秒）
+            reconcile_interval: 全量核对 id 以清理已删除行的间隔（秒）
+            page_size: 同步时的分页大小
+        """
+        self.path = path
+        self.db = db
+        self.sync_interval = sync_interval
+        self.reconcile_interval = reconcile_interval
+        self.page_size = page_size
+
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._last_reconcile: Dict[str, float] = {}
+        self._sync_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._create_schema()
+
+    # ==================== 连接与表结构 ====================
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取当前线程的连接（sqlite3 连接不能跨线程共享）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, detect_types=sqlite3.PARSE_DECLTYPES, timeout=30)
+            conn.row_factory = sqlite3.Row
+            # WAL 模式下同步写入不会阻塞页面读取
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        conn = self._connect()
+        with conn:
+            for table_name, config in REPLICA_TABLES.items():
+                column_defs = ", ".join(f"{name} {ctype}" for name, ctype in config["columns"].items())
+                conn.execute(f'CREATE TABLE IF NOT EXISTS "{table_name}" ({column_defs})')
+                for index_cols in config["indexes"]:
+                    index_name = f"idx_{table_name}_" + "_".join(c.strip() for c in index_cols.split(","))
+                    conn.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON "{table_name}" ({index_cols})')
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS _sync_state (table_name TEXT PRIMARY KEY, last_sync REAL)"
+            )
+            # watermark_ids: 变更时间恰好等于水位线、已同步的行 ID（JSON 数组），下次按 >= 读取时跳过
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS _sync_watermark "
+                "(table_name TEXT PRIMARY KEY, watermark TEXT, watermark_ids TEXT, max_id INTEGER)"
+            )
+
+    # ==================== 写入 ====================
+
+    def _prepare_row(self, table_name: str, row: Dict[str, Any]) -> tuple:
+        columns = REPLICA_TABLES[table_name]["columns"]
+        values = []
+        for name in columns:
+            value = row.get(name)
+            if name in TIMESTAMP_COLUMNS:
+                value = normalize_timestamp(value)
+            elif isinstance(value, bool):
+                value = int(value)
+            values.append(value)
+        return tuple(values)
+
+    def upsert_rows(self, table_name: str, rows: List[Dict[str, Any]], conn: sqlite3.Connection = None):
+        """
+        写入或覆盖数据行（同时用于同步和写操作后的直写）
+
+        Args:
+            table_name: 表名
+            rows: 数据行
+            conn: 可选的连接，用于在调用方的事务中执行
+        """
+        if not rows:
+            return
+        columns = list(REPLICA_TABLES[table_name]["columns"].keys())
+        placeholders = ", ".join("?" for _ in columns)
+        sql = f'INSERT OR REPLACE INTO "{table_name}" ({", ".join(columns)}) VALUES ({placeholders})'
+        params = [self._prepare_row(table_name, row) for row in rows]
+        if conn is not None:
+            conn.executemany(sql, params)
+        else:
+            conn = self._connect()
+            with conn:
+                conn.executemany(sql, params)
+
+    def delete_row(self, table_name: str, row_id: int):
+        """删除一行（用于删除操作后的直写）"""
+        conn = self._connect()
+        with conn:
+            conn.execute(f'DELETE FROM "{table_name}" WHERE id = ?', (row_id,))
+
+    # ==================== 同步 ====================
+
+    def _sync_full(self, table_name: str) -> List[Dict[str, Any]]:
+        """全量刷新整张表，返回读取到的行"""
+        rows = []
+        for page in self.db.iter_pages(table_name, page_size=self.page_size):
+            rows.extend(page)
+        conn = self._connect()
+        with conn:
+            conn.execute(f'DELETE FROM "{table_name}"')
+            self.upsert_rows(table_name, rows, conn=conn)
+        return rows
+
+    def _load_watermark(self, table_name: str) -> Optional[tuple]:
+        """读取上次同步保存的 (水位线, 水位线上已同步的行 ID, 已同步的最大 ID)，从未记录时返回 None"""
+        row = self._connect().execute(
+            "SELECT watermark, watermark_ids, max_id FROM _sync_watermark WHERE table_name = ?", (table_name,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], set(json.loads(row[1] or "[]")), row[2] or 0
+
+    def _save_watermark(self, table_name: str, watermark: Optional[str], watermark_ids: set, max_id: int):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO _sync_watermark (table_name, watermark, watermark_ids, max_id) "
+                "VALUES (?, ?, ?, ?)",
+                (table_name, watermark, json.dumps(sorted(watermark_ids)), max_id)
+            )
+
+    @staticmethod
+    def _advance_watermark(watermark: Optional[str], watermark_ids: set, rows: List[Dict[str, Any]],
+                           watermark_col: str) -> tuple:
+        """用从 Supabase 读取的行推进水位线，返回新的 (水位线, 水位线上已同步的行 ID)"""
+        for row in rows:
+            value = normalize_timestamp(row.get(watermark_col))
+            if not value:
+                continue
+            if watermark is None or value > watermark:
+                watermark, watermark_ids = value, {row["id"]}
+            elif value == watermark:
+                watermark_ids.add(row["id"])
+        return watermark, watermark_ids
+
+    def _sync_incremental(self, table_name: str, watermark_col: str):
+        """按水位线增量同步，并定期核对 id 清理已删除的行"""
+        state = self._load_watermark(table_name)
+        if state is None:
+            # 首次同步（或旧版本的副本文件没有记录水位线）时全量读取
+            rows = self._sync_full(table_name)
+            watermark, watermark_ids = self._advance_watermark(None, set(), rows, watermark_col)
+            self._save_watermark(table_name, watermark, watermark_ids,
+                                 max((row["id"] for row in rows), default=0))
+            self._last_reconcile[table_name] = time.time()
+            return
+
+        # 变更时间不早于水位线的行，跳过水位线上已同步的行
+        watermark, seen_ids, max_id = state
+        new_watermark, new_ids = watermark, set(seen_ids)
+        if watermark is not None:
+            for page in self.db.iter_pages(table_name, page_size=self.page_size,
+                                           gte_filters={watermark_col: watermark},
+                                           order_by=f"{watermark_col},id"):
+                self.upsert_rows(table_name, [row for row in page if not (
+                    row["id"] in seen_ids and normalize_timestamp(row.get(watermark_col)) == watermark)])
+                new_watermark, new_ids = self._advance_watermark(new_watermark, new_ids, page, watermark_col)
+        # 按 id 补读新插入但变更时间列为空的行
+        for page in self.db.iter_pages(table_name, page_size=self.page_size,
+                                       gt_filters={"id": max_id}, order_by="id"):
+            self.upsert_rows(table_name, page)
+            max_id = max(max_id, max(row["id"] for row in page))
+        self._save_watermark(table_name, new_watermark, new_ids, max_id)
+
+        now = time.time()
+        if now - self._last_reconcile.get(table_name, 0) >= self.reconcile_interval:
+            self._reconcile_ids(table_name)
+            self._last_reconcile[table_name] = now
+
+    def _reconcile_ids(self, table_name: str):
+        """只读取 id 列，删除本地存在但远端已删除的行"""
+        remote_ids = []
+        for page in self.db.iter_pages(table_name, columns="id", page_size=self.page_size):
+            remote_ids.extend((row["id"],) for row in page)
+        conn = self._connect()
+        with conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS _remote_ids (id INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM _remote_ids")
+            conn.executemany("INSERT OR IGNORE INTO _remote_ids (id) VALUES (?)", remote_ids)
+            conn.execute(f'DELETE FROM "{table_name}" WHERE id NOT IN (SELECT id FROM _remote_ids)')
+
+    def sync(self, tables: List[str] = None) -> Dict[str, str]:
+        """
+        同步副本
+
+        Args:
+            tables: 要同步的表，默认全部
+
+        Returns:
+            dict: 每张表的同步结果（"ok" 或错误信息）
+        """
+        results = {}
+        with self._sync_lock:
+            for table_name in tables or REPLICA_TABLES.keys():
+                try:
+                    watermark_col = SYNC_WATERMARK_COLUMNS.get(table_name)
+                    if watermark_col:
+                        self._sync_incremental(table_name, watermark_col)
+                    else:
+                        self._sync_full(table_name)
+                    conn = self._connect()
+                    with conn:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO _sync_state (table_name, last_sync) VALUES (?, ?)",
+                            (table_name, time.time())
+                        )
+                    results[table_name] = "ok"
+                except Exception as e:
+                    # 同步失败时保留旧数据继续提供读取
+                    print(f"同步本地副本 {table_name} 时出错: {e}")
+                    results[table_name] = str(e)
+        return results
+
+    def is_initialized(self) -> bool:
+        """副本是否已完成过至少一次同步"""
+        row = self._connect().execute("SELECT COUNT(*) FROM _sync_state").fetchone()
+        return row[0] >= len(REPLICA_TABLES)
+
+    def start_background_sync(self):
+        """启动后台同步线程；首次使用时先同步一次，保证页面读取到完整数据"""
+        if self._sync_thread is not None:
+            return
+        if not self.is_initialized():
+            self.sync()
+
+        def run():
+            while not self._stop_event.wait(self.sync_interval):
+                self.sync()
+
+        self._sync_thread = threading.Thread(target=run, name="local-replica-sync", daemon=True)
+        self._sync_thread.start()
+
+    def stop_background_sync(self):
+        self._stop_event.set()
+
+    # ==================== 读取 ====================
+
+    def select(self, table_name: str, filters: dict = None) -> List[Dict[str, Any]]:
+        """
+        从副本查询数据，接口与 SupabaseHandler.select_data 一致
+
+        Args:
+            table_name: 表名
+            filters: 精确匹配过滤条件
+
+        Returns:
+            list: 数据行
+        """
+        columns = REPLICA_TABLES[table_name]["columns"]
+        sql = f'SELECT * FROM "{table_name}"'
+        params = []
+        if filters:
+            conditions = []
+            for column, value in filters.items():
+                if column not in columns:
+                    raise ValueError(f"未知的列: {table_name}.{column}")
+                conditions.append(f"{column} = ?")
+                params.append(value)
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY id"
+        return [dict(row) for row in self._connect().execute(sql, params)]
+
+    def select_in(self, table_name: str, column: str, values: list) -> List[Dict[str, Any]]:
+        """
+        从副本查询某列取值在给定列表中的行，接口与 SupabaseHandler.select_in 一致
+
+        Args:
+            table_name: 表名
+            column: 匹配的列
+            values: 取值列表
+
+        Returns:
+            list: 数据行
+        """
+        if column not in REPLICA_TABLES[table_name]["columns"]:
+            raise ValueError(f"未知的列: {table_name}.{column}")
+        values = list(values)
+        if not values:
+            return []
+        placeholders = ", ".join("?" for _ in values)
+        sql = f'SELECT * FROM "{table_name}" WHERE {column} IN ({placeholders}) ORDER BY id'
+        return [dict(row) for row in self._connect().execute(sql, values)]
+
+    def query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        """执行任意只读 SQL"""
+        return [dict(row) for row in self._connect().execute(sql, params)]
+
+    # ==================== 分析查询 ====================
+
+    def paper_error_stats(self, student_id: int, exam_paper_id: int) -> Dict[str, Any]:
+        """
+        计算学生在某张试卷上的错题统计，返回结构与错题分析页面的 calculate_error_rate 一致
+
+        Args:
+            student_id: 学生ID
+            exam_paper_id: 试卷ID
+
+        Returns:
+            dict: 总题数、错题数、错题率和错题列表
+        """
+        conn = self._connect()
+        total = conn.execute(
+            "SELECT COUNT(*) FROM question WHERE exam_paper_id = ? AND student_id = ?",
+            (exam_paper_id, student_id)
+        ).fetchone()[0]
+        # is_correct 为 NULL 时按错题处理
+        error_list = self.query(
+            "SELECT * FROM question WHERE exam_paper_id = ? AND student_id = ? "
+            "AND COALESCE(is_correct, 0) = 0 ORDER BY id",
+            (exam_paper_id, student_id)
+        )
+        error_count = len(error_list)
+        return {
+            "total_questions": total,
+            "error_questions": error_count,
+            "error_rate": (error_count / total * 100) if total > 0 else 0,
+            "error_list": error_list,
+        }
+
+    def trend_stats(self, student_id: int, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """
+        按试卷汇总学生在时间范围内的题目数和错题数
+
+        Args:
+            student_id: 学生ID
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+
+        Returns:
+            list: 每张试卷一行，包含 paper_id、paper_title、created_time、total_questions、error_questions
+        """
+        return self.query(
+            """
+            SELECT p.id AS paper_id,
+                   COALESCE(p.title, '试卷' || p.id) AS paper_title,
+                   p.created_time AS created_time,
+                   COUNT(q.id) AS total_questions,
+                   COALESCE(SUM(CASE WHEN COALESCE(q.is_correct, 0) = 0 THEN 1 ELSE 0 END), 0) AS error_questions
+            FROM exam_paper p
+            LEFT JOIN question q ON q.exam_paper_id = p.id
+            WHERE p.student_id = ? AND p.created_time >= ? AND p.created_time <= ?
+            GROUP BY p.id
+            ORDER BY p.created_time
+            """,
+            (student_id, start_date + "T00:00:00+00:00", end_date + "T23:59:59.999999+00:00")
+        )
+
+
+def create_local_replica(db: SupabaseHandler) -> Optional[LocalReplica]:
+    """
+    根据 secrets 配置创建本地副本，未配置时返回 None
+
+    Args:
+        db: 数据库处理器
+
+    Returns:
+        LocalReplica: 已启动后台同步的本地副本
+    """
+    config = load_config("local_replica")
+    if not config or not config.get("path"):
+        return None
+
+    try:
+        replica = LocalReplica(
+            config["path"],
+            db=db,
+            sync_interval=config.get("sync_interval", 30),
+            reconcile_interval=config.get("reconcile_interval", 300),
+        )
+        replica.start_background_sync()
+        return replica
+    except Exception as e:
+        print(f"初始化本地副本失败，改为直接读取 Supabase: {e}")
+        return None
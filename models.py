@@ -1,7 +1,7 @@
 """Pydantic models for API request/response validation."""
 
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 
@@ -215,4 +215,21 @@ class BatchQuestionResponse(BaseModel):
     success_count: int
     failed_count: int
     created_questions: List[QuestionResponse]
-    errors: List[str]
\ No newline at end of file
+    errors: List[str]
+
+
+# Bulk operation models
+class BulkItemResult(BaseModel):
+    """批量操作中单条记录的处理结果"""
+    index: int
+    id: Optional[int] = None
+    success: bool
+    error: Optional[str] = None
+    data: Optional[Dict[str, Any]] = None
+
+
+class BulkResponse(BaseModel):
+    """批量操作的响应模型"""
+    success_count: int
+    failed_count: int
+    results: List[BulkItemResult]
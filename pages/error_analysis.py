@@ -9,7 +9,12 @@ import sys
 
 # 添加父目录到路径以导入api_service
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from api_service import make_api_request
+from api_service import make_api_request, api_service
+from swr_cache import swr_cache
+from columnar import ColumnarTable
+from batch_loader import BatchLoader
+from report_export import ExportManager, ExportRequest, EXPORT_FORMATS
+from trend_analysis import get_trend_analysis, get_trend_buckets, GRANULARITY_LABELS
 
 # 导入学生选择相关函数
 try:
@@ -20,36 +25,37 @@ except ImportError:
 
 
 # 获取数据的辅助函数
-@st.cache_data(ttl=30)
-def get_students() -> List[Dict]:
+@swr_cache(ttl=30, columnar=True, tables=("student",))
+def get_students() -> ColumnarTable:
     """获取学生列表"""
     result = make_api_request("GET", "students")
     return result["data"] if result["success"] else []
 
-@st.cache_data(ttl=30)
-def get_exam_papers() -> List[Dict]:
+@swr_cache(ttl=30, columnar=True, tables=("exam_paper",))
+def get_exam_papers() -> ColumnarTable:
     """获取试卷列表"""
     result = make_api_request("GET", "exam_papers")
     return result["data"] if result["success"] else []
 
-@st.cache_data(ttl=30)
-def get_questions() -> List[Dict]:
+@swr_cache(ttl=30, columnar=True, tables=("question",))
+def get_questions() -> ColumnarTable:
     """获取题目列表"""
     result = make_api_request("GET", "questions")
     return result["data"] if result["success"] else []
 
-@st.cache_data(ttl=30)
-def get_exam_paper_images() -> List[Dict]:
-    """获取试卷图片列表"""
-    result = make_api_request("GET", "exam_paper_images")
-    return result["data"] if result["success"] else []
+@st.cache_resource
+def get_export_manager() -> ExportManager:
+    """所有会话共享的报告导出任务管理器"""
+    return ExportManager(api_service)
 
-def calculate_error_rate(student_id: int, exam_paper_id: int, questions: List[Dict]) -> Dict:
+def calculate_error_rate(student_id: int, exam_paper_id: int, questions: ColumnarTable) -> Dict:
     """计算错题比例"""
+    # 配置了本地副本时直接在副本上用 SQL 汇总
+    if api_service.replica is not None:
+        return api_service.replica.paper_error_stats(student_id, exam_paper_id)
+    
     # 过滤出该学生在该试卷上的题目
-    exam_questions = [q for q in questions 
-                     if q.get('exam_paper_id') == exam_paper_id 
-                     and q.get('student_id') == student_id]
+    exam_questions = questions.where(exam_paper_id=exam_paper_id, student_id=student_id).to_rows()
     
     if not exam_questions:
         return {"total_questions": 0, "error_questions": 0, "error_rate": 0, "error_list": []}
@@ -72,55 +78,6 @@ def calculate_error_rate(student_id: int, exam_paper_id: int, questions: List[Di
         "error_list": error_questions
     }
 
-def calculate_trend_analysis(student_id: int, start_date: str, end_date: str, 
-                           exam_papers: List[Dict], questions: List[Dict]) -> Dict:
-    """计算指定时间范围内的错题趋势分析"""
-    # 过滤时间范围内的试卷
-    filtered_papers = []
-    for paper in exam_papers:
-        if paper.get('student_id') == student_id and paper.get('created_time'):
-            try:
-                # 解析试卷创建时间
-                paper_date = datetime.fromisoformat(paper['created_time'].replace('Z', '+00:00'))
-                start_dt = datetime.fromisoformat(start_date + 'T00:00:00+00:00')
-                end_dt = datetime.fromisoformat(end_date + 'T23:59:59+00:00')
-                
-                if start_dt <= paper_date <= end_dt:
-                    filtered_papers.append(paper)
-            except (ValueError, TypeError):
-                continue
-    
-    # 计算每张试卷的错题率
-    trend_data = []
-    for paper in filtered_papers:
-        paper_questions = [q for q in questions if q.get('exam_paper_id') == paper['id']]
-        
-        if paper_questions:
-            total_count = len(paper_questions)
-            error_count = sum(1 for q in paper_questions if not q.get('is_correct', False))
-            error_rate = (error_count / total_count * 100) if total_count > 0 else 0
-            
-            trend_data.append({
-                'paper_id': paper['id'],
-                'paper_title': paper.get('title', f'试卷{paper["id"]}'),
-                'created_time': paper['created_time'],
-                'total_questions': total_count,
-                'error_questions': error_count,
-                'error_rate': error_rate,
-                'correct_rate': 100 - error_rate
-            })
-    
-    # 按时间排序
-    trend_data.sort(key=lambda x: x['created_time'])
-    
-    return {
-        'papers_in_range': len(filtered_papers),
-        'trend_data': trend_data,
-        'total_questions_all': sum(item['total_questions'] for item in trend_data),
-        'total_errors_all': sum(item['error_questions'] for item in trend_data),
-        'average_error_rate': sum(item['error_rate'] for item in trend_data) / len(trend_data) if trend_data else 0
-    }
-
 def main():
     st.title("📊 错题分析")
     
@@ -143,7 +100,8 @@ def main():
     students = get_students()
     exam_papers = get_exam_papers()
     questions = get_questions()
-    exam_paper_images = get_exam_paper_images()
+    # 本次渲染内按 ID 读取的图片合并为一次查询
+    loader = BatchLoader(api_service.fetch_rows_by_ids)
     
     if not students:
         st.error("无法获取学生数据")
@@ -157,15 +115,15 @@ def main():
     if is_student_selected():
         selected_student_id = get_selected_student_id()
         # 筛选该学生的试卷
-        filtered_exam_papers = [ep for ep in exam_papers if ep.get('student_id') == selected_student_id]
+        filtered_exam_papers = exam_papers.where(student_id=selected_student_id)
         # 筛选该学生的题目
-        filtered_questions = [q for q in questions if q.get('student_id') == selected_student_id]
+        filtered_questions = questions.where(student_id=selected_student_id)
     else:
         filtered_exam_papers = exam_papers
         filtered_questions = questions
     
     # 创建选项卡
-    tab1, tab2 = st.tabs(["📋 单卷错题分析", "📈 错题趋势分析"])
+    tab1, tab2, tab3 = st.tabs(["📋 单卷错题分析", "📈 错题趋势分析", "📥 导出报告"])
     
     with tab1:
         # 创建两列布局
@@ -189,7 +147,7 @@ def main():
         with col2:
             # 试卷选择 - 根据选中的学生筛选试卷
             if selected_student_id:
-                student_exam_papers = [ep for ep in filtered_exam_papers if ep.get('student_id') == selected_student_id]
+                student_exam_papers = filtered_exam_papers.where(student_id=selected_student_id)
                 if student_exam_papers:
                     exam_paper_options = {f"{ep['title']} (ID: {ep['id']})": ep['id'] for ep in student_exam_papers}
                     selected_exam_paper_display = st.selectbox(
@@ -233,6 +191,7 @@ def main():
             # 显示错题列表
             if error_analysis["error_list"]:
                 st.subheader("❌ 错题列表")
+                loader.prime("exam_paper_image", [q.get('image_id') for q in error_analysis["error_list"]])
                 
                 for i, question in enumerate(error_analysis["error_list"], 1):
                     with st.expander(f"错题 {i}: {question.get('content', '无题目内容')[:50]}..."):
@@ -256,10 +215,7 @@ def main():
                             question_image_id = question.get('image_id')
                             if question_image_id:
                                 # 根据image_id查找对应的图片
-                                question_image = next(
-                                    (img for img in exam_paper_images if img.get('id') == question_image_id), 
-                                    None
-                                )
+                                question_image = loader.load("exam_paper_image", question_image_id)
                                 
                                 if question_image and question_image.get('image_url'):
                                     st.write("**题目图片:**")
@@ -296,8 +252,8 @@ def main():
             )
             selected_student_trend_id = student_options_trend[selected_student_trend] if selected_student_trend else None
         
-        # 时间范围选择
-        col1, col2 = st.columns(2)
+        # 时间范围与统计粒度选择
+        col1, col2, col3 = st.columns(3)
         with col1:
             start_date = st.date_input(
                 "开始日期",
@@ -310,17 +266,20 @@ def main():
                 value=datetime.now(),
                 key="trend_end_date"
             )
+        with col3:
+            granularity = st.selectbox(
+                "统计粒度",
+                options=list(GRANULARITY_LABELS.keys()),
+                index=1,
+                format_func=lambda g: f"按{GRANULARITY_LABELS[g]}",
+                key="trend_granularity"
+            )
+        granularity_label = GRANULARITY_LABELS[granularity]
         
         if selected_student_trend_id and start_date and end_date:
             if start_date <= end_date:
-                # 计算趋势分析
-                trend_analysis = calculate_trend_analysis(
-                    selected_student_trend_id, 
-                    start_date.isoformat(), 
-                    end_date.isoformat(),
-                    filtered_exam_papers, 
-                    filtered_questions
-                )
+                # 计算趋势分析（按学生缓存试卷统计，调整日期和粒度时只做切片聚合）
+                trend_analysis = get_trend_analysis(selected_student_trend_id, start_date, end_date)
                 
                 if trend_analysis['trend_data']:
                     st.markdown("---")
@@ -340,55 +299,41 @@ def main():
                     st.markdown("---")
                     
                     # 创建趋势图表
-                    st.subheader("📈 错题率趋势图（按周分组）")
+                    st.subheader(f"📈 错题率趋势图（按{granularity_label}分组）")
                     
-                    # 准备图表数据
-                    trend_df = pd.DataFrame(trend_analysis['trend_data'])
-                    trend_df['date'] = pd.to_datetime(trend_df['created_time'])
-                    
-                    # 按周分组聚合数据
-                    trend_df['week'] = trend_df['date'].dt.to_period('W').dt.start_time
-                    weekly_data = trend_df.groupby('week').agg({
-                        'total_questions': 'sum',
-                        'error_questions': 'sum',
-                        'paper_title': 'count'  # 统计该周的试卷数量
-                    }).reset_index()
-                    
-                    # 计算每周的错题率
-                    weekly_data['error_rate'] = (weekly_data['error_questions'] / weekly_data['total_questions'] * 100).fillna(0)
-                    weekly_data['correct_rate'] = 100 - weekly_data['error_rate']
-                    weekly_data['week_str'] = weekly_data['week'].dt.strftime('%Y年第%U周')
+                    # 按所选粒度聚合数据
+                    bucket_data = get_trend_buckets(selected_student_trend_id, start_date, end_date, granularity)
                     
                     # 错题率趋势线图
                     fig_line = px.line(
-                        weekly_data, 
-                        x='week_str', 
+                        bucket_data, 
+                        x='bucket_label', 
                         y='error_rate',
-                        title='错题率变化趋势（按周统计）',
-                        labels={'week_str': '周次', 'error_rate': '错题率 (%)'},
+                        title=f'错题率变化趋势（按{granularity_label}统计）',
+                        labels={'bucket_label': granularity_label, 'error_rate': '错题率 (%)'},
                         markers=True
                     )
                     fig_line.update_layout(height=400, xaxis_tickangle=-45)
                     st.plotly_chart(fig_line, use_container_width=True)
                     
-                    # 错题数与总题数对比柱状图（按周）
-                    st.subheader("📊 每周错题数与总题数对比")
+                    # 错题数与总题数对比柱状图
+                    st.subheader(f"📊 每{granularity_label}错题数与总题数对比")
                     fig_bar = go.Figure()
                     fig_bar.add_trace(go.Bar(
                         name='总题数',
-                        x=weekly_data['week_str'],
-                        y=weekly_data['total_questions'],
+                        x=bucket_data['bucket_label'],
+                        y=bucket_data['total_questions'],
                         marker_color='lightblue'
                     ))
                     fig_bar.add_trace(go.Bar(
                         name='错题数',
-                        x=weekly_data['week_str'],
-                        y=weekly_data['error_questions'],
+                        x=bucket_data['bucket_label'],
+                        y=bucket_data['error_questions'],
                         marker_color='salmon'
                     ))
                     fig_bar.update_layout(
-                        title='各周错题数与总题数对比',
-                        xaxis_title='周次',
+                        title=f'各{granularity_label}错题数与总题数对比',
+                        xaxis_title=granularity_label,
                         yaxis_title='题目数量',
                         barmode='group',
                         height=400,
@@ -396,16 +341,17 @@ def main():
                     )
                     st.plotly_chart(fig_bar, use_container_width=True)
                     
-                    # 详细数据表格（按周）
-                    st.subheader("📋 每周统计数据")
-                    display_weekly_df = weekly_data[['week_str', 'paper_title', 'total_questions', 'error_questions', 'error_rate', 'correct_rate']].copy()
-                    display_weekly_df.columns = ['周次', '试卷数量', '总题数', '错题数', '错题率(%)', '正确率(%)']
-                    display_weekly_df['错题率(%)'] = display_weekly_df['错题率(%)'].round(1)
-                    display_weekly_df['正确率(%)'] = display_weekly_df['正确率(%)'].round(1)
-                    st.dataframe(display_weekly_df, use_container_width=True)
+                    # 详细数据表格
+                    st.subheader(f"📋 每{granularity_label}统计数据")
+                    display_bucket_df = bucket_data[['bucket_label', 'paper_count', 'total_questions', 'error_questions', 'error_rate', 'correct_rate']].copy()
+                    display_bucket_df.columns = [granularity_label, '试卷数量', '总题数', '错题数', '错题率(%)', '正确率(%)']
+                    display_bucket_df['错题率(%)'] = display_bucket_df['错题率(%)'].round(1)
+                    display_bucket_df['正确率(%)'] = display_bucket_df['正确率(%)'].round(1)
+                    st.dataframe(display_bucket_df, use_container_width=True)
                     
                     # 原始数据表格（按试卷）
                     with st.expander("📋 查看原始试卷数据"):
+                        trend_df = pd.DataFrame(trend_analysis['trend_data'])
                         original_display_df = trend_df[['paper_title', 'date', 'total_questions', 'error_questions', 'error_rate', 'correct_rate']].copy()
                         original_display_df['date'] = original_display_df['date'].dt.date
                         original_display_df.columns = ['试卷标题', '日期', '总题数', '错题数', '错题率(%)', '正确率(%)']
@@ -419,6 +365,74 @@ def main():
                 st.error("开始日期不能晚于结束日期")
         else:
             st.info("请选择学生和时间范围以查看趋势分析")
+    
+    with tab3:
+        show_report_export(students)
+
+def show_report_export(students: List[Dict]):
+    """导出错题列表和趋势统计报告"""
+    st.header("📥 导出报告")
+    
+    with st.form("report_export_form"):
+        student_options = {f"{s['name']} (ID: {s['id']})": s['id'] for s in students}
+        default_students = [label for label, sid in student_options.items()
+                            if is_student_selected() and sid == get_selected_student_id()]
+        selected_students = st.multiselect(
+            "选择学生（不选则导出全部学生）",
+            options=list(student_options.keys()),
+            default=default_students
+        )
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            start_date = st.date_input("开始日期", value=datetime.now() - timedelta(days=30), key="export_start_date")
+        with col2:
+            end_date = st.date_input("结束日期", value=datetime.now(), key="export_end_date")
+        with col3:
+            fmt = st.selectbox("格式", options=list(EXPORT_FORMATS.keys()),
+                               format_func=lambda f: EXPORT_FORMATS[f][0])
+        with col4:
+            granularity = st.selectbox("统计粒度", options=list(GRANULARITY_LABELS.keys()), index=1,
+                                       format_func=lambda g: f"按{GRANULARITY_LABELS[g]}")
+        submitted = st.form_submit_button("生成报告")
+    
+    if submitted:
+        if start_date > end_date:
+            st.error("开始日期不能晚于结束日期")
+        else:
+            st.session_state["report_export_job"] = get_export_manager().submit(ExportRequest(
+                student_ids=[student_options[label] for label in selected_students] or None,
+                start_date=start_date,
+                end_date=end_date,
+                fmt=fmt,
+                granularity=granularity,
+            ))
+    
+    if st.session_state.get("report_export_job"):
+        show_export_status()
+
+def show_export_status():
+    """显示导出任务结果，完成后提供下载"""
+    job = get_export_manager().get(st.session_state["report_export_job"])
+    if job is None:
+        st.session_state.pop("report_export_job", None)
+    elif job.status in ("pending", "running"):
+        show_export_progress(job.job_id)
+    elif job.status == "failed":
+        st.error(f"生成报告失败: {job.error}")
+    else:
+        st.success(f"报告已生成，共 {job.rows_written} 道错题")
+        with open(job.path, "rb") as report_file:
+            st.download_button("⬇️ 下载报告", data=report_file, file_name=job.filename,
+                               mime=job.mime_type, key=f"download_{job.job_id}")
+
+@st.fragment(run_every=2)
+def show_export_progress(job_id: str):
+    """任务进行中每 2 秒刷新一次进度，结束后重新渲染页面"""
+    job = get_export_manager().get(job_id)
+    if job is not None and job.status in ("pending", "running"):
+        st.info(f"⏳ 正在生成报告：{job.stage}，已写入 {job.rows_written} 道错题")
+    else:
+        st.rerun()
 
 if __name__ == "__main__":
     main()
@@ -7,7 +7,10 @@ import json
 
 # 添加父目录到路径以导入api_service
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from api_service import make_api_request
+from api_service import make_api_request, api_service
+from swr_cache import swr_cache, clear_page_caches
+from columnar import ColumnarTable
+from bulk_import import BulkImporter
 
 # 导入学生选择相关函数
 try:
@@ -17,59 +20,38 @@ except ImportError:
     from student_selection import get_selected_student, is_student_selected, get_selected_student_id, get_selected_student_name
 
 # 获取数据的辅助函数
-@st.cache_data(ttl=30)
-def get_students() -> List[Dict]:
-    """获取学生列表"""
-    result = make_api_request("GET", "students")
-    return result["data"] if result["success"] else []
-
-@st.cache_data(ttl=30)
-def get_exam_papers() -> List[Dict]:
+@swr_cache(ttl=30, columnar=True, tables=("exam_paper",))
+def get_exam_papers() -> ColumnarTable:
     """获取试卷列表"""
     result = make_api_request("GET", "exam_papers")
     return result["data"] if result["success"] else []
 
-@st.cache_data(ttl=30)
-def get_exam_paper_images() -> List[Dict]:
-    """获取试卷图片列表"""
-    result = make_api_request("GET", "exam_paper_images")
-    return result["data"] if result["success"] else []
-
-@st.cache_data(ttl=30)
-def get_questions() -> List[Dict]:
-    """获取题目列表"""
-    result = make_api_request("GET", "questions")
-    return result["data"] if result["success"] else []
-
-@st.cache_data(ttl=30)
-def get_knowledge_points() -> List[Dict]:
-    """获取知识点列表"""
-    result = make_api_request("GET", "knowledge_points")
-    return result["data"] if result["success"] else []
-
-@st.cache_data(ttl=30)
-def get_question_knowledge_points() -> List[Dict]:
-    """获取题目知识点关联列表"""
-    result = make_api_request("GET", "question_knowledge_points")
-    return result["data"] if result["success"] else []
+@swr_cache(ttl=30, columnar=True, tables=("student", "exam_paper", "exam_paper_image", "question", "knowledge_point", "question_knowledge_point"))
+def get_paper_detail_data() -> Dict[str, ColumnarTable]:
+    """并发获取试卷详情页需要的全部数据"""
+    return api_service.fetch_many([
+        "students", "exam_papers", "exam_paper_images",
+        "questions", "knowledge_points", "question_knowledge_points",
+    ])
 
 def show_exam_paper_detail(paper_id: int):
     """显示试卷详情页面"""
-    students = get_students()
-    all_exam_papers = get_exam_papers()
-    all_exam_paper_images = get_exam_paper_images()
-    all_questions = get_questions()
-    all_knowledge_points = get_knowledge_points()
-    all_question_kps = get_question_knowledge_points()
+    detail_data = get_paper_detail_data()
+    students = detail_data["students"]
+    all_exam_papers = detail_data["exam_papers"]
+    all_exam_paper_images = detail_data["exam_paper_images"]
+    all_questions = detail_data["questions"]
+    all_knowledge_points = detail_data["knowledge_points"]
+    all_question_kps = detail_data["question_knowledge_points"]
     
     # 获取当前试卷信息
-    current_paper = next((p for p in all_exam_papers if p['id'] == paper_id), None)
+    current_paper = all_exam_papers.find(id=paper_id)
     if not current_paper:
         st.error("试卷不存在")
         return
     
     # 获取学生信息
-    student = next((s for s in students if s['id'] == current_paper['student_id']), None)
+    student = students.find(id=current_paper['student_id'])
     student_name = student['name'] if student else '未知学生'
     
     # 页面标题
@@ -82,7 +64,7 @@ def show_exam_paper_detail(paper_id: int):
     st.markdown("---")
     
     # 获取试卷相关的题目
-    paper_questions = [q for q in all_questions if q['exam_paper_id'] == paper_id]
+    paper_questions = all_questions.where(exam_paper_id=paper_id).to_rows()
     
     # 计算统计信息
     total_questions = len(paper_questions)
@@ -117,7 +99,7 @@ def show_exam_paper_detail(paper_id: int):
                 
                 # 图片选择功能 - 从exam_paper_image表选择
                 st.markdown("**选择题目相关图片（可选）:**")
-                paper_images = [img for img in all_exam_paper_images if img['exam_paper_id'] == paper_id]
+                paper_images = all_exam_paper_images.where(exam_paper_id=paper_id).to_rows()
                 
                 if paper_images:
                     image_options = [f"{img['id']} - {img['image_url'].split('/')[-1]}" for img in paper_images]
@@ -180,7 +162,7 @@ def show_exam_paper_detail(paper_id: int):
                                 })
                         
                         st.success("题目添加成功！")
-                        st.cache_data.clear()
+                        clear_page_caches()
                         st.rerun()
                     else:
                         st.error(f"添加失败: {result['error']}")
@@ -211,7 +193,7 @@ def show_exam_paper_detail(paper_id: int):
                 
                 # 图片选择功能 - 从exam_paper_image表选择
                 st.markdown("**选择题目相关图片（可选）:**")
-                paper_images = [img for img in all_exam_paper_images if img['exam_paper_id'] == paper_id]
+                paper_images = all_exam_paper_images.where(exam_paper_id=paper_id).to_rows()
                 
                 if paper_images:
                     image_options = [f"{img['id']} - {img['image_url'].split('/')[-1]}" for img in paper_images]
@@ -347,7 +329,7 @@ def show_exam_paper_detail(paper_id: int):
                             
                             if success_count > 0:
                                 st.success(f"成功添加 {success_count} 个题目！")
-                                st.cache_data.clear()
+                                clear_page_caches()
                                 st.rerun()
                             
                             if error_count > 0:
@@ -358,6 +340,50 @@ def show_exam_paper_detail(paper_id: int):
                     except Exception as e:
                         st.error(f"批量添加过程中出现错误: {str(e)}")
     
+    with st.expander("📥 从文件导入题目（CSV / Excel）"):
+        st.markdown("文件第一行为表头，支持的列：`content`（必填）、`is_correct`、`remark`、"
+                    "`knowledge_points`（多个用逗号分隔）、`image_id`")
+        import_images = all_exam_paper_images.where(exam_paper_id=paper_id).to_rows()
+        if not import_images:
+            st.info("该试卷暂无图片，请先在试卷图片管理页面上传图片")
+        else:
+            with st.form("import_questions_form"):
+                uploaded_file = st.file_uploader("选择文件", type=["csv", "xlsx"], key="import_questions_file")
+                image_labels = {f"{img['id']} - {img['image_url'].split('/')[-1]}": img['id'] for img in import_images}
+                default_image = st.selectbox("未指定 image_id 的题目使用图片", options=list(image_labels.keys()))
+                create_missing = st.checkbox("自动创建不存在的知识点", value=False)
+                submit_import = st.form_submit_button("开始导入")
+            
+            if submit_import and uploaded_file is not None:
+                progress_bar = st.progress(0.0, text="正在导入...")
+                
+                def update_progress(processed: int, fraction):
+                    progress_bar.progress(fraction or 0.0, text=f"已处理 {processed} 行")
+                
+                try:
+                    report = BulkImporter(api_service).import_questions(
+                        uploaded_file, uploaded_file.name,
+                        exam_paper_id=paper_id,
+                        student_id=current_paper['student_id'],
+                        default_image_id=image_labels[default_image],
+                        create_missing_knowledge_points=create_missing,
+                        size=uploaded_file.size,
+                        progress=update_progress,
+                    )
+                except Exception as e:
+                    st.error(f"导入失败: {str(e)}")
+                else:
+                    progress_bar.progress(1.0, text="导入完成")
+                    st.success(f"共 {report.total_rows} 行，成功导入 {report.success_count} 个题目，"
+                               f"建立 {report.linked_knowledge_points} 个知识点关联"
+                               + (f"，新建 {report.created_knowledge_points} 个知识点" if report.created_knowledge_points else ""))
+                    if report.errors:
+                        st.warning(f"有 {report.failed_count} 行导入失败")
+                        st.dataframe(pd.DataFrame(report.errors).rename(columns={"row": "行号", "error": "错误"}),
+                                     use_container_width=True, hide_index=True)
+                    if report.success_count:
+                        clear_page_caches()
+    
     # 题目列表
     st.subheader("📋 题目列表")
     
@@ -367,10 +393,10 @@ def show_exam_paper_detail(paper_id: int):
         question_info = question.copy()
         
         # 获取题目相关的知识点
-        question_kps = [qkp for qkp in all_question_kps if qkp['question_id'] == question['id']]
+        question_kps = all_question_kps.where(question_id=question['id']).to_rows()
         kp_names = []
         for qkp in question_kps:
-            kp = next((k for k in all_knowledge_points if k['id'] == qkp['knowledge_point_id']), None)
+            kp = all_knowledge_points.find(id=qkp['knowledge_point_id'])
             if kp:
                 kp_names.append(kp['name'])
         
@@ -413,7 +439,7 @@ def show_exam_paper_detail(paper_id: int):
                         edit_is_correct = st.checkbox("答题正确", value=current_question.get('is_correct', True))
                         
                         # 当前知识点
-                        current_question_kps = [qkp for qkp in all_question_kps if qkp['question_id'] == question_id]
+                        current_question_kps = all_question_kps.where(question_id=question_id).to_rows()
                         current_kp_ids = [qkp['knowledge_point_id'] for qkp in current_question_kps]
                         current_kp_options = [f"{kp['id']} - {kp['name']}" for kp in all_knowledge_points if kp['id'] in current_kp_ids]
                         
@@ -450,7 +476,7 @@ def show_exam_paper_detail(paper_id: int):
                                         })
                                 
                                 st.success("题目更新成功！")
-                                st.cache_data.clear()
+                                clear_page_caches()
                                 st.rerun()
                             else:
                                 st.error(f"更新失败: {result['error']}")
@@ -468,7 +494,7 @@ def show_exam_paper_detail(paper_id: int):
                 question_id = int(question_to_delete.split(" - ")[0])
                 
                 # 删除题目相关的知识点关联
-                question_kps = [qkp for qkp in all_question_kps if qkp['question_id'] == question_id]
+                question_kps = all_question_kps.where(question_id=question_id).to_rows()
                 for qkp in question_kps:
                     make_api_request("DELETE", f"question_knowledge_points/{qkp['id']}")
                 
@@ -476,7 +502,7 @@ def show_exam_paper_detail(paper_id: int):
                 result = make_api_request("DELETE", f"questions/{question_id}")
                 if result["success"]:
                     st.success("题目删除成功！")
-                    st.cache_data.clear()
+                    clear_page_caches()
                     st.rerun()
                 else:
                     st.error(f"删除失败: {result['error']}")
@@ -8,6 +8,8 @@ from PIL import Image
 # 添加父目录到路径以导入api_service
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from api_service import make_api_request
+from swr_cache import swr_cache, clear_page_caches
+from columnar import ColumnarTable
 from cos_uploader import ExamPaperCOSManager
 
 # 导入学生选择相关函数
@@ -18,20 +20,20 @@ except ImportError:
     from student_selection import get_selected_student, is_student_selected, get_selected_student_id, get_selected_student_name
 
 # 获取数据的辅助函数
-@st.cache_data(ttl=30)
-def get_students() -> List[Dict]:
+@swr_cache(ttl=30, columnar=True, tables=("student",))
+def get_students() -> ColumnarTable:
     """获取学生列表"""
     result = make_api_request("GET", "students")
     return result["data"] if result["success"] else []
 
-@st.cache_data(ttl=30)
-def get_exam_papers() -> List[Dict]:
+@swr_cache(ttl=30, columnar=True, tables=("exam_paper",))
+def get_exam_papers() -> ColumnarTable:
     """获取试卷列表"""
     result = make_api_request("GET", "exam_papers")
     return result["data"] if result["success"] else []
 
-@st.cache_data(ttl=30)
-def get_exam_paper_images() -> List[Dict]:
+@swr_cache(ttl=30, columnar=True, tables=("exam_paper_image",))
+def get_exam_paper_images() -> ColumnarTable:
     """获取试卷图片列表"""
     result = make_api_request("GET", "exam_paper_images")
     return result["data"] if result["success"] else []
@@ -61,7 +63,7 @@ all_exam_paper_images = get_exam_paper_images()
 # 根据选中的学生筛选试卷
 if is_student_selected():
     selected_student_id = get_selected_student_id()
-    exam_papers = [paper for paper in all_exam_papers if paper['student_id'] == selected_student_id]
+    exam_papers = all_exam_papers.where(student_id=selected_student_id)
 else:
     exam_papers = all_exam_papers
 
@@ -77,10 +79,10 @@ if exam_papers:
     
     if selected_paper_option:
         selected_paper_id = int(selected_paper_option.split(" - ")[0])
-        selected_paper = next((p for p in exam_papers if p['id'] == selected_paper_id), None)
+        selected_paper = exam_papers.find(id=selected_paper_id)
         
         # 筛选选中试卷的图片
-        exam_paper_images = [img for img in all_exam_paper_images if img['exam_paper_id'] == selected_paper_id]
+        exam_paper_images = all_exam_paper_images.where(exam_paper_id=selected_paper_id).to_rows()
         
         st.info(f"📌 当前查看试卷: **{selected_paper['title']}** 的图片")
         
@@ -89,7 +91,7 @@ if exam_papers:
             # 创建包含试卷标题的图片数据
             images_with_paper = []
             for image in exam_paper_images:
-                paper = next((p for p in exam_papers if p['id'] == image['exam_paper_id']), None)
+                paper = exam_papers.find(id=image['exam_paper_id'])
                 image_info = image.copy()
                 image_info['paper_title'] = paper['title'] if paper else '未知试卷'
                 images_with_paper.append(image_info)
@@ -169,7 +171,7 @@ if exam_papers:
                                                         # 从viewing_image_id中移除
                                                         if image_info['id'] in st.session_state.viewing_image_id:
                                                             st.session_state.viewing_image_id.remove(image_info['id'])
-                                                        st.cache_data.clear()
+                                                        clear_page_caches()
                                                         st.rerun()
                                                     else:
                                                         st.error(f"删除失败: {delete_result['error']}")
@@ -269,7 +271,7 @@ if exam_papers:
                     
                     if success_count > 0:
                         st.success(f"✅ 成功上传 {success_count} 张图片！")
-                        st.cache_data.clear()
+                        clear_page_caches()
                         st.rerun()
                     
                     if error_messages:
@@ -357,7 +359,7 @@ else:
                     
                     if success_count > 0:
                         st.success(f"✅ 成功上传 {success_count} 张图片！")
-                        st.cache_data.clear()
+                        clear_page_caches()
                         st.rerun()
                     
                     if error_messages:
@@ -372,5 +374,5 @@ else:
 
 st.markdown("---")
 if st.button("🔄 刷新数据", type="primary", key="refresh_images"):
-    st.cache_data.clear()
+    clear_page_caches()
     st.rerun()
\ No newline at end of file
@@ -7,6 +7,8 @@ import sys
 # 添加项目根目录到路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from api_service import make_api_request
+from swr_cache import swr_cache, clear_page_caches
+from columnar import ColumnarTable
 
 # 导入学生选择相关函数
 try:
@@ -16,28 +18,28 @@ except ImportError:
     from student_selection import get_selected_student, is_student_selected, get_selected_student_id, get_selected_student_name
 
 # 数据获取函数
-@st.cache_data(ttl=30)
-def get_students() -> List[Dict]:
+@swr_cache(ttl=30, columnar=True, tables=("student",))
+def get_students() -> ColumnarTable:
     result = make_api_request("GET", "students")
     return result["data"] if result["success"] else []
 
-@st.cache_data(ttl=30)
-def get_exam_papers() -> List[Dict]:
+@swr_cache(ttl=30, columnar=True, tables=("exam_paper",))
+def get_exam_papers() -> ColumnarTable:
     result = make_api_request("GET", "exam_papers")
     return result["data"] if result["success"] else []
 
-@st.cache_data(ttl=30)
-def get_questions() -> List[Dict]:
+@swr_cache(ttl=30, columnar=True, tables=("question",))
+def get_questions() -> ColumnarTable:
     result = make_api_request("GET", "questions")
     return result["data"] if result["success"] else []
 
-@st.cache_data(ttl=30)
-def get_knowledge_points() -> List[Dict]:
+@swr_cache(ttl=30, columnar=True, tables=("knowledge_point",))
+def get_knowledge_points() -> ColumnarTable:
     result = make_api_request("GET", "knowledge_points")
     return result["data"] if result["success"] else []
 
-@st.cache_data(ttl=30)
-def get_question_knowledge_points() -> List[Dict]:
+@swr_cache(ttl=30, columnar=True, tables=("question_knowledge_point",))
+def get_question_knowledge_points() -> ColumnarTable:
     result = make_api_request("GET", "question_knowledge_points")
     return result["data"] if result["success"] else []
 
@@ -68,7 +70,7 @@ all_exam_papers = get_exam_papers()
 # 根据选中的学生筛选试卷
 if is_student_selected():
     selected_student_id = get_selected_student_id()
-    exam_papers = [paper for paper in all_exam_papers if paper['student_id'] == selected_student_id]
+    exam_papers = all_exam_papers.where(student_id=selected_student_id)
 else:
     exam_papers = all_exam_papers
 
@@ -80,12 +82,12 @@ if exam_papers:
     # 为每个试卷添加学生姓名和统计信息
     papers_with_student = []
     for paper in exam_papers:
-        student = next((s for s in students if s['id'] == paper['student_id']), None)
+        student = students.find(id=paper['student_id'])
         paper_info = paper.copy()
         paper_info['student_name'] = student['name'] if student else '未知学生'
         
         # 计算错题率
-        paper_questions = [q for q in all_questions if q['exam_paper_id'] == paper['id']]
+        paper_questions = all_questions.where(exam_paper_id=paper['id']).to_rows()
         if paper_questions:
             wrong_questions = [q for q in paper_questions if not q.get('is_correct', True)]
             error_rate = len(wrong_questions) / len(paper_questions) * 100
@@ -147,7 +149,7 @@ if exam_papers:
                         })
                         if result["success"]:
                             st.success("试卷添加成功！")
-                            st.cache_data.clear()
+                            clear_page_caches()
                             st.rerun()
                         else:
                             st.error(f"添加失败: {result['error']}")
@@ -189,7 +191,7 @@ if exam_papers:
                             })
                             if result["success"]:
                                 st.success("试卷更新成功！")
-                                st.cache_data.clear()
+                                clear_page_caches()
                                 st.rerun()
                             else:
                                 st.error(f"更新失败: {result['error']}")
@@ -211,9 +213,9 @@ if exam_papers:
                 all_question_kps = get_question_knowledge_points()
                 
                 # 获取该试卷的所有题目
-                paper_questions = [q for q in all_questions if q['exam_paper_id'] == paper_id]
+                paper_questions = all_questions.where(exam_paper_id=paper_id).to_rows()
                 for question in paper_questions:
-                    question_kps = [qkp for qkp in all_question_kps if qkp['question_id'] == question['id']]
+                    question_kps = all_question_kps.where(question_id=question['id']).to_rows()
                     for qkp in question_kps:
                         make_api_request("DELETE", f"question_knowledge_points/{qkp['id']}")
                 
@@ -225,7 +227,7 @@ if exam_papers:
                 result = make_api_request("DELETE", f"exam_papers/{paper_id}")
                 if result["success"]:
                     st.success("试卷及相关数据删除成功！")
-                    st.cache_data.clear()
+                    clear_page_caches()
                     st.rerun()
                 else:
                     st.error(f"删除失败: {result['error']}")
@@ -259,7 +261,7 @@ else:
                 })
                 if result["success"]:
                     st.success("试卷添加成功！")
-                    st.cache_data.clear()
+                    clear_page_caches()
                     st.rerun()
                 else:
                     st.error(f"添加失败: {result['error']}")
@@ -268,5 +270,5 @@ else:
 
 st.markdown("---")
 if st.button("🔄 刷新数据", type="primary", key="refresh_papers"):
-    st.cache_data.clear()
+    clear_page_caches()
     st.rerun()
\ No newline at end of file
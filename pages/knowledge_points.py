@@ -12,7 +12,8 @@ from typing import List, Dict, Any, Optional
 
 # 添加父目录到路径以导入api_service
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from api_service import api_request
+from api_service import api_request, api_service
+from bulk_import import BulkImporter
 
 def get_knowledge_points() -> List[Dict[str, Any]]:
     """获取所有知识点"""
@@ -38,6 +39,28 @@ def knowledge_point_management():
             else:
                 st.error("知识点名称不能为空")
     
+    with st.expander("📥 从文件导入知识点（CSV / Excel）"):
+        st.markdown("文件第一行为表头，包含 `name` 列；已存在的知识点会自动跳过")
+        uploaded_file = st.file_uploader("选择文件", type=["csv", "xlsx"], key="import_knowledge_points_file")
+        if uploaded_file is not None and st.button("开始导入", key="import_knowledge_points_button"):
+            progress_bar = st.progress(0.0, text="正在导入...")
+            
+            def update_progress(processed: int, fraction):
+                progress_bar.progress(fraction or 0.0, text=f"已处理 {processed} 行")
+            
+            try:
+                report = BulkImporter(api_service).import_knowledge_points(
+                    uploaded_file, uploaded_file.name, size=uploaded_file.size, progress=update_progress)
+            except Exception as e:
+                st.error(f"导入失败: {str(e)}")
+            else:
+                progress_bar.progress(1.0, text="导入完成")
+                st.success(f"共 {report.total_rows} 行，新建 {report.created_knowledge_points} 个知识点，"
+                           f"{report.success_count - report.created_knowledge_points} 个已存在")
+                if report.errors:
+                    st.warning(f"有 {report.failed_count} 行导入失败")
+                    st.dataframe(report.errors, use_container_width=True, hide_index=True)
+    
     st.divider()
     
     # 显示现有知识点
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能监控页面
+显示当前进程中数据库调用和 make_api_request 的耗时、返回行数和响应大小，用于定位慢表和过大的读取
+"""
+
+import streamlit as st
+import pandas as pd
+import sys
+import os
+
+# 添加父目录到路径以导入instrumentation
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import metrics, db_summary, api_summary
+from resilience import breaker_states
+
+DB_COLUMNS = {
+    "table": "表", "operation": "操作", "calls": "调用次数", "errors": "错误次数",
+    "total_ms": "总耗时(ms)", "avg_ms": "平均(ms)", "p95_ms": "P95(ms)", "max_ms": "最大(ms)",
+    "avg_rows": "平均行数", "max_rows": "最大行数", "avg_kb": "平均大小(KB)", "max_kb": "最大大小(KB)",
+}
+API_COLUMNS = {
+    "resource": "资源", "method": "方法", "status": "状态", "calls": "调用次数",
+    "total_ms": "总耗时(ms)", "avg_ms": "平均(ms)", "p95_ms": "P95(ms)", "max_ms": "最大(ms)",
+}
+
+
+def show_performance_metrics():
+    """显示性能监控页面"""
+    st.title("⏱️ 性能监控")
+
+    # 检查用户是否已登录
+    if not st.session_state.get("logged_in", False):
+        st.error("❌ 请先登录才能访问性能监控")
+        st.info("💡 请返回首页进行登录")
+        st.stop()
+
+    st.caption("统计自本进程启动（或上次清空）以来的调用，P95 为按直方图估算的值")
+    states = breaker_states()
+    if states:
+        st.caption("断路器：" + "，".join(f"{name} {state}" for name, state in sorted(states.items())))
+
+    db_rows = db_summary()
+    api_rows = api_summary()
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("数据库调用", sum(row["calls"] for row in db_rows))
+    with col2:
+        st.metric("数据库错误", sum(row["errors"] for row in db_rows))
+    with col3:
+        st.metric("数据库总耗时", f"{sum(row['total_ms'] for row in db_rows) / 1000:.2f}s")
+    with col4:
+        st.metric("API 调用", sum(row["calls"] for row in api_rows))
+
+    if st.button("清空统计", key="reset_metrics"):
+        metrics.reset()
+        st.rerun()
+
+    st.subheader("🗄️ 数据库调用（按总耗时排序）")
+    if db_rows:
+        db_df = pd.DataFrame(db_rows).rename(columns=DB_COLUMNS).round(2)
+        st.dataframe(db_df, use_container_width=True, hide_index=True)
+
+        st.subheader("📦 最大的读取")
+        largest_df = db_df.sort_values("最大大小(KB)", ascending=False).head(10)
+        st.dataframe(largest_df[["表", "操作", "调用次数", "平均行数", "最大行数", "平均大小(KB)", "最大大小(KB)"]],
+                     use_container_width=True, hide_index=True)
+    else:
+        st.info("暂无数据库调用")
+
+    st.subheader("🔌 make_api_request（按资源）")
+    if api_rows:
+        api_df = pd.DataFrame(api_rows).rename(columns=API_COLUMNS).round(2)
+        st.dataframe(api_df, use_container_width=True, hide_index=True)
+    else:
+        st.info("暂无 API 调用")
+
+    with st.expander("Prometheus 格式"):
+        st.code(metrics.render_prometheus(), language="text")
+
+
+if __name__ == "__main__":
+    show_performance_metrics()
+else:
+    # 当作为页面模块导入时调用
+    show_performance_metrics()
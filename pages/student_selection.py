@@ -13,9 +13,11 @@ import os
 # 添加当前目录到路径以导入模块
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from api_service import make_api_request
+from swr_cache import swr_cache
+from columnar import ColumnarTable
 
-@st.cache_data(ttl=30)
-def get_students() -> List[Dict]:
+@swr_cache(ttl=30, columnar=True, tables=("student",))
+def get_students() -> ColumnarTable:
     """获取学生列表"""
     result = make_api_request("GET", "students")
     return result["data"] if result["success"] else []
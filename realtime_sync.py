@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+实时变更订阅
+订阅 Supabase Realtime 的 Postgres 变更，把插入、更新、删除直接应用到进程内快照，
+取代按 TTL 轮询整表。离线环境可使用 LocalChangePublisher 发布同样格式的变更事件。
+
+在 .streamlit/secrets.toml 中启用:
+
+    [realtime]
+    enabled = true
+    source = "supabase"   # 或 "local"，使用进程内发布器
+"""
+
+import asyncio
+import threading
+from typing import Callable, Dict, Any, List, Optional
+
+import streamlit as st
+
+from app_config import load_config
+
+# 订阅变更的表
+REALTIME_TABLES = ["question", "exam_paper", "exam_paper_image", "knowledge_point"]
+
+# 变更回调: (表名, 事件类型 INSERT/UPDATE/DELETE, 新记录, 旧记录)
+ChangeCallback = Callable[[str, str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]], None]
+# 连接状态回调: True 表示已订阅，False 表示连接中断
+StatusCallback = Callable[[bool], None]
+
+
+def parse_change_payload(payload: Dict[str, Any]) -> tuple:
+    """
+    解析 Realtime 变更事件，兼容不同版本客户端的字段名
+
+    Args:
+        payload: Realtime 回调收到的事件
+
+    Returns:
+        tuple: (表名, 事件类型, 新记录, 旧记录)
+    """
+    data = payload.get("data", payload)
+    event_type = (data.get("type") or data.get("eventType") or "").upper()
+    record = data.get("record") or data.get("new") or None
+    old_record = data.get("old_record") or data.get("old") or None
+    return data.get("table"), event_type, record, old_record
+
+
+class LocalChangePublisher:
+    """进程内变更发布器，事件格式与 Supabase Realtime 一致，用于离线测试"""
+
+    def __init__(self):
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, table: str, event_type: str, record: Dict[str, Any] = None,
+                old_record: Dict[str, Any] = None):
+        """
+        发布一条变更事件
+
+        Args:
+            table: 表名
+            event_type: INSERT / UPDATE / DELETE
+            record: 新记录（DELETE 时为空）
+            old_record: 旧记录（DELETE 时至少包含 id）
+        """
+        payload = {
+            "data": {
+                "schema": "public",
+                "table": table,
+                "type": event_type.upper(),
+                "record": record,
+                "old_record": old_record,
+            }
+        }
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            callback(payload)
+
+
+# 全局进程内发布器
+local_publisher = LocalChangePublisher()
+
+
+class LocalChangeSubscriber:
+    """订阅进程内发布器"""
+
+    def __init__(self, on_change: ChangeCallback, on_status: StatusCallback = None,
+                 tables: List[str] = None, publisher: LocalChangePublisher = None):
+        self.on_change = on_change
+        self.on_status = on_status
+        self.tables = set(tables or REALTIME_TABLES)
+        self.publisher = publisher or local_publisher
+
+    def _handle(self, payload: Dict[str, Any]):
+        table, event_type, record, old_record = parse_change_payload(payload)
+        if table in self.tables:
+            self.on_change(table, event_type, record, old_record)
+
+    def start(self):
+        self.publisher.subscribe(self._handle)
+        if self.on_status:
+            self.on_status(True)
+
+    def stop(self):
+        self.publisher.unsubscribe(self._handle)
+        if self.on_status:
+            self.on_status(False)
+
+
+class SupabaseRealtimeSubscriber:
+    """在后台线程的事件循环中订阅 Supabase Realtime"""
+
+    def __init__(self, url: str, key: str, on_change: ChangeCallback, on_status: StatusCallback = None,
+                 tables: List[str] = None):
+        self.url = url
+        self.key = key
+        self.on_change = on_change
+        self.on_status = on_status
+        self.tables = tables or REALTIME_TABLES
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client = None
+        self._channel = None
+
+    def _handle(self, payload: Dict[str, Any]):
+        try:
+            table, event_type, record, old_record = parse_change_payload(payload)
+            self.on_change(table, event_type, record, old_record)
+        except Exception as e:
+            print(f"处理实时变更时出错: {e}")
+
+    def _handle_status(self, status, error=None):
+        subscribed = str(status).upper().endswith("SUBSCRIBED")
+        if error:
+            print(f"实时订阅状态异常: {status} {error}")
+        if self.on_status:
+            self.on_status(subscribed)
+
+    async def _subscribe(self):
+        from supabase import acreate_client
+
+        self._client = await acreate_client(self.url, self.key)
+        channel = self._client.channel("ladr-table-changes")
+        for table in self.tables:
+            channel.on_postgres_changes("*", schema="public", table=table, callback=self._handle)
+        self._channel = channel
+        await channel.subscribe(self._handle_status)
+
+    def start(self):
+        """启动后台线程并订阅，连接由客户端自动重连"""
+        if self._thread is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(self._subscribe())
+                self._loop.run_forever()
+            except Exception as e:
+                print(f"实时订阅失败，继续使用增量轮询: {e}")
+                self._handle_status("CHANNEL_ERROR")
+
+        self._thread = threading.Thread(target=run, name="supabase-realtime", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._loop is None:
+            return
+        if self._channel is not None:
+            asyncio.run_coroutine_threadsafe(self._channel.unsubscribe(), self._loop)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._handle_status("CLOSED")
+
+
+def create_change_subscriber(on_change: ChangeCallback, on_status: StatusCallback = None):
+    """
+    根据 secrets 配置创建变更订阅器，未启用时返回 None
+
+    Args:
+        on_change: 变更回调
+        on_status: 连接状态回调
+
+    Returns:
+        订阅器实例（尚未启动）
+    """
+    config = load_config("realtime")
+    if not config or not config.get("enabled"):
+        return None
+
+    source = config.get("source", "supabase")
+    if source == "local":
+        return LocalChangeSubscriber(on_change, on_status)
+    return SupabaseRealtimeSubscriber(
+        st.secrets["supabase"]["url"],
+        st.secrets["supabase"]["key"],
+        on_change,
+        on_status,
+    )
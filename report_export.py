@@ -0,0 +1,510 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+错题报告导出
+在后台线程中分页读取一个或多个学生在时间范围内的试卷及其题目，边读边写入 CSV / XLSX / PDF 文件，
+页面只保存任务 ID，生成完成后提供下载，不在会话内存中保留题目数据。
+
+读取分两遍进行：第一遍只读统计所需的列，按试卷汇总题目数和错题数得到趋势统计；
+第二遍逐页写入错题列表（PDF 中附题目图片缩略图）。
+
+- CSV: 错题列表
+- XLSX: “错题列表”和“趋势统计”两个工作表
+- PDF: 总体统计、趋势统计表和带缩略图的错题列表
+"""
+
+import io
+import os
+import csv
+import time
+import uuid
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+import requests
+
+from batch_loader import BatchLoader
+from resource_registry import RESOURCES
+from supabase_handler import normalize_timestamp
+from trend_analysis import aggregate_buckets, GRANULARITY_LABELS
+
+EXPORT_FORMATS = {
+    "csv": ("CSV", "text/csv"),
+    "xlsx": ("Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "pdf": ("PDF", "application/pdf"),
+}
+
+# 错题列表的列: (字段, 显示名称)
+ERROR_COLUMNS = [
+    ("student_name", "学生"),
+    ("paper_title", "试卷"),
+    ("question_id", "题目ID"),
+    ("content", "题目内容"),
+    ("remark", "备注"),
+    ("created_time", "记录时间"),
+    ("image_url", "图片链接"),
+]
+
+TREND_COLUMNS = [
+    ("bucket_label", "统计区间"),
+    ("paper_count", "试卷数量"),
+    ("total_questions", "总题数"),
+    ("error_questions", "错题数"),
+    ("error_rate", "错题率(%)"),
+]
+
+# 导出任务保留时间（秒），过期后删除文件
+JOB_TTL = 3600
+
+
+@dataclass
+class ExportRequest:
+    """导出参数"""
+    student_ids: Optional[List[int]]    # None 表示所有学生
+    start_date: date
+    end_date: date
+    fmt: str = "xlsx"
+    granularity: str = "week"
+
+
+@dataclass
+class ExportJob:
+    """导出任务状态"""
+    job_id: str
+    request: ExportRequest
+    status: str = "pending"             # pending / running / done / failed
+    stage: str = "等待开始"
+    rows_written: int = 0
+    path: Optional[str] = None
+    filename: Optional[str] = None
+    mime_type: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+
+
+# ==================== 数据读取 ====================
+
+def _range_bounds(start_date: date, end_date: date) -> tuple:
+    """日期范围（含首尾两天，UTC）转换为 created_time 的比较边界: start <= created_time < end"""
+    start = datetime.combine(start_date, dt_time.min, tzinfo=timezone.utc)
+    end = datetime.combine(end_date + timedelta(days=1), dt_time.min, tzinfo=timezone.utc)
+    return start.isoformat(), end.isoformat()
+
+
+def load_papers(db, request: ExportRequest, page_size: int = 1000) -> List[Dict[str, Any]]:
+    """
+    读取时间范围内的试卷，与错题趋势页面一致按试卷的 created_time 判断是否在范围内
+
+    Args:
+        db: 数据库处理器
+        request: 导出参数
+        page_size: 分页大小
+
+    Returns:
+        list: 试卷，按 created_time 升序
+    """
+    start, end = _range_bounds(request.start_date, request.end_date)
+    papers = []
+    for student_id in request.student_ids or [None]:
+        filters = {"student_id": student_id} if student_id is not None else None
+        for page in db.iter_pages("exam_paper", filters=filters, page_size=page_size,
+                                  order_by="created_time,id", gte_filters={"created_time": start}):
+            in_range = [row for row in page if (normalize_timestamp(row.get("created_time")) or "") < end]
+            papers.extend(in_range)
+            if len(in_range) < len(page):
+                break
+    papers.sort(key=lambda paper: (normalize_timestamp(paper.get("created_time")) or "", paper["id"]))
+    return papers
+
+
+def iter_question_pages(db, paper_ids: List[int], columns: str = "*", page_size: int = 1000,
+                        papers_per_query: int = 100) -> Iterator[List[Dict[str, Any]]]:
+    """
+    分页读取试卷的题目，按试卷分组查询
+
+    Args:
+        db: 数据库处理器
+        paper_ids: 试卷 ID，按该顺序分组读取
+        columns: 读取的列
+        page_size: 分页大小
+        papers_per_query: 每次查询包含的试卷数
+
+    Returns:
+        生成器，每次产出一页题目
+    """
+    for start in range(0, len(paper_ids), papers_per_query):
+        chunk = paper_ids[start:start + papers_per_query]
+        yield from db.iter_pages("question", columns=columns, page_size=page_size,
+                                 order_by="exam_paper_id,id", in_filters={"exam_paper_id": chunk})
+
+
+def collect_paper_stats(db, papers: List[Dict[str, Any]]) -> pd.DataFrame:
+    """第一遍读取：按试卷汇总题目数和错题数，格式与 trend_analysis.load_student_paper_stats 一致"""
+    counts: Dict[int, List[int]] = {}
+    for page in iter_question_pages(db, [paper["id"] for paper in papers], columns="id,exam_paper_id,is_correct"):
+        for question in page:
+            count = counts.setdefault(question.get("exam_paper_id"), [0, 0])
+            count[0] += 1
+            if not question.get("is_correct", False):
+                count[1] += 1
+
+    rows = []
+    for paper in papers:
+        if paper.get("created_time"):
+            total, errors = counts.get(paper["id"], (0, 0))
+            rows.append({
+                "paper_id": paper["id"],
+                "paper_title": paper.get("title") or f"试卷{paper['id']}",
+                "created_time": paper["created_time"],
+                "total_questions": total,
+                "error_questions": errors,
+            })
+    if not rows:
+        return pd.DataFrame(columns=["paper_id", "paper_title", "date", "total_questions", "error_questions"])
+    df = pd.DataFrame(rows)
+    df["date"] = pd.to_datetime(df["created_time"], utc=True, errors="coerce").dt.tz_convert(None)
+    return df.dropna(subset=["date"]).sort_values("date", kind="stable").reset_index(drop=True)
+
+
+# ==================== 文件写入 ====================
+
+class CSVReportWriter:
+    """CSV 只包含错题列表，使用带 BOM 的 UTF-8 便于 Excel 直接打开"""
+
+    def __init__(self, path: str):
+        self._file = open(path, "w", newline="", encoding="utf-8-sig")
+        self._writer = csv.writer(self._file)
+
+    def write_summary(self, title: str, summary: Dict[str, Any], trend: pd.DataFrame):
+        self._writer.writerow([label for _, label in ERROR_COLUMNS])
+
+    def write_errors(self, rows: List[Dict[str, Any]], images: Dict[int, Optional[Dict[str, Any]]]):
+        for row in rows:
+            self._writer.writerow([row.get(key) if row.get(key) is not None else "" for key, _ in ERROR_COLUMNS])
+
+    def close(self):
+        self._file.close()
+
+
+class XLSXReportWriter:
+    """openpyxl 只写模式，逐行写入磁盘"""
+
+    def __init__(self, path: str):
+        from openpyxl import Workbook
+
+        self.path = path
+        self._workbook = Workbook(write_only=True)
+        self._errors = self._workbook.create_sheet("错题列表")
+        self._trend = self._workbook.create_sheet("趋势统计")
+
+    def write_summary(self, title: str, summary: Dict[str, Any], trend: pd.DataFrame):
+        self._trend.append([title])
+        for label, value in summary.items():
+            self._trend.append([label, value])
+        self._trend.append([])
+        self._trend.append([label for _, label in TREND_COLUMNS])
+        for record in trend.to_dict("records"):
+            self._trend.append([round(record[key], 1) if key == "error_rate" else record[key]
+                                for key, _ in TREND_COLUMNS])
+        self._errors.append([label for _, label in ERROR_COLUMNS])
+
+    def write_errors(self, rows: List[Dict[str, Any]], images: Dict[int, Optional[Dict[str, Any]]]):
+        for row in rows:
+            self._errors.append([row.get(key) for key, _ in ERROR_COLUMNS])
+
+    def close(self):
+        self._workbook.save(self.path)
+
+
+class PDFReportWriter:
+    """使用 reportlab 画布逐条绘制，题目数据不在内存中保留；缩略图缩小后嵌入，同一张图片在文档中只嵌入一次"""
+
+    PAGE_MARGIN = 40
+    THUMBNAIL_SIZE = 90
+    FONT = "STSong-Light"
+
+    def __init__(self, path: str, thumbnail_cache_size: int = 64):
+        from reportlab.lib.pagesizes import A4
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+        from reportlab.pdfgen import canvas
+
+        if self.FONT not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(UnicodeCIDFont(self.FONT))
+        self._string_width = pdfmetrics.stringWidth
+        self.width, self.height = A4
+        self._canvas = canvas.Canvas(path, pagesize=A4)
+        self._y = self.height - self.PAGE_MARGIN
+        self._http = requests.Session()
+        # 图片 ID -> 缩略图，多道题共用一张试卷图片
+        self._thumbnails: "OrderedDict[int, Any]" = OrderedDict()
+        self._thumbnail_cache_size = thumbnail_cache_size
+
+    # ---------- 排版 ----------
+
+    def _new_page(self):
+        self._canvas.showPage()
+        self._y = self.height - self.PAGE_MARGIN
+
+    def _ensure_space(self, needed: float):
+        if self._y - needed < self.PAGE_MARGIN:
+            self._new_page()
+
+    def _wrap(self, text: str, size: float, width: float) -> List[str]:
+        """按字符宽度换行，兼容没有空格的中文"""
+        lines, line = [], ""
+        for char in str(text):
+            if char == "\n":
+                lines.append(line)
+                line = ""
+                continue
+            if self._string_width(line + char, self.FONT, size) > width:
+                lines.append(line)
+                line = char
+            else:
+                line += char
+        lines.append(line)
+        return lines
+
+    def _text(self, text: str, size: float = 10, x: float = None, width: float = None):
+        x = self.PAGE_MARGIN if x is None else x
+        width = width or (self.width - x - self.PAGE_MARGIN)
+        for line in self._wrap(text, size, width):
+            self._ensure_space(size * 1.5)
+            self._canvas.setFont(self.FONT, size)
+            self._canvas.drawString(x, self._y - size, line)
+            self._y -= size * 1.5
+
+    def _thumbnail(self, image: Optional[Dict[str, Any]]):
+        """下载并缩小题目图片，失败时返回 None"""
+        if not image or not image.get("image_url"):
+            return None
+        if image["id"] in self._thumbnails:
+            self._thumbnails.move_to_end(image["id"])
+            return self._thumbnails[image["id"]]
+        from PIL import Image
+        from reportlab.lib.utils import ImageReader
+
+        thumbnail = None
+        try:
+            response = self._http.get(image["image_url"], timeout=10)
+            response.raise_for_status()
+            with Image.open(io.BytesIO(response.content)) as picture:
+                picture = picture.convert("RGB")
+                picture.thumbnail((self.THUMBNAIL_SIZE * 2, self.THUMBNAIL_SIZE * 2))
+                buffer = io.BytesIO()
+                picture.save(buffer, format="JPEG", quality=80)
+            buffer.seek(0)
+            thumbnail = ImageReader(buffer)
+        except Exception as e:
+            print(f"下载题目图片失败 {image['image_url']}: {e}")
+        self._thumbnails[image["id"]] = thumbnail
+        if len(self._thumbnails) > self._thumbnail_cache_size:
+            self._thumbnails.popitem(last=False)
+        return thumbnail
+
+    # ---------- 写入 ----------
+
+    def write_summary(self, title: str, summary: Dict[str, Any], trend: pd.DataFrame):
+        self._text(title, size=16)
+        self._y -= 6
+        for label, value in summary.items():
+            self._text(f"{label}: {value}", size=10)
+        self._y -= 10
+        if not trend.empty:
+            self._text("趋势统计", size=13)
+            column_x = [self.PAGE_MARGIN, self.PAGE_MARGIN + 200, self.PAGE_MARGIN + 270,
+                        self.PAGE_MARGIN + 340, self.PAGE_MARGIN + 410]
+            rows = [[label for _, label in TREND_COLUMNS]] + [
+                [record["bucket_label"], record["paper_count"], record["total_questions"],
+                 record["error_questions"], f"{record['error_rate']:.1f}"]
+                for record in trend.to_dict("records")
+            ]
+            for row in rows:
+                self._ensure_space(15)
+                self._canvas.setFont(self.FONT, 9)
+                for x, value in zip(column_x, row):
+                    self._canvas.drawString(x, self._y - 9, str(value))
+                self._y -= 15
+        self._y -= 10
+        self._text("错题列表", size=13)
+
+    def write_errors(self, rows: List[Dict[str, Any]], images: Dict[int, Optional[Dict[str, Any]]]):
+        text_x = self.PAGE_MARGIN + self.THUMBNAIL_SIZE + 12
+        for row in rows:
+            self._ensure_space(self.THUMBNAIL_SIZE + 12)
+            top = self._y
+            thumbnail = self._thumbnail(images.get(row.get("image_id")))
+            if thumbnail is not None:
+                self._canvas.drawImage(thumbnail, self.PAGE_MARGIN, top - self.THUMBNAIL_SIZE,
+                                       width=self.THUMBNAIL_SIZE, height=self.THUMBNAIL_SIZE,
+                                       preserveAspectRatio=True, anchor="nw")
+            self._text(f"{row['student_name']} · {row['paper_title']} · {row['created_time'] or ''}",
+                       size=8, x=text_x)
+            self._text(row.get("content") or "无题目内容", size=10, x=text_x)
+            if row.get("remark"):
+                self._text(f"备注: {row['remark']}", size=9, x=text_x)
+            # 文字较少时以缩略图高度为准
+            self._y = min(self._y, top - self.THUMBNAIL_SIZE) - 12
+
+    def close(self):
+        self._canvas.save()
+        self._http.close()
+
+
+REPORT_WRITERS = {
+    "csv": CSVReportWriter,
+    "xlsx": XLSXReportWriter,
+    "pdf": PDFReportWriter,
+}
+
+
+# ==================== 报告生成 ====================
+
+def generate_report(db, service, request: ExportRequest, path: str,
+                    on_progress: Callable[[str, int], None] = None):
+    """
+    生成报告文件
+
+    Args:
+        db: 数据库处理器，用于分页读取题目
+        service: APIService，用于按 ID 批量读取试卷、图片和学生
+        request: 导出参数
+        path: 输出文件路径
+        on_progress: 进度回调 (阶段, 已写入错题数)
+    """
+    loader = BatchLoader(service.fetch_rows_by_ids)
+    on_progress = on_progress or (lambda stage, rows: None)
+
+    on_progress("统计题目", 0)
+    papers = load_papers(db, request)
+    papers_by_id = {paper["id"]: paper for paper in papers}
+    paper_stats = collect_paper_stats(db, papers)
+    trend = aggregate_buckets(paper_stats, request.granularity)
+    total_questions = int(paper_stats["total_questions"].sum()) if not paper_stats.empty else 0
+    total_errors = int(paper_stats["error_questions"].sum()) if not paper_stats.empty else 0
+
+    students = {student["id"]: student for student in service.list_items(RESOURCES["students"])}
+    if request.student_ids:
+        student_names = "、".join(students.get(sid, {}).get("name", str(sid)) for sid in request.student_ids)
+    else:
+        student_names = "全部学生"
+    summary = {
+        "学生": student_names,
+        "时间范围": f"{request.start_date} 至 {request.end_date}",
+        "统计粒度": f"按{GRANULARITY_LABELS.get(request.granularity, request.granularity)}",
+        "试卷数": len(paper_stats),
+        "总题数": total_questions,
+        "错题数": total_errors,
+        "错题率": f"{total_errors / total_questions * 100:.1f}%" if total_questions else "0.0%",
+    }
+
+    writer = REPORT_WRITERS[request.fmt](path)
+    try:
+        writer.write_summary("错题分析报告", summary, trend)
+        on_progress("写入错题", 0)
+        written = 0
+        for page in iter_question_pages(db, list(papers_by_id)):
+            # is_correct 为空的题目与页面一致按错题处理
+            page = [question for question in page if not question.get("is_correct", False)]
+            if not page:
+                continue
+            loader.prime("exam_paper_image", [question.get("image_id") for question in page])
+            images = {}
+            rows = []
+            for question in page:
+                paper = papers_by_id.get(question.get("exam_paper_id"))
+                image = loader.load("exam_paper_image", question.get("image_id"))
+                images[question.get("image_id")] = image
+                student = students.get(question.get("student_id"), {})
+                rows.append({
+                    "student_name": student.get("name", question.get("student_id")),
+                    "paper_title": (paper or {}).get("title") or f"试卷{question.get('exam_paper_id')}",
+                    "question_id": question["id"],
+                    "content": question.get("content"),
+                    "remark": question.get("remark"),
+                    "created_time": question.get("created_time"),
+                    "image_id": question.get("image_id"),
+                    "image_url": (image or {}).get("image_url"),
+                })
+            writer.write_errors(rows, images)
+            written += len(rows)
+            on_progress("写入错题", written)
+    finally:
+        writer.close()
+
+
+class ExportManager:
+    """在后台线程中执行导出任务"""
+
+    def __init__(self, service, max_workers: int = 2, output_dir: str = None):
+        self.service = service
+        self.output_dir = output_dir or tempfile.mkdtemp(prefix="ladr-export-")
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report-export")
+        self._jobs: Dict[str, ExportJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, request: ExportRequest) -> str:
+        """
+        提交导出任务
+
+        Args:
+            request: 导出参数
+
+        Returns:
+            str: 任务 ID
+        """
+        if request.fmt not in REPORT_WRITERS:
+            raise ValueError(f"不支持的导出格式: {request.fmt}")
+        self.cleanup()
+        job = ExportJob(job_id=uuid.uuid4().hex, request=request)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._executor.submit(self._run, job)
+        return job.job_id
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: ExportJob):
+        request = job.request
+        job_dir = os.path.join(self.output_dir, job.job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        filename = f"错题报告_{request.start_date}_{request.end_date}.{request.fmt}"
+        path = os.path.join(job_dir, filename)
+        job.status = "running"
+
+        def on_progress(stage: str, rows: int):
+            job.stage = stage
+            job.rows_written = rows
+
+        try:
+            generate_report(self.service.db, self.service, request, path, on_progress)
+            job.path = path
+            job.filename = filename
+            job.mime_type = EXPORT_FORMATS[request.fmt][1]
+            job.stage = "完成"
+            job.status = "done"
+        except Exception as e:
+            print(f"生成导出报告时出错: {e}")
+            job.error = str(e)
+            job.status = "failed"
+
+    def cleanup(self, max_age: float = JOB_TTL):
+        """删除过期任务及其文件"""
+        now = time.time()
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.status in ("done", "failed") and now - job.created_at > max_age]
+            for job in expired:
+                del self._jobs[job.job_id]
+        for job in expired:
+            shutil.rmtree(os.path.join(self.output_dir, job.job_id), ignore_errors=True)
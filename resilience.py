@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后端调用的超时、重试和断路器
+Supabase 和 COS 的每次请求按各自的策略执行：幂等操作遇到暂时性错误（超时、连接失败、5xx）时
+按带随机抖动的指数退避重试，总耗时不超过 deadline；连续失败达到阈值后断路器打开，
+之后的调用直接失败而不再等待超时，由调用方回退到上一次成功读取的快照，过 reset_timeout 秒后放行一次探测请求。
+
+配置读取 .streamlit/secrets.toml 的 [resilience] 段，后端名子段（[resilience.supabase]、[resilience.cos]）
+中的配置项覆盖公共配置；没有时读取环境变量:
+
+    [resilience]
+    timeout = 10              # 单次请求的读超时（秒）
+    connect_timeout = 3       # 建立连接的超时（秒）
+    max_attempts = 3          # 幂等操作的最多尝试次数
+    base_delay = 0.2          # 第一次重试前的最大等待（秒），之后每次翻倍
+    max_delay = 2.0           # 单次重试等待的上限（秒）
+    deadline = 15             # 一次调用（含重试）的总耗时上限（秒）
+    failure_threshold = 5     # 连续失败多少次后打开断路器
+    reset_timeout = 30        # 断路器打开多久后放行探测请求（秒）
+
+    LADR_RESILIENCE_TIMEOUT / LADR_RESILIENCE_CONNECT_TIMEOUT / LADR_RESILIENCE_MAX_ATTEMPTS /
+    LADR_RESILIENCE_BASE_DELAY / LADR_RESILIENCE_MAX_DELAY / LADR_RESILIENCE_DEADLINE /
+    LADR_RESILIENCE_FAILURE_THRESHOLD / LADR_RESILIENCE_RESET_TIMEOUT
+"""
+
+import time
+import random
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from app_config import load_config
+from instrumentation import record_retry, record_circuit_rejection
+
+DEFAULT_CONFIG = {
+    "timeout": 10.0,
+    "connect_timeout": 3.0,
+    "max_attempts": 3,
+    "base_delay": 0.2,
+    "max_delay": 2.0,
+    "deadline": 15.0,
+    "failure_threshold": 5,
+    "reset_timeout": 30.0,
+}
+
+# 环境变量名 -> (配置项, 类型)
+ENV_CONFIG = {
+    "LADR_RESILIENCE_TIMEOUT": ("timeout", float),
+    "LADR_RESILIENCE_CONNECT_TIMEOUT": ("connect_timeout", float),
+    "LADR_RESILIENCE_MAX_ATTEMPTS": ("max_attempts", int),
+    "LADR_RESILIENCE_BASE_DELAY": ("base_delay", float),
+    "LADR_RESILIENCE_MAX_DELAY": ("max_delay", float),
+    "LADR_RESILIENCE_DEADLINE": ("deadline", float),
+    "LADR_RESILIENCE_FAILURE_THRESHOLD": ("failure_threshold", int),
+    "LADR_RESILIENCE_RESET_TIMEOUT": ("reset_timeout", float),
+}
+
+
+class CircuitOpenError(Exception):
+    """断路器打开期间调用被直接拒绝"""
+
+
+def load_resilience_config(backend: str) -> Dict[str, Any]:
+    """
+    读取指定后端的配置，secrets 的 [resilience] 段优先于环境变量
+
+    Args:
+        backend: 后端名，例如 supabase、cos
+
+    Returns:
+        dict: 完整的配置项
+    """
+    loaded = load_config("resilience", ENV_CONFIG)
+    config = dict(DEFAULT_CONFIG)
+    config.update({key: value for key, value in loaded.items() if key in DEFAULT_CONFIG})
+    # 后端名子段只存在于 secrets 中
+    config.update({key: value for key, value in dict(loaded.get(backend) or {}).items()
+                   if key in DEFAULT_CONFIG})
+    return config
+
+
+class CircuitBreaker:
+    """连续失败计数的断路器：closed -> open -> half_open -> closed / open"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        初始化断路器
+
+        Args:
+            name: 后端名，用于日志和指标
+            failure_threshold: 连续失败多少次后打开
+            reset_timeout: 打开多久后放行一次探测请求（秒）
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        # 半开状态下是否已有探测请求在执行
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return "open"
+            return "half_open"
+
+    def allow(self) -> bool:
+        """是否放行本次调用；半开状态下只放行一个探测请求"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                print(f"{self.name} 已恢复，断路器关闭")
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+                if self._opened_at is None:
+                    print(f"{self.name} 连续 {self._failures} 次调用失败，断路器打开 {self.reset_timeout:g} 秒")
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class Resilience:
+    """一个后端的重试策略和断路器，同一后端的所有客户端共享"""
+
+    def __init__(self, name: str, is_transient: Callable[[BaseException], bool], config: Dict[str, Any] = None):
+        """
+        初始化
+
+        Args:
+            name: 后端名
+            is_transient: 判断异常是否为暂时性错误（可重试、计入断路器）的函数
+            config: 配置，默认由 load_resilience_config 读取
+        """
+        config = {**DEFAULT_CONFIG, **(config or {})}
+        self.name = name
+        self.is_transient = is_transient
+        self.timeout = float(config["timeout"])
+        self.connect_timeout = float(config["connect_timeout"])
+        self.max_attempts = max(1, int(config["max_attempts"]))
+        self.base_delay = float(config["base_delay"])
+        self.max_delay = float(config["max_delay"])
+        self.deadline = float(config["deadline"])
+        self.breaker = CircuitBreaker(name, int(config["failure_threshold"]), float(config["reset_timeout"]))
+
+    def backoff(self, retry: int) -> float:
+        """第 retry 次重试前的等待时间（full jitter）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry)))
+
+    def call(self, operation: str, fn: Callable[[], Any], idempotent: bool = True) -> Any:
+        """
+        按重试策略和断路器执行一次调用
+
+        Args:
+            operation: 操作名，用于指标
+            fn: 执行请求的函数，每次尝试调用一次
+            idempotent: 是否可以安全重试；非幂等操作（插入）只尝试一次
+
+        Returns:
+            fn 的返回值
+
+        Raises:
+            CircuitOpenError: 断路器打开
+            Exception: 最后一次尝试的异常
+        """
+        if not self.breaker.allow():
+            record_circuit_rejection(self.name, operation)
+            raise CircuitOpenError(f"{self.name} 暂时不可用（断路器打开）")
+        started = time.monotonic()
+        attempts = self.max_attempts if idempotent else 1
+        for attempt in range(attempts):
+            try:
+                result = fn()
+            except Exception as e:
+                if not self.is_transient(e):
+                    # 后端给出了明确的响应（如约束冲突），说明后端可用
+                    self.breaker.record_success()
+                    raise
+                delay = self.backoff(attempt)
+                if attempt + 1 >= attempts or time.monotonic() - started + delay >= self.deadline:
+                    self.breaker.record_failure()
+                    raise
+                record_retry(self.name, operation)
+                time.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+
+_registry: Dict[str, Resilience] = {}
+_registry_lock = threading.Lock()
+
+
+def get_resilience(name: str, is_transient: Callable[[BaseException], bool]) -> Resilience:
+    """获取后端共享的重试策略和断路器，首次使用时读取配置"""
+    with _registry_lock:
+        resilience = _registry.get(name)
+        if resilience is None:
+            resilience = _registry[name] = Resilience(name, is_transient, load_resilience_config(name))
+        return resilience
+
+
+def breaker_states() -> Dict[str, str]:
+    """各后端断路器的当前状态"""
+    with _registry_lock:
+        return {name: resilience.breaker.state for name, resilience in _registry.items()}
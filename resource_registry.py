@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+资源注册表
+集中定义每个 API 资源对应的数据表和 Pydantic 模型，
+APIService 的通用 CRUD、make_api_request 的分发以及 FastAPI 路由都由此生成。
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import Callable, Dict, Any, Optional, Type
+
+from pydantic import BaseModel
+
+from models import (
+    UserCreate, UserUpdate, UserResponse,
+    StudentCreate, StudentUpdate, StudentResponse,
+    ExamPaperCreate, ExamPaperUpdate, ExamPaperResponse,
+    ExamPaperImageCreate, ExamPaperImageUpdate, ExamPaperImageResponse,
+    KnowledgePointCreate, KnowledgePointUpdate, KnowledgePointResponse,
+    QuestionCreate, QuestionUpdate, QuestionResponse,
+    QuestionKnowledgePointCreate, QuestionKnowledgePointUpdate, QuestionKnowledgePointResponse,
+)
+
+
+def hash_password(password: str) -> str:
+    """密码哈希（简单哈希，实际项目中应使用 bcrypt 等安全哈希）"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def is_password_hash(value: str) -> bool:
+    """是否为 hash_password 的结果（64 位十六进制）"""
+    return len(value) == 64 and all(c in "0123456789abcdef" for c in value)
+
+
+def hash_user_password(data: Dict[str, Any]) -> Dict[str, Any]:
+    """将原始密码转换为 password_hash"""
+    if data.get('password') is not None:
+        data['password_hash'] = hash_password(data['password'])
+    data.pop('password', None)
+    return data
+
+
+@dataclass(frozen=True)
+class ResourceSpec:
+    """一个 API 资源的定义"""
+    name: str                                  # 资源名，即 endpoint 和路由路径中的名称
+    table: str                                 # Supabase 表名
+    label: str                                 # 中文名称，用于提示信息
+    create_model: Type[BaseModel]
+    update_model: Type[BaseModel]
+    response_model: Type[BaseModel]
+    # 写入前对数据的预处理，例如密码哈希
+    prepare_write: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+    # 表可能不存在，列表接口出错时返回空数组
+    list_empty_on_error: bool = False
+
+
+RESOURCES: Dict[str, ResourceSpec] = {
+    spec.name: spec for spec in [
+        ResourceSpec("users", "user", "用户",
+                     UserCreate, UserUpdate, UserResponse,
+                     prepare_write=hash_user_password),
+        ResourceSpec("students", "student", "学生",
+                     StudentCreate, StudentUpdate, StudentResponse),
+        ResourceSpec("exam_papers", "exam_paper", "试卷",
+                     ExamPaperCreate, ExamPaperUpdate, ExamPaperResponse),
+        ResourceSpec("exam_paper_images", "exam_paper_image", "试卷图片",
+                     ExamPaperImageCreate, ExamPaperImageUpdate, ExamPaperImageResponse),
+        ResourceSpec("knowledge_points", "knowledge_point", "知识点",
+                     KnowledgePointCreate, KnowledgePointUpdate, KnowledgePointResponse,
+                     list_empty_on_error=True),
+        ResourceSpec("questions", "question", "题目",
+                     QuestionCreate, QuestionUpdate, QuestionResponse),
+        ResourceSpec("question_knowledge_points", "question_knowledge_point", "题目知识点关联",
+                     QuestionKnowledgePointCreate, QuestionKnowledgePointUpdate, QuestionKnowledgePointResponse,
+                     list_empty_on_error=True),
+    ]
+}
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨进程共享缓存
+多个 Streamlit 副本共享同一份表数据缓存，整表和按条件的读取在所有副本间只查询一次 Supabase，
+各副本不再各自维护整表快照。HTTP API 进程不经共享缓存读取，但写操作成功后同样使其失效。后端为 Redis（需安装 redis），测试和单进程开发可以使用进程内的 LocalCacheBackend，
+或把 fakeredis.FakeRedis() 作为 client 传给 RedisCacheBackend。
+
+- 每张表有一个版本号，写操作成功后递增版本号，该表所有旧版本的缓存立即失效（旧键随过期时间自动删除）
+- 缓存过期（ttl）后仍保留到 max_stale，只有取得刷新锁的一个副本重新读取，其余副本继续返回旧数据；
+  重新读取失败时同样返回旧数据
+- 值使用 orjson 序列化，所有副本都能读取；首字节标明格式，旧版本写入的 msgpack 值在安装了 msgpack 时仍可读取，
+  无法解析的值按缓存故障处理，重新查询后覆盖
+- Redis 不可用时经断路器直接读取 Supabase，缓存故障不影响页面
+
+配置读取 .streamlit/secrets.toml 的 [shared_cache] 段，没有时读取环境变量 LADR_SHARED_CACHE_URL / LADR_SHARED_CACHE_TTL:
+
+    [shared_cache]
+    backend = "redis"                   # redis / local
+    url = "redis://localhost:6379/0"
+    ttl = 60                            # 缓存保持新鲜的时间（秒）
+    max_stale = 600                     # 过期后最多继续使用的时间（秒）
+    prefix = "ladr"
+
+    [shared_cache.table_ttl]            # 按表覆盖 ttl
+    question = 30
+"""
+
+import time
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import orjson
+
+from app_config import load_config
+from single_flight import SingleFlight
+from resilience import Resilience, CircuitOpenError, get_resilience
+from instrumentation import record_shared_cache
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack 为可选依赖
+    msgpack = None
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis 为可选依赖
+    redis = None
+
+# 环境变量名 -> (配置项, 类型)
+ENV_CONFIG = {
+    "LADR_SHARED_CACHE_URL": ("url", str),
+    "LADR_SHARED_CACHE_TTL": ("ttl", float),
+}
+
+# 序列化格式标记
+FORMAT_MSGPACK = b"m"
+FORMAT_JSON = b"j"
+
+# 刷新锁的过期时间（秒），持有锁的副本异常退出时其他副本在此之后接手
+REFRESH_LOCK_SECONDS = 30
+
+
+def serialize(value: Any) -> bytes:
+    """序列化为带格式标记的字节串"""
+    return FORMAT_JSON + orjson.dumps(value, default=str)
+
+
+def deserialize(payload: bytes) -> Any:
+    """反序列化 serialize 的结果"""
+    if payload[:1] == FORMAT_MSGPACK:
+        if msgpack is None:
+            raise ValueError("缓存值为 msgpack 格式，但未安装 msgpack")
+        return msgpack.unpackb(payload[1:], raw=False)
+    return orjson.loads(payload[1:])
+
+
+class LocalCacheBackend:
+    """进程内的缓存后端，接口与 RedisCacheBackend 一致，用于测试和单进程开发"""
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key: str) -> Optional[tuple]:
+        item = self._data.get(key)
+        if item is not None and item[1] is not None and item[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return item
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._alive(key)
+            return item[0] if item is not None else None
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        """键不存在时设置，返回是否设置成功"""
+        with self._lock:
+            if self._alive(key) is not None:
+                return False
+            self._data[key] = (value, time.monotonic() + ttl)
+            return True
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            item = self._alive(key)
+            value = int(item[0]) + 1 if item is not None else 1
+            self._data[key] = (str(value).encode(), None)
+            return value
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class RedisCacheBackend:
+    """Redis 缓存后端"""
+
+    def __init__(self, url: str = None, client: Any = None):
+        """
+        初始化 Redis 后端
+
+        Args:
+            url: Redis 地址，例如 redis://localhost:6379/0
+            client: 直接使用的客户端（例如 fakeredis.FakeRedis()），设置后忽略 url
+        """
+        if client is None:
+            if redis is None:
+                raise ImportError("未安装 redis，无法使用 Redis 共享缓存")
+            # 缓存读写应当很快，超时设短，Redis 故障时尽快回退到直接读取
+            client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.client = client
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.client.set(key, value, px=int(ttl * 1000))
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        return bool(self.client.set(key, value, px=int(ttl * 1000), nx=True))
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(key))
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+
+def is_transient_cache_error(e: BaseException) -> bool:
+    """Redis 的连接和超时错误计入断路器"""
+    if redis is not None and isinstance(e, (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)):
+        return True
+    return isinstance(e, (TimeoutError, ConnectionError))
+
+
+class SharedCache:
+    """按表版本号失效的共享读缓存"""
+
+    def __init__(self, backend: Any, ttl: float = 60, max_stale: float = 600, prefix: str = "ladr",
+                 table_ttl: Dict[str, float] = None, resilience: Resilience = None):
+        """
+        初始化共享缓存
+
+        Args:
+            backend: LocalCacheBackend 或 RedisCacheBackend
+            ttl: 缓存保持新鲜的时间（秒）
+            max_stale: 过期后最多继续使用的时间（秒）
+            prefix: 键前缀，多个环境共用一个 Redis 时区分
+            table_ttl: 按表覆盖的 ttl
+            resilience: 缓存后端的断路器，默认按后端名 shared_cache 共享
+        """
+        self.backend = backend
+        self.ttl = float(ttl)
+        self.max_stale = max(float(max_stale), self.ttl)
+        self.prefix = prefix
+        self.table_ttl = dict(table_ttl or {})
+        self.resilience = resilience or get_resilience("shared_cache", is_transient_cache_error)
+        # 同一进程内相同键的并发读取合并为一次
+        self._flight = SingleFlight()
+
+    def _call(self, operation: str, fn: Callable[[], Any]) -> Any:
+        """访问缓存后端，只尝试一次，连续失败后由断路器直接拒绝"""
+        return self.resilience.call(operation, fn, idempotent=False)
+
+    def _data_key(self, table_name: str, filters: Optional[dict]) -> str:
+        version = self._call("get", lambda: self.backend.get(f"{self.prefix}:version:{table_name}"))
+        version = int(version) if version else 0
+        if filters:
+            digest = hashlib.sha1(orjson.dumps(filters, option=orjson.OPT_SORT_KEYS, default=str)).hexdigest()[:16]
+        else:
+            digest = "all"
+        return f"{self.prefix}:data:{table_name}:{version}:{digest}"
+
+    def get_or_load(self, table_name: str, filters: Optional[dict],
+                    load: Callable[[], Optional[list]]) -> Optional[list]:
+        """
+        读取缓存，未命中或过期时调用 load 读取并写回
+
+        Args:
+            table_name: 表名
+            filters: 精确匹配过滤条件，None 表示整表
+            load: 读取数据的函数，失败时返回 None
+
+        Returns:
+            list: 数据行；缓存不可用时直接返回 load 的结果
+        """
+        try:
+            key = self._data_key(table_name, filters)
+            cached = self._call("get", lambda: self.backend.get(key))
+        except Exception as e:
+            if not isinstance(e, CircuitOpenError):
+                print(f"读取共享缓存失败，直接查询: {e}")
+            record_shared_cache(table_name, "error")
+            return load()
+
+        # 无法解析的值（损坏，或本副本未安装 msgpack）视为缓存故障，重新查询后覆盖
+        decoded = False
+        if cached is not None:
+            try:
+                entry = deserialize(cached)
+                fetched_at, cached_rows = entry["fetched_at"], entry["rows"]
+                decoded = True
+            except Exception as e:
+                print(f"共享缓存的值无法解析，重新查询: {e}")
+                record_shared_cache(table_name, "error")
+
+        stale_rows = None
+        if decoded:
+            if time.time() - fetched_at < self.table_ttl.get(table_name, self.ttl):
+                record_shared_cache(table_name, "hit")
+                return cached_rows
+            stale_rows = cached_rows
+            # 只有取得刷新锁的副本重新读取，其余副本继续使用旧数据
+            try:
+                acquired = self._call("add", lambda: self.backend.add(f"{key}:lock", b"1", REFRESH_LOCK_SECONDS))
+            except Exception:
+                acquired = True
+            if not acquired:
+                record_shared_cache(table_name, "stale")
+                return stale_rows
+
+        if cached is None or decoded:
+            record_shared_cache(table_name, "miss")
+        rows = self._flight.do(key, load)
+        if rows is None:
+            return stale_rows
+        try:
+            payload = serialize({"fetched_at": time.time(), "rows": rows})
+            self._call("set", lambda: self.backend.set(key, payload, self.max_stale))
+            if stale_rows is not None:
+                self._call("delete", lambda: self.backend.delete(f"{key}:lock"))
+        except Exception as e:
+            if not isinstance(e, CircuitOpenError):
+                print(f"写入共享缓存失败: {e}")
+        return rows
+
+    def invalidate(self, table_name: str):
+        """写操作成功后递增表的版本号，所有副本的旧缓存随即失效"""
+        try:
+            self._call("incr", lambda: self.backend.incr(f"{self.prefix}:version:{table_name}"))
+        except Exception as e:
+            print(f"使 {table_name} 的共享缓存失效时出错: {e}")
+
+
+def create_shared_cache() -> Optional[SharedCache]:
+    """
+    根据 secrets 或环境变量创建共享缓存，未配置时返回 None
+
+    Returns:
+        SharedCache: 共享缓存
+    """
+    config = load_config("shared_cache", ENV_CONFIG)
+    if not config.get("url") and config.get("backend") != "local":
+        return None
+
+    try:
+        if config.get("backend", "redis") == "local":
+            backend = LocalCacheBackend()
+        else:
+            backend = RedisCacheBackend(config["url"])
+        return SharedCache(
+            backend,
+            ttl=config.get("ttl", 60),
+            max_stale=config.get("max_stale", 600),
+            prefix=config.get("prefix", "ladr"),
+            table_ttl=dict(config.get("table_ttl") or {}),
+        )
+    except Exception as e:
+        print(f"初始化共享缓存失败，改为各进程分别读取: {e}")
+        return None
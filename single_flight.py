@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求合并（single-flight）
+同一时刻对同一 key 的多个并发调用只执行一次，其余调用等待并得到其结果的副本，
+缓存同时失效时避免每个会话各自发起一次相同的整表查询。
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    """一次正在执行的调用"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+def _copy_result(value: Any) -> Any:
+    """等待方得到的结果副本：列表和字典复制一层，列表中的行（dict）也复制，其他值原样共享"""
+    if isinstance(value, list):
+        return [dict(item) if isinstance(item, dict) else item for item in value]
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+class SingleFlight:
+    """按 key 合并并发调用"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        执行 fn，如果相同 key 的调用正在执行则等待并返回它的结果
+
+        Args:
+            key: 调用标识，相同 key 的并发调用会被合并
+            fn: 无参数的调用
+
+        Returns:
+            fn 的返回值，等待的调用方得到副本，修改结果不会影响其他调用方；
+            fn 抛出的异常会传递给所有等待的调用方
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return _copy_result(call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # 先移除再唤醒，之后到达的调用会重新查询，读到的是最新数据
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        """正在执行的调用数"""
+        with self._lock:
+            return len(self._calls)
+
+
+def make_key(*parts: Any, filters: Dict[str, Any] = None) -> tuple:
+    """由资源名和过滤条件生成可哈希的 key，过滤条件与顺序无关"""
+    return parts + (tuple(sorted((filters or {}).items())),)
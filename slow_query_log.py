@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+慢查询日志
+记录耗时或返回行数超过阈值、以及出错的 Supabase 调用，每条一行 JSON，包含表、操作、列、过滤条件、
+调用页面和代码位置、耗时和行数。满足条件的调用按比例采样并限制每分钟的条数，被限流丢弃的条数记在下一条日志中。
+
+配置读取 .streamlit/secrets.toml 的 [slow_query_log] 段，没有时读取环境变量:
+
+    [slow_query_log]
+    enabled = true
+    slow_ms = 500              # 耗时阈值（毫秒）
+    max_rows = 5000            # 行数阈值
+    sample_rate = 1.0          # 超过阈值的调用中记录的比例
+    max_per_minute = 60        # 每分钟最多记录的条数
+    file = "data/slow_queries.jsonl"   # 不设置时输出到标准错误
+
+    LADR_SLOW_QUERY_ENABLED / LADR_SLOW_QUERY_MS / LADR_SLOW_QUERY_ROWS / LADR_SLOW_QUERY_SAMPLE_RATE /
+    LADR_SLOW_QUERY_MAX_PER_MINUTE / LADR_SLOW_QUERY_FILE
+
+汇总日志，找出最值得优化的查询:
+
+    python slow_query_log.py data/slow_queries.jsonl
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Optional
+
+from app_config import load_config
+
+# 环境变量名 -> (配置项, 类型)
+ENV_CONFIG = {
+    "LADR_SLOW_QUERY_ENABLED": ("enabled", lambda value: value.lower() not in ("0", "false", "no")),
+    "LADR_SLOW_QUERY_MS": ("slow_ms", float),
+    "LADR_SLOW_QUERY_ROWS": ("max_rows", int),
+    "LADR_SLOW_QUERY_SAMPLE_RATE": ("sample_rate", float),
+    "LADR_SLOW_QUERY_MAX_PER_MINUTE": ("max_per_minute", int),
+    "LADR_SLOW_QUERY_FILE": ("file", str),
+}
+
+DEFAULT_CONFIG = {
+    "enabled": True,
+    "slow_ms": 500.0,
+    "max_rows": 5000,
+    "sample_rate": 1.0,
+    "max_per_minute": 60,
+    "file": None,
+}
+
+# 这些列的过滤值不写入日志
+REDACTED_COLUMNS = {"password", "password_hash"}
+# 数据访问层的模块，定位调用位置时跳过
+INTERNAL_MODULES = {"supabase_handler.py", "instrumentation.py", "slow_query_log.py", "tracing.py",
+                    "api_service.py", "table_snapshot.py", "local_replica.py", "single_flight.py",
+                    "batch_loader.py", "bulk_operations.py", "contextlib.py", "threading.py"}
+
+# 当前请求所属的页面或路由，由 Streamlit 入口和 HTTP 中间件设置
+current_page: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("ladr_current_page", default=None)
+
+
+@contextmanager
+def page_context(name: str):
+    """在 with 块内把调用归属到指定的页面或路由"""
+    token = current_page.set(name)
+    try:
+        yield
+    finally:
+        current_page.reset(token)
+
+
+def load_slow_query_config() -> Dict[str, Any]:
+    """读取慢查询日志配置，secrets 的 [slow_query_log] 段优先于环境变量"""
+    return load_config("slow_query_log", ENV_CONFIG, DEFAULT_CONFIG)
+
+
+class SlowQueryLog:
+    """超过阈值的调用的采样和限流日志"""
+
+    def __init__(self, slow_ms: float = 500.0, max_rows: int = 5000, sample_rate: float = 1.0,
+                 max_per_minute: int = 60, file: Optional[str] = None, enabled: bool = True):
+        """
+        初始化慢查询日志
+
+        Args:
+            slow_ms: 耗时阈值（毫秒）
+            max_rows: 行数阈值
+            sample_rate: 超过阈值的调用中记录的比例，出错的调用总是参与记录
+            max_per_minute: 每分钟最多记录的条数
+            file: 日志文件路径（按 10MB 轮转），None 表示输出到标准错误
+            enabled: 是否启用
+        """
+        self.enabled = enabled
+        self.slow_ms = float(slow_ms)
+        self.max_rows = int(max_rows)
+        self.sample_rate = float(sample_rate)
+        self.max_per_minute = int(max_per_minute)
+        self._lock = threading.Lock()
+        # 令牌桶：容量为每分钟条数，按秒匀速补充
+        self._tokens = float(self.max_per_minute)
+        self._refilled_at = time.monotonic()
+        self._suppressed = 0
+
+        self.logger = logging.getLogger("ladr.slow_query")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        if not self.logger.handlers:
+            if file:
+                os.makedirs(os.path.dirname(os.path.abspath(file)), exist_ok=True)
+                handler = RotatingFileHandler(file, maxBytes=10 * 1024 * 1024, backupCount=5, encoding="utf-8")
+            else:
+                handler = logging.StreamHandler(sys.stderr)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger.addHandler(handler)
+
+    def should_log(self, duration_ms: float, rows: Optional[int], error: Optional[str]) -> Optional[str]:
+        """判断是否超过阈值，返回原因（slow / large / error），不需要记录时返回 None"""
+        if not self.enabled:
+            return None
+        if error is not None:
+            return "error"
+        if duration_ms >= self.slow_ms:
+            return "slow"
+        if rows is not None and rows >= self.max_rows:
+            return "large"
+        return None
+
+    def _acquire(self) -> Optional[int]:
+        """取一个令牌，成功时返回此前被丢弃的条数，失败时返回 None"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(float(self.max_per_minute),
+                               self._tokens + (now - self._refilled_at) * self.max_per_minute / 60)
+            self._refilled_at = now
+            if self._tokens < 1:
+                self._suppressed += 1
+                return None
+            self._tokens -= 1
+            suppressed, self._suppressed = self._suppressed, 0
+            return suppressed
+
+    def record(self, table: str, operation: str, duration_ms: float, rows: Optional[int] = None,
+               payload_bytes: Optional[int] = None, error: Optional[str] = None,
+               details: Dict[str, Any] = None):
+        """
+        记录一次数据库调用，未超过阈值、未被采样或被限流时直接返回
+
+        Args:
+            table: 表名
+            operation: 操作名
+            duration_ms: 耗时（毫秒）
+            rows: 返回行数
+            payload_bytes: 估算的响应大小
+            error: 错误信息
+            details: 查询参数，例如 columns、filters、gt_filters、range
+        """
+        reason = self.should_log(duration_ms, rows, error)
+        if reason is None:
+            return
+        if reason != "error" and self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        suppressed = self._acquire()
+        if suppressed is None:
+            return
+
+        entry = {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "reason": reason,
+            "table": table,
+            "operation": operation,
+            "duration_ms": round(duration_ms, 2),
+            "rows": rows,
+            "bytes": payload_bytes,
+            "page": current_page.get(),
+            "caller": find_caller(),
+            "thread": threading.current_thread().name,
+        }
+        for key, value in (details or {}).items():
+            entry[key] = redact_filters(value) if key.endswith("filters") else value
+        if error is not None:
+            entry["error"] = error
+        if suppressed:
+            entry["suppressed"] = suppressed
+        self.logger.info(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+def redact_filters(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """隐去密码等敏感列的过滤值"""
+    if not filters:
+        return filters
+    return {column: "***" if column in REDACTED_COLUMNS else value for column, value in filters.items()}
+
+
+def find_caller() -> Optional[str]:
+    """最近一个数据访问层之外的调用位置，格式为 文件:行号:函数"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if os.path.basename(filename) not in INTERNAL_MODULES and os.path.join("concurrent", "futures") not in filename:
+            return f"{os.path.relpath(filename)}:{frame.f_lineno}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+_log: Optional[SlowQueryLog] = None
+_log_lock = threading.Lock()
+
+
+def get_slow_query_log() -> SlowQueryLog:
+    """进程内共享的慢查询日志，首次使用时读取配置"""
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = SlowQueryLog(**load_slow_query_config())
+    return _log
+
+
+# ==================== 汇总 ====================
+
+def summarize_log(path: str, top: int = 20):
+    """按表、操作和过滤列汇总日志，按总耗时排序打印"""
+    groups: Dict[tuple, Dict[str, Any]] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            key = (entry.get("table"), entry.get("operation"), ",".join(sorted(entry.get("filters") or {})),
+                   entry.get("page"))
+            group = groups.setdefault(key, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                            "max_rows": 0, "callers": set()})
+            group["count"] += 1 + entry.get("suppressed", 0)
+            group["errors"] += entry.get("reason") == "error"
+            group["total_ms"] += entry.get("duration_ms", 0)
+            group["max_ms"] = max(group["max_ms"], entry.get("duration_ms", 0))
+            group["max_rows"] = max(group["max_rows"], entry.get("rows") or 0)
+            if entry.get("caller"):
+                group["callers"].add(entry["caller"])
+
+    print(f"{'表':<26}{'操作':<14}{'过滤列':<22}{'页面':<12}{'次数':>6}{'错误':>6}{'总耗时ms':>12}{'最大ms':>10}{'最大行数':>10}")
+    ranked = sorted(groups.items(), key=lambda item: item[1]["total_ms"], reverse=True)[:top]
+    for (table, operation, filter_columns, page), group in ranked:
+        print(f"{str(table):<26}{str(operation):<14}{filter_columns or '-':<22}{str(page or '-'):<12}"
+              f"{group['count']:>6}{group['errors']:>6}{group['total_ms']:>12.1f}{group['max_ms']:>10.1f}"
+              f"{group['max_rows']:>10}")
+        for caller in sorted(group["callers"])[:3]:
+            print(f"    {caller}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="汇总慢查询日志")
+    parser.add_argument("path", help="日志文件")
+    parser.add_argument("--top", type=int, default=20, help="显示的条数")
+    args = parser.parse_args()
+    summarize_log(args.path, args.top)
+
+
+if __name__ == "__main__":
+    main()
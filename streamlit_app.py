@@ -7,7 +7,11 @@ import sys
 # 添加当前目录到路径以导入模块
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from api_service import make_api_request
+from swr_cache import swr_cache
+from columnar import ColumnarTable
 from pages.login import show_login_page, check_login, show_logout_button
+from tracing import trace_span
+from slow_query_log import page_context
 
 # 使用 Streamlit secrets 获取 Supabase 配置
 try:
@@ -29,26 +33,26 @@ st.set_page_config(
 
 # 获取数据的辅助函数
 
-@st.cache_data(ttl=30)
-def get_exam_papers() -> List[Dict]:
+@swr_cache(ttl=30, columnar=True, tables=("exam_paper",))
+def get_exam_papers() -> ColumnarTable:
     """获取试卷列表"""
     result = make_api_request("GET", "exam_papers")
     return result["data"] if result["success"] else []
 
-@st.cache_data(ttl=30)
-def get_exam_paper_images() -> List[Dict]:
+@swr_cache(ttl=30, columnar=True, tables=("exam_paper_image",))
+def get_exam_paper_images() -> ColumnarTable:
     """获取试卷图片列表"""
     result = make_api_request("GET", "exam_paper_images")
     return result["data"] if result["success"] else []
 
-@st.cache_data(ttl=30)
-def get_questions() -> List[Dict]:
+@swr_cache(ttl=30, columnar=True, tables=("question",))
+def get_questions() -> ColumnarTable:
     """获取题目列表"""
     result = make_api_request("GET", "questions")
     return result["data"] if result["success"] else []
 
-@st.cache_data(ttl=30)
-def get_knowledge_points() -> List[Dict]:
+@swr_cache(ttl=30, columnar=True, tables=("knowledge_point",))
+def get_knowledge_points() -> ColumnarTable:
     """获取知识点列表"""
     result = make_api_request("GET", "knowledge_points")
     return result["data"] if result["success"] else []
@@ -103,6 +107,11 @@ else:
         title="知识点管理", 
         icon="📚"
     )
+    performance_metrics_page = st.Page(
+        "pages/performance_metrics.py",
+        title="性能监控",
+        icon="⏱️"
+    )
     
     # 创建导航
     pg = st.navigation([
@@ -111,8 +120,12 @@ else:
         exam_paper_images_page,
         exam_paper_detail_page,
         error_analysis_page,
-        knowledge_points_page
+        knowledge_points_page,
+        performance_metrics_page
     ])
     
-    # 运行页面
-    pg.run()
\ No newline at end of file
+    # 运行页面，每次运行对应一个追踪 span；st.rerun / st.stop 通过异常实现，不记为错误
+    # 页面内的数据库调用在慢查询日志中归属到该页面
+    with trace_span("streamlit.page", {"streamlit.page": pg.title}, record_exception=False), \
+            page_context(pg.title):
+        pg.run()
\ No newline at end of file
@@ -1,11 +1,94 @@
 import streamlit as st
-from supabase import create_client, Client
+from datetime import datetime, timezone
+from typing import Optional
+import httpx
+from postgrest.exceptions import APIError
+from supabase import create_client, Client, ClientOptions
+
+from instrumentation import track_db_call
+from tracing import trace_span
+from resilience import get_resilience
+
+# 增量同步所依据的变更时间列。
+# 只有 question 表维护 updated_time：update_data / update_in 在数据中没有指定时写入当前时间（见 _stamp_updated_time），
+# 数据库中如另有 updated_time 触发器，以触发器写入的时间为准；question_knowledge_point 只插入不更新（修改题目时先删后建），
+# 可以用 created_time；其余表没有可靠的变更时间列，只能全量刷新。
+SYNC_WATERMARK_COLUMNS = {
+    "question": "updated_time",
+    "question_knowledge_point": "created_time",
+}
+
+# 可以安全重试的操作；插入不是幂等的，超时后无法确定是否已写入，只尝试一次
+IDEMPOTENT_OPERATIONS = {
+    "select_data", "select_in", "select_page", "update_data", "update_in", "delete_data", "delete_in",
+}
+
+# PostgREST 无法连接数据库、连接池等待超时等服务端暂时不可用的错误码
+TRANSIENT_POSTGREST_CODES = {"PGRST000", "PGRST001", "PGRST002", "PGRST003"}
+# SQLSTATE 类别：08 连接异常，53 资源不足，57P 数据库正在关闭或重启
+TRANSIENT_SQLSTATE_PREFIXES = ("08", "53", "57P")
+
+def is_transient_error(e: BaseException) -> bool:
+    """
+    判断 Supabase 调用的异常是否为暂时性错误（超时、网络错误、5xx），这类错误会重试并计入断路器。
+
+    :param e: 调用抛出的异常。
+    :return: 是否为暂时性错误。
+    """
+    if isinstance(e, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError,
+                      TimeoutError, ConnectionError)):
+        return True
+    if isinstance(e, APIError):
+        # 响应不是 JSON（网关错误页等）时 code 为 HTTP 状态码
+        if isinstance(e.code, int):
+            return e.code >= 500
+        code = str(e.code or "")
+        return code in TRANSIENT_POSTGREST_CODES or code.startswith(TRANSIENT_SQLSTATE_PREFIXES)
+    return False
+
+def normalize_timestamp(value: Optional[str]) -> Optional[str]:
+    """
+    将时间字符串规范化为 UTC ISO 格式，保证字符串比较与时间先后一致。
+
+    :param value: PostgREST 返回的时间字符串。
+    :return: 规范化后的字符串，无法解析时原样返回。
+    """
+    if not value:
+        return value
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (ValueError, TypeError):
+        return value
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+# 替代的 Supabase 客户端，设置后新建的 SupabaseHandler 不再读取 secrets，
+# 供基准测试等场景使用本地的替身客户端。
+_client_override = None
+
+def use_client(client):
+    """
+    让之后创建的 SupabaseHandler 使用指定的客户端。
+
+    :param client: 与 supabase Client 接口一致的对象，None 表示恢复使用 secrets 配置。
+    """
+    global _client_override
+    _client_override = client
 
 class SupabaseHandler:
-    def __init__(self):
+    def __init__(self, client: Client = None):
         """
         初始化 Supabase 客户端。
+
+        :param client: 直接使用的客户端，默认根据 .streamlit/secrets.toml 创建。
         """
+        # 重试策略和断路器按后端共享，所有 SupabaseHandler 实例一起统计失败次数
+        self.resilience = get_resilience("supabase", is_transient_error)
+        client = client or _client_override
+        if client is not None:
+            self.client = client
+            return
         try:
             url: str = st.secrets["supabase"]["url"]
             key: str = st.secrets["supabase"]["key"]
@@ -14,15 +97,41 @@ class SupabaseHandler:
         
         if not url or not key:
             raise ValueError("Supabase URL 和 Key 不能为空。请检查 .streamlit/secrets.toml 文件配置。")
-        self.client: Client = create_client(url, key)
+        timeout = httpx.Timeout(self.resilience.timeout, connect=self.resilience.connect_timeout)
+        self.client: Client = create_client(url, key, options=ClientOptions(postgrest_client_timeout=timeout))
+
+    def _execute(self, table_name: str, operation: str, query, **details):
+        """
+        执行查询，记录耗时、返回行数、响应大小和错误次数，并创建追踪 span。
+        幂等操作遇到暂时性错误时按退避策略重试，每次尝试分别记录指标；断路器打开时直接抛出 CircuitOpenError。
+
+        :param table_name: 表名。
+        :param operation: 操作名，即调用的方法名，例如 "select_data"。
+        :param query: 构造好的 PostgREST 查询。
+        :param details: 查询参数（columns、filters 等），超过阈值时写入慢查询日志。
+        :return: 查询响应，出错时异常照常抛出。
+        """
+        with trace_span(f"supabase.{operation}", {
+            "db.system": "postgresql", "db.sql.table": table_name, "db.operation": operation,
+        }) as span:
+            def attempt():
+                with track_db_call(table_name, operation, details) as call:
+                    response = query.execute()
+                    call.set_result(response.data)
+                if call.rows is not None:
+                    span.set_attributes({"ladr.rows": len(call.rows), "ladr.response_bytes": call.payload_bytes})
+                return response
 
-    def select_data(self, table_name: str, columns: str = "*", filters: dict = None):
+            return self.resilience.call(operation, attempt, idempotent=operation in IDEMPOTENT_OPERATIONS)
+
+    def select_data(self, table_name: str, columns: str = "*", filters: dict = None, raise_errors: bool = False):
         """
         从指定的表中查询数据。
 
         :param table_name: 要查询的表名。
         :param columns: 要选择的列，默认为 "*" (所有列)。
         :param filters: 一个字典，用于过滤结果，例如 {"column_name": "value"}。
+        :param raise_errors: 为 True 时出错直接抛出异常，调用方可以区分查询失败和没有数据。
         :return: 查询结果的数据部分 (data) 或在出错时返回 None。
         """
         try:
@@ -31,7 +140,7 @@ class SupabaseHandler:
                 for column, value in filters.items():
                     query = query.eq(column, value) # 使用 .eq() 进行精确匹配
             
-            response = query.execute()
+            response = self._execute(table_name, "select_data", query, columns=columns, filters=filters)
             return response.data
         except Exception as e:
             # 如果是表不存在的错误，只在非knowledge_point表时打印错误
@@ -39,8 +148,107 @@ class SupabaseHandler:
                 # knowledge_point表可能不存在，这是正常情况
                 return []
             print(f"查询数据时出错: {e}")
+            if raise_errors:
+                raise
+            return None
+
+    def select_in(self, table_name: str, column: str, values: list, columns: str = "*"):
+        """
+        查询某列取值在给定列表中的所有行，用于按 ID 批量读取。
+
+        :param table_name: 要查询的表名。
+        :param column: 匹配的列，例如 "id"。
+        :param values: 取值列表。
+        :param columns: 要选择的列，默认为 "*" (所有列)。
+        :return: 查询结果的数据部分 (data) 或在出错时返回 None。
+        """
+        if not values:
+            return []
+        try:
+            query = self.client.table(table_name).select(columns).in_(column, list(values))
+            response = self._execute(table_name, "select_in", query, columns=columns,
+                                     filters={column: f"in ({len(values)} values)"})
+            return response.data
+        except Exception as e:
+            print(f"批量查询数据时出错: {e}")
+            return None
+
+    def select_page(self, table_name: str, columns: str = "*", filters: dict = None,
+                    start: int = 0, end: int = 999, order_by: str = "id",
+                    gt_filters: dict = None, gte_filters: dict = None, in_filters: dict = None):
+        """
+        分页查询指定表中的数据。
+
+        :param table_name: 要查询的表名。
+        :param columns: 要选择的列，默认为 "*" (所有列)。
+        :param filters: 精确匹配过滤条件，例如 {"student_id": 1}。
+        :param start: 起始行偏移（包含）。
+        :param end: 结束行偏移（包含）。
+        :param order_by: 排序列，多个列用逗号分隔，保证分页结果稳定。
+        :param gt_filters: 大于过滤条件，例如 {"updated_time": "2024-01-01T00:00:00+00:00"}。
+        :param gte_filters: 大于等于过滤条件。
+        :param in_filters: 取值在列表中的过滤条件，例如 {"exam_paper_id": [1, 2, 3]}。
+        :return: 当前页的数据或在出错时返回 None。
+        """
+        try:
+            query = self.client.table(table_name).select(columns)
+            if filters:
+                for column, value in filters.items():
+                    query = query.eq(column, value)
+            if gt_filters:
+                for column, value in gt_filters.items():
+                    query = query.gt(column, value)
+            if gte_filters:
+                for column, value in gte_filters.items():
+                    query = query.gte(column, value)
+            if in_filters:
+                for column, values in in_filters.items():
+                    query = query.in_(column, list(values))
+            for column in order_by.split(","):
+                query = query.order(column.strip())
+
+            response = self._execute(table_name, "select_page", query.range(start, end), columns=columns,
+                                     filters=filters, gt_filters=gt_filters, gte_filters=gte_filters,
+                                     in_filters={column: f"in ({len(values)} values)"
+                                                 for column, values in (in_filters or {}).items()} or None,
+                                     range=[start, end])
+            return response.data
+        except Exception as e:
+            print(f"分页查询数据时出错: {e}")
             return None
 
+    def iter_pages(self, table_name: str, columns: str = "*", filters: dict = None,
+                   page_size: int = 1000, order_by: str = "id", gt_filters: dict = None,
+                   gte_filters: dict = None, in_filters: dict = None):
+        """
+        逐页遍历指定表中的数据，避免一次性读取整张表。
+
+        :param table_name: 要查询的表名。
+        :param columns: 要选择的列，默认为 "*" (所有列)。
+        :param filters: 精确匹配过滤条件。
+        :param page_size: 每页行数。
+        :param order_by: 排序列，多个列用逗号分隔。
+        :param gt_filters: 大于过滤条件，用于按水位线增量读取。
+        :param gte_filters: 大于等于过滤条件。
+        :param in_filters: 取值在列表中的过滤条件。
+        :return: 生成器，每次产出一页数据 (list)。
+        :raises RuntimeError: 某一页查询失败时抛出，避免调用方误以为已读完。
+        """
+        start = 0
+        while True:
+            page = self.select_page(
+                table_name, columns=columns, filters=filters,
+                start=start, end=start + page_size - 1,
+                order_by=order_by, gt_filters=gt_filters, gte_filters=gte_filters, in_filters=in_filters
+            )
+            if page is None:
+                raise RuntimeError(f"分页读取 {table_name} 失败 (offset={start})")
+            if page:
+                yield page
+            if len(page) < page_size:
+                break
+            start += page_size
+
     def insert_data(self, table_name: str, data: dict):
         """
         向指定的表中插入单条数据。
@@ -55,12 +263,87 @@ class SupabaseHandler:
             if 'id' in insert_data:
                 del insert_data['id']
             
-            response = self.client.table(table_name).insert(insert_data).execute()
+            response = self._execute(table_name, "insert_data", self.client.table(table_name).insert(insert_data))
             return response.data
         except Exception as e:
             print(f"插入数据时出错: {e}")
             return None
 
+    def insert_many(self, table_name: str, rows: list, raise_errors: bool = False):
+        """
+        以一次请求向指定的表中插入多条数据。
+
+        :param table_name: 目标表名。
+        :param rows: 要插入的数据列表。
+        :param raise_errors: 为 True 时出错直接抛出异常，由调用方区分被拒绝（整批未写入）和结果未知（超时等）。
+        :return: 插入成功后的数据（与 rows 顺序一致）或在出错时返回 None。
+        """
+        if not rows:
+            return []
+        try:
+            insert_rows = [{k: v for k, v in row.items() if k != 'id'} for row in rows]
+            response = self._execute(table_name, "insert_many", self.client.table(table_name).insert(insert_rows),
+                                     write_rows=len(insert_rows))
+            return response.data
+        except Exception as e:
+            print(f"批量插入数据时出错: {e}")
+            if raise_errors:
+                raise
+            return None
+
+    def update_in(self, table_name: str, data: dict, column: str, values: list):
+        """
+        将同一份修改应用到某列取值在给定列表中的所有行。
+
+        :param table_name: 目标表名。
+        :param data: 要更新的新数据。
+        :param column: 匹配的列，例如 "id"。
+        :param values: 取值列表。
+        :return: 更新成功后的数据或在出错时返回 None。
+        """
+        if not values:
+            return []
+        try:
+            query = self.client.table(table_name).update(self._stamp_updated_time(table_name, data)).in_(
+                column, list(values))
+            response = self._execute(table_name, "update_in", query, filters={column: f"in ({len(values)} values)"})
+            return response.data
+        except Exception as e:
+            print(f"批量更新数据时出错: {e}")
+            return None
+
+    def delete_in(self, table_name: str, column: str, values: list):
+        """
+        删除某列取值在给定列表中的所有行。
+
+        :param table_name: 目标表名。
+        :param column: 匹配的列，例如 "id"。
+        :param values: 取值列表。
+        :return: 被删除的数据或在出错时返回 None。
+        """
+        if not values:
+            return []
+        try:
+            query = self.client.table(table_name).delete().in_(column, list(values))
+            response = self._execute(table_name, "delete_in", query, filters={column: f"in ({len(values)} values)"})
+            return response.data
+        except Exception as e:
+            print(f"批量删除数据时出错: {e}")
+            return None
+
+    @staticmethod
+    def _stamp_updated_time(table_name: str, data: dict) -> dict:
+        """
+        为以 updated_time 作为变更时间列的表补上更新时间，保证增量同步能读到这次修改。
+
+        :param table_name: 目标表名。
+        :param data: 要更新的新数据。
+        :return: 补上 updated_time 后的数据（不修改传入的字典）。
+        """
+        if SYNC_WATERMARK_COLUMNS.get(table_name) != "updated_time" or "updated_time" in data:
+            return data
+        return {**data, "updated_time": datetime.now(timezone.utc).isoformat()}
+
     def update_data(self, table_name: str, data: dict, filters: dict):
         """
         更新指定表中的数据。
@@ -71,11 +354,11 @@ class SupabaseHandler:
         :return: 更新成功后的数据或在出错时返回 None。
         """
         try:
-            query = self.client.table(table_name).update(data)
+            query = self.client.table(table_name).update(self._stamp_updated_time(table_name, data))
             for column, value in filters.items():
                 query = query.eq(column, value)
             
-            response = query.execute()
+            response = self._execute(table_name, "update_data", query, filters=filters)
             return response.data
         except Exception as e:
             print(f"更新数据时出错: {e}")
@@ -94,7 +377,7 @@ class SupabaseHandler:
             for column, value in filters.items():
                 query = query.eq(column, value)
             
-            response = query.execute()
+            response = self._execute(table_name, "delete_data", query, filters=filters)
             return response.data
         except Exception as e:
             print(f"删除数据时出错: {e}")
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+页面数据的 stale-while-revalidate 缓存
+替代页面辅助函数上的 st.cache_data(ttl=30)：缓存过期后仍立即返回上一次的结果，
+同时在后台线程刷新（每个 key 同一时刻只有一个刷新），页面首屏不再等待整表读取。
+超过 max_stale 的结果不再使用，改为同步读取，并发的相同读取合并为一次。
+
+    @swr_cache(ttl=30, max_stale=300)
+    def get_questions() -> List[Dict]:
+        ...
+
+与 st.cache_data 一样，缓存在进程内所有会话间共享，每次命中返回结果的副本（pickle 往返），
+调用方修改返回值不会影响缓存。返回整表的函数可以设置 columnar=True，结果转换为不可变的 ColumnarTable
+（见 columnar.py），命中时直接共享同一个对象，不再复制。写操作后调用 clear_page_caches() 同时清空本缓存和 st.cache_data。
+
+收到其他会话或实例的实时变更时调用 expire_page_caches(table_name)：只把依赖该表（装饰器的 tables 参数）的缓存
+标记为过期，下一次读取仍立即返回旧结果并在后台刷新，持续的写入流量不会让每个会话都同步重新读取整表。
+"""
+
+import time
+import pickle
+import functools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+import streamlit as st
+
+from single_flight import SingleFlight
+from tracing import bind_context
+from columnar import to_columnar, is_shareable
+
+# 后台刷新使用的线程池，所有缓存共享
+_refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="swr-refresh")
+
+
+class _Entry:
+    """一个 key 的缓存结果"""
+
+    __slots__ = ("payload", "shared", "fetched_at", "refreshing", "expired")
+
+    def __init__(self, payload: Any, shared: bool, fetched_at: float):
+        # shared 为 True 时 payload 是不可变的结果本身，否则是 pickle 序列化后的字节串
+        self.payload = payload
+        self.shared = shared
+        self.fetched_at = fetched_at
+        # 是否已有后台刷新在执行
+        self.refreshing = False
+        # 依赖的表有变更，未到 ttl 也在下一次读取时后台刷新
+        self.expired = False
+
+    def value(self) -> Any:
+        """返回给调用方的结果：不可变的结果直接共享（字典只复制外层），其余反序列化出一份副本"""
+        if not self.shared:
+            return pickle.loads(self.payload)
+        if isinstance(self.payload, dict):
+            return dict(self.payload)
+        return self.payload
+
+
+class SWRCache:
+    """单个函数的 stale-while-revalidate 缓存"""
+
+    def __init__(self, ttl: float = 30, max_stale: float = 300, max_entries: int = 256, columnar: bool = False,
+                 tables: Optional[Iterable[str]] = None):
+        """
+        初始化缓存
+
+        Args:
+            ttl: 结果保持新鲜的时间（秒），过期后返回旧结果并在后台刷新
+            max_stale: 结果最长可用的时间（秒），超过后同步读取
+            max_entries: 最多缓存的参数组合数，超过时淘汰最久未使用的
+            columnar: 是否把行列表转换为 ColumnarTable 保存
+            tables: 结果依赖的表名，None 表示任何表变更都需要刷新
+        """
+        self.ttl = ttl
+        self.columnar = columnar
+        self.tables = frozenset(tables) if tables is not None else None
+        self.max_stale = max(max_stale, ttl)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        # 清空时递增，清空前开始的读取不再写回缓存
+        self._generation = 0
+        # 最近一次 expire 的时间，在此之前开始的读取写回时同样标记为过期
+        self._expired_at = float("-inf")
+
+    def get(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """
+        读取缓存
+
+        Args:
+            key: 参数组成的 key
+            load: 读取数据的函数
+
+        Returns:
+            缓存结果的副本；同步读取时 load 抛出的异常会继续向外抛出
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generation
+            if entry is not None:
+                self._entries.move_to_end(key)
+                age = now - entry.fetched_at
+                if age >= self.max_stale:
+                    entry = None
+                elif (age >= self.ttl or entry.expired) and not entry.refreshing:
+                    entry.refreshing = True
+                    _refresh_pool.submit(bind_context(self._refresh), key, load, generation)
+
+        if entry is None:
+            entry = self._flight.do(key, lambda: self._load(key, load, generation))
+        return entry.value()
+
+    def _load(self, key: Hashable, load: Callable[[], Any], generation: int) -> _Entry:
+        """读取数据并写回缓存，返回新的缓存项"""
+        started = time.monotonic()
+        value = load()
+        if self.columnar:
+            value = to_columnar(value)
+        if is_shareable(value):
+            entry = _Entry(value, True, time.monotonic())
+        else:
+            entry = _Entry(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), False, time.monotonic())
+        with self._lock:
+            # 读取期间依赖的表又有变更，结果可能不包含该变更
+            entry.expired = started <= self._expired_at
+            if generation == self._generation:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def _refresh(self, key: Hashable, load: Callable[[], Any], generation: int):
+        """后台刷新，失败时继续提供旧结果，下一次读取会再次尝试"""
+        try:
+            self._flight.do(key, lambda: self._load(key, load, generation))
+        except Exception as e:
+            print(f"后台刷新缓存失败: {e}")
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refreshing = False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def expire(self):
+        """标记所有结果为过期：下一次读取返回旧结果并在后台刷新，不同步等待"""
+        with self._lock:
+            self._expired_at = time.monotonic()
+            for entry in self._entries.values():
+                entry.expired = True
+
+
+# (函数所在文件, 函数名) -> 缓存；页面脚本每次运行都会重新定义函数，按此复用同一个缓存
+_caches: Dict[Tuple[str, str], SWRCache] = {}
+_caches_lock = threading.Lock()
+
+
+def swr_cache(ttl: float = 30, max_stale: float = 300, max_entries: int = 256, columnar: bool = False,
+              tables: Optional[Iterable[str]] = None):
+    """
+    stale-while-revalidate 缓存装饰器，参数需可哈希
+
+    Args:
+        ttl: 结果保持新鲜的时间（秒）
+        max_stale: 结果最长可用的时间（秒）
+        max_entries: 最多缓存的参数组合数
+        columnar: 是否把返回的行列表（或 名称 -> 行列表 的字典）保存为 ColumnarTable，命中时不复制
+        tables: 结果依赖的表名，expire_page_caches 只使依赖变更表的缓存过期；None 表示依赖所有表
+    """
+    def decorator(fn: Callable) -> Callable:
+        cache_id = (fn.__code__.co_filename, fn.__qualname__)
+        with _caches_lock:
+            cache = _caches.get(cache_id)
+            if cache is None:
+                cache = _caches[cache_id] = SWRCache(ttl, max_stale, max_entries, columnar, tables)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            return cache.get(key, lambda: fn(*args, **kwargs))
+
+        wrapper.clear = cache.clear
+        wrapper.expire = cache.expire
+        return wrapper
+    return decorator
+
+
+def clear_page_caches():
+    """清空所有 stale-while-revalidate 缓存和 st.cache_data，写操作后调用"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    for cache in caches:
+        cache.clear()
+    st.cache_data.clear()
+
+
+def expire_page_caches(table_name: str):
+    """
+    使依赖某张表的 stale-while-revalidate 缓存过期，收到实时变更时调用
+
+    与 clear_page_caches 不同，结果不会被丢弃：下一次读取立即返回旧结果，并在后台刷新
+
+    Args:
+        table_name: 发生变更的表名
+    """
+    with _caches_lock:
+        caches = list(_caches.values())
+    for cache in caches:
+        if cache.tables is None or table_name in cache.tables:
+            cache.expire()
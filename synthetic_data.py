@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成数据生成器
+按固定随机种子为全部七张表生成可复现的数据，可控制数据规模和分布偏斜
+（学生错误率的差异、知识点的热门程度和难度），用于在接近生产的数据量下复现和验证性能问题。
+数据按学生分批生成，可以写成 JSONL / CSV 夹具文件，也可以通过批量插入导入数据库。
+
+用法:
+    python synthetic_data.py --students 2000 --output fixtures/ --format csv
+    python synthetic_data.py --students 500 --seed 7 --load     # 导入 secrets 中配置的 Supabase
+"""
+
+import os
+import csv
+import json
+import math
+import random
+import hashlib
+import argparse
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 按外键依赖排列的表顺序，导入时依次插入
+TABLE_ORDER = [
+    "user", "knowledge_point", "student", "exam_paper",
+    "exam_paper_image", "question", "question_knowledge_point",
+]
+
+# 各表的列，CSV 表头按此顺序
+TABLE_COLUMNS: Dict[str, List[str]] = {
+    "user": ["id", "username", "password_hash", "created_at"],
+    "knowledge_point": ["id", "name"],
+    "student": ["id", "user_id", "name"],
+    "exam_paper": ["id", "student_id", "title", "description", "created_time"],
+    "exam_paper_image": ["id", "exam_paper_id", "image_url", "upload_order"],
+    "question": ["id", "exam_paper_id", "image_id", "student_id", "content", "is_correct", "remark",
+                 "created_time", "updated_time"],
+    "question_knowledge_point": ["id", "question_id", "knowledge_point_id", "created_time"],
+}
+
+# 外键列 -> 引用的表，导入数据库时用数据库分配的 ID 替换生成时的 ID
+FOREIGN_KEYS: Dict[str, Dict[str, str]] = {
+    "student": {"user_id": "user"},
+    "exam_paper": {"student_id": "student"},
+    "exam_paper_image": {"exam_paper_id": "exam_paper"},
+    "question": {"exam_paper_id": "exam_paper", "image_id": "exam_paper_image", "student_id": "student"},
+    "question_knowledge_point": {"question_id": "question", "knowledge_point_id": "knowledge_point"},
+}
+
+# 所有批次共用、需要保留 ID 映射的表；其余表只在本批次内被引用
+SHARED_TABLES = {"user", "knowledge_point"}
+
+SURNAMES = "王李张刘陈杨赵黄周吴徐孙胡朱高林何郭马罗"
+GIVEN_NAMES = "子涵梓萱浩然雨桐一诺宇轩欣怡俊杰思彤博文诗涵明轩"
+SUBJECTS = ["数学", "物理", "化学", "英语", "语文", "生物"]
+TOPICS = ["函数", "方程", "不等式", "几何证明", "概率统计", "数列", "受力分析", "电路", "化学方程式",
+          "阅读理解", "完形填空", "文言文", "细胞结构", "遗传规律", "三角函数", "向量"]
+EXAM_KINDS = ["单元测试", "月考", "期中考试", "期末考试", "周练", "模拟考试"]
+REMARKS = ["审题不清", "计算错误", "概念混淆", "步骤不完整", "粗心"]
+
+
+@dataclass
+class SyntheticConfig:
+    """合成数据的规模和分布参数，区间参数为闭区间 (最小值, 最大值)"""
+    students: int = 1000
+    seed: int = 0
+    students_per_user: int = 40
+    papers_per_student: Tuple[int, int] = (10, 30)
+    images_per_paper: Tuple[int, int] = (1, 4)
+    questions_per_paper: Tuple[int, int] = (30, 50)
+    knowledge_points: int = 300
+    kps_per_question: Tuple[int, int] = (1, 3)
+    # 知识点热门程度服从 Zipf 分布，指数越大越集中在少数知识点，0 为均匀
+    kp_popularity_skew: float = 1.1
+    # 每个学生的错误率服从 Beta 分布：均值和集中度，集中度越小学生之间的差异越大
+    error_rate_mean: float = 0.3
+    error_rate_concentration: float = 8.0
+    # 知识点难度系数服从期望为 1 的对数正态分布，乘在学生错误率上，0 表示所有知识点难度相同
+    kp_difficulty_sigma: float = 0.5
+    # 未批改（is_correct 为空）的题目比例
+    unmarked_rate: float = 0.02
+    start_date: datetime = field(default_factory=lambda: datetime(2024, 2, 1, tzinfo=timezone.utc))
+    days: int = 365
+
+    def estimated_rows(self) -> Dict[str, int]:
+        """按区间中值估算各表行数"""
+        def mid(bounds):
+            return (bounds[0] + bounds[1]) / 2
+        papers = self.students * mid(self.papers_per_student)
+        questions = papers * mid(self.questions_per_paper)
+        return {
+            "user": math.ceil(self.students / self.students_per_user),
+            "knowledge_point": self.knowledge_points,
+            "student": self.students,
+            "exam_paper": int(papers),
+            "exam_paper_image": int(papers * mid(self.images_per_paper)),
+            "question": int(questions),
+            "question_knowledge_point": int(questions * mid(self.kps_per_question)),
+        }
+
+
+class _Generator:
+    """按学生顺序生成数据，随机数只依赖种子和学生顺序，与分批大小无关"""
+
+    def __init__(self, config: SyntheticConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.next_ids = {table_name: 1 for table_name in TABLE_ORDER}
+        self.user_ids: List[int] = []
+
+        # 知识点：随机打乱后按 Zipf 分配权重，热门知识点不集中在 ID 靠前的位置
+        self.kp_ids = list(range(1, config.knowledge_points + 1))
+        self.rng.shuffle(self.kp_ids)
+        cumulative, total = [], 0.0
+        for rank in range(1, len(self.kp_ids) + 1):
+            total += 1 / rank ** config.kp_popularity_skew
+            cumulative.append(total)
+        self.kp_cum_weights = cumulative
+        self.kp_difficulty = {
+            # 均值取 -σ²/2，使难度系数的期望为 1，整体错误率仍接近 error_rate_mean
+            kp_id: self.rng.lognormvariate(-config.kp_difficulty_sigma ** 2 / 2, config.kp_difficulty_sigma)
+            for kp_id in range(1, config.knowledge_points + 1)
+        }
+
+    def _next_id(self, table_name: str) -> int:
+        row_id = self.next_ids[table_name]
+        self.next_ids[table_name] += 1
+        return row_id
+
+    def _between(self, bounds: Tuple[int, int]) -> int:
+        return self.rng.randint(bounds[0], bounds[1])
+
+    def shared_rows(self) -> Dict[str, List[Dict[str, Any]]]:
+        """用户和知识点"""
+        config = self.config
+        users = []
+        for _ in range(max(1, math.ceil(config.students / config.students_per_user))):
+            user_id = self._next_id("user")
+            self.user_ids.append(user_id)
+            users.append({
+                "id": user_id,
+                "username": f"teacher{user_id:04d}",
+                "password_hash": hashlib.sha256(f"password{user_id}".encode()).hexdigest(),
+                "created_at": config.start_date.isoformat(),
+            })
+        knowledge_points = []
+        for kp_id in range(1, config.knowledge_points + 1):
+            self._next_id("knowledge_point")
+            subject = SUBJECTS[kp_id % len(SUBJECTS)]
+            topic = TOPICS[(kp_id // len(SUBJECTS)) % len(TOPICS)]
+            knowledge_points.append({"id": kp_id, "name": f"{subject}·{topic}{kp_id}"})
+        return {"user": users, "knowledge_point": knowledge_points}
+
+    def student_rows(self, index: int, batch: Dict[str, List[Dict[str, Any]]]):
+        """生成一个学生及其试卷、图片、题目和知识点关联，追加到 batch"""
+        config, rng = self.config, self.rng
+        student_id = self._next_id("student")
+        batch["student"].append({
+            "id": student_id,
+            "user_id": self.user_ids[index // config.students_per_user % len(self.user_ids)],
+            "name": rng.choice(SURNAMES) + "".join(rng.sample(GIVEN_NAMES, 2)),
+        })
+
+        mean, concentration = config.error_rate_mean, config.error_rate_concentration
+        error_rate = rng.betavariate(max(mean * concentration, 1e-3), max((1 - mean) * concentration, 1e-3))
+
+        for _ in range(self._between(config.papers_per_student)):
+            paper_id = self._next_id("exam_paper")
+            created = config.start_date + timedelta(days=rng.randrange(config.days), minutes=rng.randrange(1440))
+            batch["exam_paper"].append({
+                "id": paper_id,
+                "student_id": student_id,
+                "title": f"{rng.choice(SUBJECTS)}{rng.choice(EXAM_KINDS)}",
+                "description": None,
+                "created_time": created.isoformat(),
+            })
+
+            image_ids = []
+            for order in range(self._between(config.images_per_paper)):
+                image_id = self._next_id("exam_paper_image")
+                image_ids.append(image_id)
+                batch["exam_paper_image"].append({
+                    "id": image_id,
+                    "exam_paper_id": paper_id,
+                    "image_url": f"exam_papers/{paper_id}/{order + 1}.jpg",
+                    "upload_order": order,
+                })
+
+            question_count = self._between(config.questions_per_paper)
+            for number in range(1, question_count + 1):
+                question_id = self._next_id("question")
+                question_time = (created + timedelta(seconds=rng.randrange(3600))).isoformat()
+                kp_ids = list(dict.fromkeys(rng.choices(self.kp_ids, cum_weights=self.kp_cum_weights,
+                                                        k=self._between(config.kps_per_question))))
+                if rng.random() < config.unmarked_rate:
+                    is_correct = None
+                else:
+                    difficulty = sum(self.kp_difficulty[kp_id] for kp_id in kp_ids) / len(kp_ids)
+                    is_correct = rng.random() >= min(error_rate * difficulty, 0.95)
+                batch["question"].append({
+                    "id": question_id,
+                    "exam_paper_id": paper_id,
+                    # 题目按顺序分布在各页图片上
+                    "image_id": image_ids[(number - 1) * len(image_ids) // question_count],
+                    "student_id": student_id,
+                    "content": f"第{number}题",
+                    "is_correct": is_correct,
+                    "remark": rng.choice(REMARKS) if is_correct is False and rng.random() < 0.3 else None,
+                    "created_time": question_time,
+                    "updated_time": question_time,
+                })
+                for kp_id in kp_ids:
+                    batch["question_knowledge_point"].append({
+                        "id": self._next_id("question_knowledge_point"),
+                        "question_id": question_id,
+                        "knowledge_point_id": kp_id,
+                        "created_time": question_time,
+                    })
+
+
+def generate_batches(config: SyntheticConfig, batch_size: int = 20) -> Iterator[Dict[str, List[Dict[str, Any]]]]:
+    """
+    分批生成数据
+
+    Args:
+        config: 规模和分布参数
+        batch_size: 每批的学生数
+
+    Returns:
+        Iterator: 每批为 表名 -> 行列表，第一批额外包含用户和知识点；
+                  外键只引用本批或之前批次的行，可按 TABLE_ORDER 顺序逐批导入
+    """
+    generator = _Generator(config)
+    shared = generator.shared_rows()
+    for start in range(0, max(config.students, 1), batch_size):
+        batch = {table_name: [] for table_name in TABLE_ORDER}
+        if start == 0:
+            batch.update(shared)
+        for index in range(start, min(start + batch_size, config.students)):
+            generator.student_rows(index, batch)
+        yield batch
+
+
+def generate_dataset(config: SyntheticConfig) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    一次性生成全部数据，适合中小规模
+
+    Returns:
+        dict: 表名 -> 行列表
+    """
+    dataset = {table_name: [] for table_name in TABLE_ORDER}
+    for batch in generate_batches(config):
+        for table_name, rows in batch.items():
+            dataset[table_name].extend(rows)
+    return dataset
+
+
+def write_fixtures(config: SyntheticConfig, output_dir: str, file_format: str = "jsonl",
+                   batch_size: int = 20) -> Dict[str, int]:
+    """
+    将数据逐批写成每张表一个的夹具文件（<表名>.jsonl 或 <表名>.csv），内存占用只与批大小有关
+
+    Args:
+        config: 规模和分布参数
+        output_dir: 输出目录
+        file_format: "jsonl" 或 "csv"，CSV 中空值写为空串
+        batch_size: 每批的学生数
+
+    Returns:
+        dict: 表名 -> 写入行数
+    """
+    if file_format not in ("jsonl", "csv"):
+        raise ValueError(f"不支持的格式: {file_format}")
+    os.makedirs(output_dir, exist_ok=True)
+    files, writers = {}, {}
+    counts = {table_name: 0 for table_name in TABLE_ORDER}
+    try:
+        for table_name in TABLE_ORDER:
+            path = os.path.join(output_dir, f"{table_name}.{file_format}")
+            files[table_name] = open(path, "w", encoding="utf-8", newline="")
+            if file_format == "csv":
+                writers[table_name] = csv.DictWriter(files[table_name], fieldnames=TABLE_COLUMNS[table_name])
+                writers[table_name].writeheader()
+        for batch in generate_batches(config, batch_size):
+            for table_name, rows in batch.items():
+                if file_format == "csv":
+                    writers[table_name].writerows(rows)
+                else:
+                    files[table_name].writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+                counts[table_name] += len(rows)
+    finally:
+        for f in files.values():
+            f.close()
+    return counts
+
+
+def load_into_database(db, config: SyntheticConfig, batch_size: int = 20,
+                       chunk_size: int = 500) -> Optional[Dict[str, int]]:
+    """
+    通过批量插入将数据导入数据库，外键替换为数据库分配的 ID
+
+    Args:
+        db: SupabaseHandler（可以使用 benchmarks/fake_supabase.py 的替身客户端）
+        config: 规模和分布参数
+        batch_size: 每批的学生数
+        chunk_size: 每次插入请求的行数
+
+    Returns:
+        dict: 表名 -> 导入行数；插入失败时返回 None
+    """
+    counts = {table_name: 0 for table_name in TABLE_ORDER}
+    # 表名 -> {生成的 ID: 数据库 ID}
+    id_maps: Dict[str, Dict[int, int]] = {table_name: {} for table_name in TABLE_ORDER}
+    for batch in generate_batches(config, batch_size):
+        for table_name in TABLE_ORDER:
+            if table_name not in SHARED_TABLES:
+                id_maps[table_name].clear()
+            rows = batch[table_name]
+            foreign_keys = FOREIGN_KEYS.get(table_name, {})
+            for start in range(0, len(rows), chunk_size):
+                chunk = rows[start:start + chunk_size]
+                insert_rows = []
+                for row in chunk:
+                    insert_row = dict(row)
+                    for column, ref_table in foreign_keys.items():
+                        if insert_row.get(column) is not None:
+                            insert_row[column] = id_maps[ref_table][insert_row[column]]
+                    insert_rows.append(insert_row)
+                inserted = db.insert_many(table_name, insert_rows)
+                if inserted is None or len(inserted) != len(chunk):
+                    print(f"导入 {table_name} 失败，已导入: {counts}")
+                    return None
+                for row, inserted_row in zip(chunk, inserted):
+                    id_maps[table_name][row["id"]] = inserted_row["id"]
+                counts[table_name] += len(chunk)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成可复现的合成数据")
+    parser.add_argument("--students", type=int, default=1000, help="学生数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--papers", default="10-30", help="每个学生的试卷数区间")
+    parser.add_argument("--questions", default="30-50", help="每张试卷的题目数区间")
+    parser.add_argument("--knowledge-points", type=int, default=300, help="知识点数")
+    parser.add_argument("--kp-skew", type=float, default=1.1, help="知识点热门程度的 Zipf 指数")
+    parser.add_argument("--error-rate", type=float, default=0.3, help="平均错误率")
+    parser.add_argument("--output", help="夹具文件输出目录")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl", help="夹具文件格式")
+    parser.add_argument("--load", action="store_true", help="导入 secrets 中配置的 Supabase")
+    args = parser.parse_args()
+
+    def bounds(value: str) -> Tuple[int, int]:
+        low, _, high = value.partition("-")
+        return int(low), int(high or low)
+
+    config = SyntheticConfig(
+        students=args.students,
+        seed=args.seed,
+        papers_per_student=bounds(args.papers),
+        questions_per_paper=bounds(args.questions),
+        knowledge_points=args.knowledge_points,
+        kp_popularity_skew=args.kp_skew,
+        error_rate_mean=args.error_rate,
+    )
+    print(f"预计行数: {config.estimated_rows()}")
+
+    if args.output:
+        counts = write_fixtures(config, args.output, args.format)
+        print(f"已写入 {args.output}: {counts}")
+    if args.load:
+        from supabase_handler import SupabaseHandler
+        counts = load_into_database(SupabaseHandler(), config)
+        if counts is not None:
+            print(f"已导入数据库: {counts}")
+    if not args.output and not args.load:
+        parser.error("请指定 --output 或 --load")
+
+
+if __name__ == "__main__":
+    main()
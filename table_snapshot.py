@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+表快照模块
+在进程内为每张表维护一份完整快照，刷新时只读取水位线之后变更或新插入的行，
+并定期核对 id 清理已删除的行，稳态刷新几乎不产生流量。
+水位线和最大 id 只由从数据库读取的行推进：直写和实时推送的行可能带有较晚的时间戳或 id，
+若由它们推进，其他实例较早的修改会落在水位线之下而再也读不到。
+读取接口返回行的浅复制，调用方修改返回的行（例如添加展示用的列）不会影响快照。
+"""
+
+import time
+import threading
+from typing import List, Dict, Any, Optional
+
+from supabase_handler import SupabaseHandler, normalize_timestamp
+
+
+class TableSnapshot:
+    """单张表的进程内快照"""
+
+    def __init__(self, table_name: str, db: SupabaseHandler, watermark_column: Optional[str] = None,
+                 min_refresh_interval: float = 2, reconcile_interval: float = 300,
+                 page_size: int = 1000):
+        """
+        初始化表快照
+
+        Args:
+            table_name: 表名
+            db: 数据库处理器
+            watermark_column: 变更时间列，None 表示表中没有可靠的变更时间列
+            min_refresh_interval: 两次增量刷新之间的最小间隔（秒）
+            reconcile_interval: 核对已删除行的间隔（秒）；没有变更时间列的表在核对时整表重载，
+                                以同步其他实例对已有行的修改
+            page_size: 分页大小
+        """
+        self.table_name = table_name
+        self.db = db
+        self.watermark_column = watermark_column
+        self.min_refresh_interval = min_refresh_interval
+        self.reconcile_interval = reconcile_interval
+        self.page_size = page_size
+
+        self._rows: Dict[int, Dict[str, Any]] = {}
+        self._watermark: Optional[str] = None
+        # 变更时间恰好等于水位线、已读到的行，下次按 >= 读取时跳过
+        self._watermark_ids: set = set()
+        self._max_id = 0
+        self._loaded = False
+        self._last_refresh = 0.0
+        self._last_reconcile = 0.0
+        # 实时订阅生效时由推送的变更维护快照，不再轮询增量
+        self._live = False
+        self._needs_catch_up = False
+        self._lock = threading.RLock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def set_live(self, live: bool):
+        """
+        切换实时模式
+
+        Args:
+            live: True 表示实时订阅已建立，快照由推送的变更维护
+        """
+        with self._lock:
+            # 订阅建立（或重建）之前的变更需要补一次增量读取
+            self._needs_catch_up = live and not self._live
+            self._live = live
+
+    def rows(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        刷新快照并返回所有行（按 id 排序）
+
+        Returns:
+            list: 数据行的副本；首次加载失败时返回 None
+        """
+        self.refresh()
+        return self.loaded_rows()
+
+    def loaded_rows(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        不刷新，直接返回已加载的行，供后端不可用时回退使用
+
+        Returns:
+            list: 数据行的副本；快照未加载时返回 None
+        """
+        with self._lock:
+            if not self._loaded:
+                return None
+            return [dict(row) for row in self._rows.values()]
+
+    def get_many(self, ids) -> Optional[Dict[int, Dict[str, Any]]]:
+        """
+        按 ID 从已加载的快照中取行，快照尚未加载时不触发整表读取
+
+        Args:
+            ids: ID 列表
+
+        Returns:
+            dict: ID -> 行的副本，不存在的 ID 不出现在结果中；快照未加载时返回 None
+        """
+        if not self._loaded:
+            return None
+        self.refresh()
+        with self._lock:
+            if not self._loaded:
+                return None
+            return {row_id: dict(self._rows[row_id]) for row_id in ids if row_id in self._rows}
+
+    def refresh(self, force: bool = False):
+        """
+        刷新快照：首次全量加载，之后按水位线和 id 增量读取，到期时核对删除
+
+        Args:
+            force: 忽略最小刷新间隔
+        """
+        with self._lock:
+            now = time.time()
+            if not force and self._loaded and now - self._last_refresh < self.min_refresh_interval:
+                return
+            reconcile_due = now - self._last_reconcile >= self.reconcile_interval
+            if not force and self._loaded and self._live and not self._needs_catch_up and not reconcile_due:
+                return
+            try:
+                if not self._loaded:
+                    self._reload()
+                elif reconcile_due:
+                    self._reconcile()
+                else:
+                    self._fetch_delta()
+                self._last_refresh = now
+                self._needs_catch_up = False
+            except Exception as e:
+                # 刷新失败时继续提供上一次的快照
+                print(f"刷新 {self.table_name} 快照时出错: {e}")
+
+    def _reload(self):
+        """整表重新加载"""
+        rows: Dict[int, Dict[str, Any]] = {}
+        for page in self.db.iter_pages(self.table_name, page_size=self.page_size):
+            for row in page:
+                rows[row["id"]] = row
+        self._rows = rows
+        self._watermark = None
+        self._watermark_ids = set()
+        self._advance_watermark(rows.values())
+        self._max_id = max(rows.keys(), default=0)
+        self._loaded = True
+        self._last_reconcile = time.time()
+
+    def _fetch_delta(self):
+        """读取水位线及之后更新的行以及 id 大于已读取的最大 id 的新行"""
+        if self.watermark_column and self._watermark:
+            # 同一时间戳上可能还有未读到的行，按 >= 读取并跳过水位线上已读到的行
+            watermark, seen_ids = self._watermark, set(self._watermark_ids)
+            for page in self.db.iter_pages(self.table_name, page_size=self.page_size,
+                                           gte_filters={self.watermark_column: watermark},
+                                           order_by=f"{self.watermark_column},id"):
+                self._merge([row for row in page if not (
+                    row["id"] in seen_ids and normalize_timestamp(row.get(self.watermark_column)) == watermark)])
+                self._advance_watermark(page)
+
+        # 新插入的行一定有更大的 id，即使变更时间列为空也能读到
+        for page in self.db.iter_pages(self.table_name, page_size=self.page_size,
+                                       gt_filters={"id": self._max_id}, order_by="id"):
+            self._merge(page)
+            self._max_id = max(self._max_id, max(row["id"] for row in page))
+
+    def _reconcile(self):
+        """核对已删除的行；没有变更时间列的表整表重载"""
+        if not self.watermark_column:
+            self._reload()
+            return
+        self._fetch_delta()
+        remote_ids = set()
+        for page in self.db.iter_pages(self.table_name, columns="id", page_size=self.page_size):
+            remote_ids.update(row["id"] for row in page)
+        if remote_ids - self._rows.keys():
+            # 并发事务可能以较小的 id 晚提交，增量读取无法发现，整表重载
+            self._reload()
+            return
+        for row_id in [row_id for row_id in self._rows if row_id not in remote_ids]:
+            del self._rows[row_id]
+        self._last_reconcile = time.time()
+
+    def _advance_watermark(self, rows):
+        """用从数据库读取的行推进水位线，并记录水位线时间戳上已读到的行"""
+        if not self.watermark_column:
+            return
+        for row in rows:
+            value = normalize_timestamp(row.get(self.watermark_column))
+            if not value:
+                continue
+            if self._watermark is None or value > self._watermark:
+                self._watermark = value
+                self._watermark_ids = {row["id"]}
+            elif value == self._watermark:
+                self._watermark_ids.add(row["id"])
+
+    def _merge(self, rows: List[Dict[str, Any]]):
+        for row in rows:
+            self._rows[row["id"]] = row
+
+    # ==================== 写操作直写与实时变更 ====================
+
+    def upsert(self, rows: Optional[List[Dict[str, Any]]]):
+        """
+        写操作成功或收到实时变更后将行合并进快照；保存副本，写操作的返回值仍归调用方所有。
+        不推进水位线，其他实例的修改仍由下一次增量读取取得
+        """
+        if not rows:
+            return
+        with self._lock:
+            if self._loaded:
+                self._merge([dict(row) for row in rows])
+
+    def delete(self, row_id: int):
+        """删除操作成功或收到实时删除事件后从快照中移除该行"""
+        with self._lock:
+            self._rows.pop(row_id, None)
+
+    def invalidate(self):
+        """丢弃快照，下次读取时重新全量加载"""
+        with self._lock:
+            self._rows = {}
+            self._watermark = None
+            self._watermark_ids = set()
+            self._max_id = 0
+            self._loaded = False
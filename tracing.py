@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OpenTelemetry 追踪
+为 Streamlit 页面运行、make_api_request、Supabase 查询和 COS 请求创建 span，
+导出到本地 OTLP collector，或写成 JSON Lines 文件供离线分析。
+
+未安装 opentelemetry-sdk 或未配置导出方式时，trace_span 返回空操作的 span，开销可以忽略。
+配置读取 .streamlit/secrets.toml 的 [tracing] 段，没有时读取环境变量:
+
+    [tracing]
+    exporter = "otlp"                              # otlp / file / console
+    endpoint = "http://localhost:4318/v1/traces"   # otlp 导出地址
+    file = "data/traces.jsonl"                     # file 导出路径
+    service_name = "ladr"
+    sample_ratio = 1.0                             # 采样比例
+
+    LADR_TRACING_EXPORTER / LADR_TRACING_ENDPOINT / LADR_TRACING_FILE /
+    LADR_TRACING_SERVICE / LADR_TRACING_SAMPLE_RATIO
+"""
+
+import os
+import threading
+import contextvars
+from typing import Any, Callable, Dict
+
+from app_config import load_config
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import (
+        BatchSpanProcessor, ConsoleSpanExporter, SpanExporter, SpanExportResult,
+    )
+    from opentelemetry.sdk.trace.sampling import ParentBasedTraceIdRatio
+except ImportError:  # pragma: no cover - opentelemetry 为可选依赖
+    trace = None
+
+# 环境变量名 -> (配置项, 类型)
+ENV_CONFIG = {
+    "LADR_TRACING_EXPORTER": ("exporter", str),
+    "LADR_TRACING_ENDPOINT": ("endpoint", str),
+    "LADR_TRACING_FILE": ("file", str),
+    "LADR_TRACING_SERVICE": ("service_name", str),
+    "LADR_TRACING_SAMPLE_RATIO": ("sample_ratio", float),
+}
+
+_lock = threading.Lock()
+_configured = False
+_tracer = None
+
+
+class _NoopSpan:
+    """未启用追踪时使用的 span"""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        pass
+
+    def record_exception(self, exception: BaseException, attributes: Dict[str, Any] = None):
+        pass
+
+    def is_recording(self) -> bool:
+        return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+if trace is not None:
+    class JsonLinesSpanExporter(SpanExporter):
+        """每个 span 写一行 JSON（OpenTelemetry SDK 的 span.to_json 格式）"""
+
+        def __init__(self, path: str):
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+            self._lock = threading.Lock()
+
+        def export(self, spans) -> "SpanExportResult":
+            with self._lock:
+                for span in spans:
+                    self._file.write(span.to_json(indent=None) + "\n")
+                self._file.flush()
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self):
+            with self._lock:
+                self._file.close()
+
+
+def load_tracing_config() -> Dict[str, Any]:
+    """读取追踪配置，secrets 的 [tracing] 段优先于环境变量"""
+    return load_config("tracing", ENV_CONFIG)
+
+
+def _create_exporter(config: Dict[str, Any]):
+    exporter = config.get("exporter")
+    if exporter == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            print("未安装 opentelemetry-exporter-otlp-proto-http，追踪不会导出")
+            return None
+        return OTLPSpanExporter(endpoint=config.get("endpoint", "http://localhost:4318/v1/traces"))
+    if exporter == "file":
+        return JsonLinesSpanExporter(config.get("file", "data/traces.jsonl"))
+    if exporter == "console":
+        return ConsoleSpanExporter()
+    print(f"不支持的追踪导出方式: {exporter}")
+    return None
+
+
+def configure_tracing(config: Dict[str, Any] = None) -> bool:
+    """
+    初始化追踪，每个进程只生效一次；trace_span 首次调用时会自动以默认配置初始化
+
+    Args:
+        config: 追踪配置，默认由 load_tracing_config 读取
+
+    Returns:
+        bool: 追踪是否已启用
+    """
+    global _configured, _tracer
+    with _lock:
+        if _configured:
+            return _tracer is not None
+        _configured = True
+        config = load_tracing_config() if config is None else config
+        if not config.get("exporter"):
+            return False
+        if trace is None:
+            print("未安装 opentelemetry-sdk，追踪已禁用")
+            return False
+        try:
+            exporter = _create_exporter(config)
+            if exporter is None:
+                return False
+            provider = TracerProvider(
+                resource=Resource.create({"service.name": config.get("service_name", "ladr")}),
+                sampler=ParentBasedTraceIdRatio(float(config.get("sample_ratio", 1.0))),
+            )
+            provider.add_span_processor(BatchSpanProcessor(exporter))
+            trace.set_tracer_provider(provider)
+            _tracer = trace.get_tracer("ladr")
+            return True
+        except Exception as e:
+            print(f"初始化追踪失败，追踪已禁用: {e}")
+            return False
+
+
+def is_tracing_enabled() -> bool:
+    return configure_tracing()
+
+
+def trace_span(name: str, attributes: Dict[str, Any] = None, record_exception: bool = True):
+    """
+    创建 span 的上下文管理器，嵌套调用自动形成父子关系
+
+        with trace_span("supabase.select_data", {"db.sql.table": "question"}) as span:
+            rows = ...
+            span.set_attribute("ladr.rows", len(rows))
+
+    Args:
+        name: span 名称
+        attributes: 初始属性，值为 None 的属性会被忽略
+        record_exception: 是否把向外抛出的异常记录到 span 并标记为错误；
+                          Streamlit 用异常实现 st.rerun / st.stop，页面级 span 应设为 False
+    """
+    if not _configured:
+        configure_tracing()
+    if _tracer is None:
+        return _NOOP_SPAN
+    if attributes:
+        attributes = {key: value for key, value in attributes.items() if value is not None}
+    return _tracer.start_as_current_span(name, attributes=attributes, record_exception=record_exception,
+                                         set_status_on_exception=record_exception)
+
+
+def bind_context(fn: Callable) -> Callable:
+    """
+    绑定当前的上下文变量（追踪上下文、慢查询日志的当前页面等），
+    交给线程池执行时 span 仍归属于提交任务时的父 span
+
+    Args:
+        fn: 要在其他线程中执行的函数
+
+    Returns:
+        Callable: 在绑定的上下文中执行 fn 的函数，可以同时在多个线程中调用
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        # 同一个 Context 不能被多个线程同时进入，每次调用使用副本
+        return context.copy().run(fn, *args, **kwargs)
+    return run
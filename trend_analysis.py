@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+错题趋势计算
+按学生缓存每张试卷的题目统计，任意时间范围的趋势都从该缓存切片后按日/周/月/学期分桶聚合，
+调整日期或粒度时无需重新扫描题目数据。
+"""
+
+from datetime import date
+from typing import Dict, Any
+
+import pandas as pd
+import streamlit as st
+
+from api_service import make_api_request, api_service
+from swr_cache import swr_cache
+
+# 统计粒度及其显示名称
+GRANULARITY_LABELS = {
+    "day": "日",
+    "week": "周",
+    "month": "月",
+    "term": "学期",
+}
+
+PAPER_STATS_COLUMNS = ['paper_id', 'paper_title', 'created_time', 'date',
+                       'total_questions', 'error_questions', 'error_rate', 'correct_rate']
+
+
+@swr_cache(ttl=30, tables=("exam_paper", "question"))
+def load_student_paper_stats(student_id: int) -> pd.DataFrame:
+    """
+    计算学生所有试卷的题目数和错题数（不限时间范围）
+
+    Args:
+        student_id: 学生ID
+
+    Returns:
+        pd.DataFrame: 每张有创建时间的试卷一行，按日期升序；date 列为 UTC 时间（不带时区）
+    """
+    if api_service.replica is not None:
+        rows = api_service.replica.trend_stats(student_id, "0001-01-01", "9999-12-31")
+    else:
+        papers_result = make_api_request("GET", "exam_papers")
+        questions_result = make_api_request("GET", "questions")
+        exam_papers = papers_result["data"] if papers_result["success"] else []
+        questions = questions_result["data"] if questions_result["success"] else []
+
+        # 一次遍历按试卷汇总题目，避免对每张试卷扫描全部题目
+        paper_ids = {p['id'] for p in exam_papers if p.get('student_id') == student_id}
+        counts: Dict[int, list] = {}
+        for q in questions:
+            paper_id = q.get('exam_paper_id')
+            if paper_id in paper_ids:
+                count = counts.setdefault(paper_id, [0, 0])
+                count[0] += 1
+                if not q.get('is_correct', False):
+                    count[1] += 1
+
+        rows = []
+        for paper in exam_papers:
+            if paper['id'] in paper_ids and paper.get('created_time'):
+                total, errors = counts.get(paper['id'], (0, 0))
+                rows.append({
+                    'paper_id': paper['id'],
+                    'paper_title': paper.get('title') or f'试卷{paper["id"]}',
+                    'created_time': paper['created_time'],
+                    'total_questions': total,
+                    'error_questions': errors,
+                })
+
+    if not rows:
+        return pd.DataFrame(columns=PAPER_STATS_COLUMNS)
+
+    df = pd.DataFrame(rows)
+    df['date'] = pd.to_datetime(df['created_time'], utc=True, errors='coerce').dt.tz_convert(None)
+    df = df.dropna(subset=['date'])
+    df['error_rate'] = (df['error_questions'] / df['total_questions'].where(df['total_questions'] > 0) * 100).fillna(0)
+    df['correct_rate'] = 100 - df['error_rate']
+    return df.sort_values('date', kind='stable').reset_index(drop=True)[PAPER_STATS_COLUMNS]
+
+
+def _slice_range(df: pd.DataFrame, start_date: date, end_date: date) -> pd.DataFrame:
+    """按日期范围（含首尾两天）切片，df 已按日期排序"""
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+    lo = df['date'].searchsorted(start, side='left')
+    hi = df['date'].searchsorted(end, side='left')
+    return df.iloc[lo:hi]
+
+
+def _bucket_start(dates: pd.Series, granularity: str) -> pd.Series:
+    """计算每个日期所在统计区间的起始日期"""
+    days = dates.dt.normalize()
+    if granularity == "day":
+        return days
+    if granularity == "week":
+        # ISO 周，周一为一周的第一天
+        return days - pd.to_timedelta(days.dt.weekday, unit='D')
+    if granularity == "month":
+        return days - pd.to_timedelta(days.dt.day - 1, unit='D')
+    if granularity == "term":
+        # 秋季学期 8 月至次年 1 月，春季学期 2 月至 7 月
+        year = days.dt.year.where(days.dt.month != 1, days.dt.year - 1)
+        month = pd.Series(8, index=days.index).where((days.dt.month >= 8) | (days.dt.month == 1), 2)
+        return pd.to_datetime(pd.DataFrame({'year': year, 'month': month, 'day': 1}))
+    raise ValueError(f"不支持的统计粒度: {granularity}")
+
+
+def _bucket_label(start: pd.Timestamp, granularity: str) -> str:
+    """生成统计区间的显示名称"""
+    if granularity == "day":
+        return start.strftime('%Y-%m-%d')
+    if granularity == "week":
+        iso = start.isocalendar()
+        return f"{iso[0]}年第{iso[1]:02d}周"
+    if granularity == "month":
+        return start.strftime('%Y年%m月')
+    if start.month == 8:
+        return f"{start.year}-{start.year + 1}学年第一学期"
+    return f"{start.year - 1}-{start.year}学年第二学期"
+
+
+@swr_cache(ttl=30, tables=("exam_paper", "question"))
+def get_trend_analysis(student_id: int, start_date: date, end_date: date) -> Dict[str, Any]:
+    """
+    计算指定时间范围内的错题趋势汇总
+
+    Args:
+        student_id: 学生ID
+        start_date: 开始日期
+        end_date: 结束日期
+
+    Returns:
+        dict: 时间范围内试卷数、按试卷的趋势数据和总体统计
+    """
+    in_range = _slice_range(load_student_paper_stats(student_id), start_date, end_date)
+    trend_df = in_range[in_range['total_questions'] > 0]
+    return {
+        'papers_in_range': len(in_range),
+        'trend_data': trend_df.to_dict('records'),
+        'total_questions_all': int(trend_df['total_questions'].sum()),
+        'total_errors_all': int(trend_df['error_questions'].sum()),
+        'average_error_rate': float(trend_df['error_rate'].mean()) if not trend_df.empty else 0
+    }
+
+
+BUCKET_COLUMNS = ['bucket', 'bucket_label', 'paper_count', 'total_questions',
+                  'error_questions', 'error_rate', 'correct_rate']
+
+
+def aggregate_buckets(paper_stats: pd.DataFrame, granularity: str = "week") -> pd.DataFrame:
+    """
+    将每张试卷的统计按统计粒度聚合
+
+    Args:
+        paper_stats: 每张试卷一行，至少包含 paper_id、date、total_questions、error_questions
+        granularity: day / week / month / term
+
+    Returns:
+        pd.DataFrame: 每个统计区间一行，包含 bucket、bucket_label、paper_count、
+                      total_questions、error_questions、error_rate、correct_rate
+    """
+    paper_stats = paper_stats[paper_stats['total_questions'] > 0]
+    if paper_stats.empty:
+        return pd.DataFrame(columns=BUCKET_COLUMNS)
+
+    buckets = paper_stats.assign(bucket=_bucket_start(paper_stats['date'], granularity)).groupby('bucket').agg(
+        paper_count=('paper_id', 'count'),
+        total_questions=('total_questions', 'sum'),
+        error_questions=('error_questions', 'sum'),
+    ).reset_index()
+    buckets['error_rate'] = (buckets['error_questions'] / buckets['total_questions'] * 100).fillna(0)
+    buckets['correct_rate'] = 100 - buckets['error_rate']
+    buckets['bucket_label'] = [_bucket_label(start, granularity) for start in buckets['bucket']]
+    return buckets[BUCKET_COLUMNS]
+
+
+@swr_cache(ttl=30, tables=("exam_paper", "question"))
+def get_trend_buckets(student_id: int, start_date: date, end_date: date, granularity: str = "week") -> pd.DataFrame:
+    """
+    按统计粒度聚合指定时间范围内的错题趋势
+
+    Args:
+        student_id: 学生ID
+        start_date: 开始日期
+        end_date: 结束日期
+        granularity: day / week / month / term
+
+    Returns:
+        pd.DataFrame: 每个统计区间一行，列见 aggregate_buckets
+    """
+    in_range = _slice_range(load_student_paper_stats(student_id), start_date, end_date)
+    return aggregate_buckets(in_range, granularity)